@@ -0,0 +1,58 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from vis3.internal.client.codec import CODECS, StreamDecompressor
+
+_BOMB_SIZE = 64 << 20
+_MAX_BLOCK_SIZE = 64 << 10
+
+
+def _compress(name: str, data: bytes) -> bytes:
+    if name == "gzip":
+        return gzip.compress(data)
+    if name == "bz2":
+        return bz2.compress(data)
+    if name == "xz":
+        return lzma.compress(data)
+    if name == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor(write_checksum=True).compress(data)
+    lz4_frame = pytest.importorskip("lz4.frame")
+    return lz4_frame.compress(data)
+
+
+def _drain(decompressor: StreamDecompressor, data: bytes, chunk_size: int) -> list[bytes]:
+    blocks = []
+    for i in range(0, len(data), chunk_size):
+        blocks.append(decompressor.decompress(data[i : i + chunk_size]))
+        while not decompressor.needs_input:
+            blocks.append(decompressor.decompress())
+    return blocks
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_decompress_bomb_is_bounded(name):
+    bomb = _compress(name, b"\0" * _BOMB_SIZE)
+    decompressor = StreamDecompressor(CODECS[name], _MAX_BLOCK_SIZE)
+
+    total = 0
+    for block in _drain(decompressor, bomb, 1 << 20):
+        assert len(block) <= _MAX_BLOCK_SIZE
+        total += len(block)
+
+    assert total == _BOMB_SIZE
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+@pytest.mark.parametrize("chunk_size", [1, 1000, 1 << 20])
+def test_decompress_multi_stream(name, chunk_size):
+    text = b"".join(b'{"id": %d, "text": "%s"}\n' % (i, b"x" * (i % 97)) for i in range(5000))
+    data = _compress(name, text) + _compress(name, text[::-1])
+
+    blocks = _drain(StreamDecompressor(CODECS[name], 4096), data, chunk_size)
+
+    assert all(len(block) <= 4096 for block in blocks)
+    assert b"".join(blocks) == text + text[::-1]
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from vis3.internal.client.etag_store import ETagStore
+
+
+class _BytesStore(ETagStore[bytes]):
+    kind = "test"
+    suffix = ".bin"
+
+    def _dumps(self, value: bytes) -> bytes:
+        return value
+
+    def _loads(self, data: bytes) -> bytes:
+        if data == b"corrupt":
+            raise ValueError(data)
+        return data
+
+
+def _reader(key: str):
+    return SimpleNamespace(endpoint_url="http://s3", bucket_name="bkt", key_without_query=key)
+
+
+def _files(path: str) -> list[str]:
+    return sorted(name for _, _, names in os.walk(path) for name in names)
+
+
+def test_new_version_replaces_the_old_file(tmp_path):
+    store = _BytesStore(str(tmp_path), max_loaded=0, max_bytes=0, max_age=0)
+    reader = _reader("a.jsonl")
+
+    async def run():
+        await store.save(reader, '"v1"', b"first")
+        assert await store.get(reader, '"v1"') == b"first"
+        await store.save(reader, '"v2"', b"second")
+        assert await store.get(reader, '"v1"') is None
+        assert await store.get(reader, '"v2"') == b"second"
+
+    asyncio.run(run())
+    assert len(_files(str(tmp_path))) == 1
+
+
+def test_corrupt_file_is_removed(tmp_path):
+    store = _BytesStore(str(tmp_path), max_loaded=0, max_bytes=0, max_age=0)
+    reader = _reader("a.jsonl")
+
+    async def run():
+        await store.save(reader, "v1", b"corrupt")
+        assert await store.get(reader, "v1") is None
+
+    asyncio.run(run())
+    assert _files(str(tmp_path)) == []
+
+
+def test_sweep_removes_least_recently_used_files(tmp_path):
+    store = _BytesStore(str(tmp_path), max_loaded=0, max_bytes=250, max_age=3600)
+    keys = [f"{i}.jsonl" for i in range(5)]
+    for i, key in enumerate(keys):
+        file = store._file(store._key(_reader(key), "v"))
+        store._save_sync(file, "v", b"x" * 97)
+        os.utime(file, (time.time() - 100 + i, time.time() - 100 + i))
+    # 最早写入的文件最近被读取过
+    assert store._load_sync(store._file(store._key(_reader(keys[0]), "v")), "v") == b"x" * 97
+    # 过期的文件无论总大小都会被删除
+    expired = store._file(store._key(_reader("old.jsonl"), "v"))
+    store._save_sync(expired, "v", b"")
+    os.utime(expired, (time.time() - 7200, time.time() - 7200))
+
+    store._sweep_sync()
+
+    kept = [key for key in keys if os.path.exists(store._file(store._key(_reader(key), "v")))]
+    # 每个文件 100 字节，保留最近使用的两个
+    assert kept == [keys[0], keys[4]]
+    assert not os.path.exists(expired)
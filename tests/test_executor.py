@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+from vis3.internal.client.executor import InstrumentedExecutor
+
+
+def test_cancelled_submissions_leave_the_queue():
+    executor = InstrumentedExecutor("test", 1)
+    release = threading.Event()
+
+    async def run():
+        busy = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(executor.run(lambda: None)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queue_depth"] == 5
+
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        release.set()
+        await busy
+
+    asyncio.run(run())
+    stats = executor.stats()
+    assert (stats["queue_depth"], stats["running"], stats["completed"]) == (0, 0, 1)
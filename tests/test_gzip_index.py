@@ -0,0 +1,201 @@
+import asyncio
+import gzip
+import random
+import zlib
+
+import pytest
+
+from vis3.internal.client.gzip_index import (GzipIndex, _CheckpointBuilder, _LineCollector,
+                                             inflate_line)
+from vis3.internal.client.line_index import LineIndexBuilder
+
+
+def _text(seed: int, rows: int, trailing_newline: bool) -> bytes:
+    rng = random.Random(seed)
+    lines = [
+        b'{"i": %d, "s": "%s"}'
+        % (i, rng.randbytes(rng.choice([0, 1, 10, 200, 3000])).hex().encode())
+        for i in range(rows)
+    ]
+    # 空行
+    lines[rows // 3] = b""
+    return b"\n".join(lines) + (b"\n" if trailing_newline else b"")
+
+
+def _rows(text: bytes) -> list[bytes]:
+    rows = text.split(b"\n")
+    return rows[:-1] if text.endswith(b"\n") else rows
+
+
+def _reader(data: bytes):
+    async def read(start: int, end: int) -> bytes:
+        return data[start:end]
+
+    return read
+
+
+def _build(data: bytes, spacing: int, stride: int, seed: int) -> _CheckpointBuilder:
+    rng = random.Random(seed)
+    builder = _CheckpointBuilder(spacing, stride)
+    position = 0
+    while position < len(data) and not builder.finished:
+        size = rng.randint(1, 5000)
+        builder.feed(data[position : position + size])
+        position += size
+    return builder
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_checkpoints_match_gzip_decompress(trailing_newline):
+    text = _text(1, 1000, trailing_newline)
+    data = gzip.compress(text)
+    builder = _build(data, 16 << 10, 7, seed=2)
+    index = builder.lines.finish()
+
+    rows = _rows(text)
+    assert index.lines == len(rows)
+    assert index.size == len(text)
+    starts = [0]
+    for row in rows[:-1]:
+        starts.append(starts[-1] + len(row) + 1)
+    assert list(index.offsets) == starts[::7]
+
+    assert len(builder.checkpoints) > 5
+    for checkpoint in builder.checkpoints:
+        decompressor = checkpoint.state.copy() if checkpoint.state else zlib.decompressobj(31)
+        output = decompressor.decompress(data[checkpoint.compressed :], 1 << 16)
+        assert output == text[checkpoint.uncompressed : checkpoint.uncompressed + (1 << 16)]
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_inflate_random_rows_from_checkpoints(trailing_newline):
+    text = _text(3, 2000, trailing_newline)
+    data = gzip.compress(text)
+    builder = _build(data, 2048, 10, seed=4)
+    gzip_index = GzipIndex(builder.lines.finish(), checkpoints=builder.checkpoints)
+    rows = _rows(text)
+    rng = random.Random(5)
+
+    async def read_row(row: int, lines: int = 1, max_bytes: int = 0):
+        offset, skip = gzip_index.lines.locate(row)
+        checkpoint = gzip_index.nearest(offset)
+        return await inflate_line(
+            _reader(data),
+            len(data),
+            checkpoint.compressed,
+            base=checkpoint.uncompressed,
+            decompressor=checkpoint.state.copy() if checkpoint.state else None,
+            skip_bytes=offset - checkpoint.uncompressed,
+            skip_lines=skip,
+            lines=lines,
+            max_bytes=max_bytes,
+        )
+
+    async def run():
+        for row in rng.sample(range(len(rows)), 100) + [0, len(rows) - 1]:
+            line = await read_row(row)
+            assert line.data == rows[row]
+            assert text[line.offset : line.end].rstrip(b"\n") == rows[row]
+            assert line.has_more == (row < len(rows) - 1)
+
+            count = rng.randint(2, 20)
+            batch = await read_row(row, lines=count)
+            assert batch.data.split(b"\n") == rows[row : row + count]
+
+        # 超过 max_bytes 后不再取下一行，至少返回一行
+        batch = await read_row(0, lines=100, max_bytes=1)
+        assert batch.data == rows[0]
+        assert await read_row(len(rows) - 1, lines=5) is not None
+
+    asyncio.run(run())
+
+
+def test_inflate_past_end_returns_none():
+    text = b"a\nb\n"
+    data = gzip.compress(text)
+
+    async def run():
+        assert (await inflate_line(_reader(data), len(data), 0, skip_lines=1)).data == b"b"
+        assert await inflate_line(_reader(data), len(data), 0, skip_lines=2) is None
+        assert await inflate_line(_reader(data), len(data), 0, skip_bytes=len(text)) is None
+
+    asyncio.run(run())
+
+
+def test_inflate_reports_member_end():
+    members = [b"a\nb\n", b"c\n", b"d\ne"]
+    data = b"".join(gzip.compress(member) for member in members)
+    first = len(gzip.compress(members[0]))
+
+    async def run():
+        line = await inflate_line(_reader(data), len(data), 0, skip_lines=1)
+        assert (line.data, line.member_end, line.has_more) == (b"b", first, True)
+        # 行没有在 member 边界结束
+        line = await inflate_line(_reader(data), len(data), 0)
+        assert (line.data, line.member_end) == (b"a", None)
+        line = await inflate_line(_reader(data), len(data), 0, skip_lines=3)
+        assert (line.data, line.member_end, line.has_more) == (b"d", None, True)
+        line = await inflate_line(_reader(data), len(data), 0, skip_lines=4)
+        assert (line.data, line.has_more) == (b"e", False)
+
+    asyncio.run(run())
+
+
+def test_long_line_is_truncated_at_max_line():
+    text = b"x" * 5000 + b"\nshort\n"
+    collector = _LineCollector(0, 0, 0, 1000, lines=3)
+    position = 0
+    while not collector.feed(text[position : position + 100]):
+        position += 100
+    line = collector.result()
+
+    assert line.data == b"x" * 1000
+    assert (line.end, line.has_more) == (1000, True)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_line_collector_is_independent_of_chunking(seed):
+    rng = random.Random(seed)
+    text = _text(seed, 60, rng.random() < 0.5)
+    # 通常是某一行的开头，也可能落在行中间
+    skip_bytes = rng.choice([0, rng.randint(0, len(text)), text.index(b"\n", len(text) // 2) + 1])
+    skip_lines = rng.randint(0, 5)
+    lines = rng.randint(1, 10)
+
+    def collect(sizes):
+        collector = _LineCollector(100, skip_bytes, skip_lines, 10 << 20, lines)
+        position = 0
+        for size in sizes:
+            if collector.feed(text[position : position + size]):
+                break
+            position += size
+        return collector.result()
+
+    whole = collect([len(text)])
+    assert collect([1] * len(text)) == whole
+    assert collect([rng.randint(1, 700) for _ in range(len(text))]) == whole
+
+    # 与按行切分的结果比较：从 skip_bytes 开始跳过 skip_lines 行
+    start = skip_bytes
+    for _ in range(skip_lines):
+        start = text.find(b"\n", start) + 1 or len(text)
+    if start >= len(text):
+        assert whole is None
+    else:
+        assert whole.offset == 100 + start
+        assert whole.data.split(b"\n") == _rows(text[start:])[:lines]
+
+
+@pytest.mark.parametrize("exported", [None, b"\x00zran-checkpoints"])
+def test_index_round_trip(exported):
+    builder = LineIndexBuilder(3)
+    builder.feed(b"a\nbb\nccc\ndddd\ne")
+    index = GzipIndex(builder.finish(), exported=exported)
+
+    loaded = GzipIndex.from_bytes(index.to_bytes())
+
+    assert loaded.exported == exported
+    assert loaded.checkpoints is None
+    assert (loaded.lines.lines, loaded.lines.size, list(loaded.lines.offsets)) == (5, 15, [0, 9])
+    with pytest.raises(ValueError):
+        GzipIndex.from_bytes(b"XXXX" + index.to_bytes()[4:])
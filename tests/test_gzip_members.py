@@ -0,0 +1,64 @@
+import random
+import struct
+
+import pytest
+
+from vis3.internal.client.gzip_members import parse_seek_table, seek_table_size
+
+
+def _seek_table(frames: list[tuple[int, int]], checksum: bool = False) -> bytes:
+    """按 zstd seekable 格式生成 seek table（可跳过帧）"""
+    entries = b"".join(
+        struct.pack("<II", compressed, uncompressed) + (b"\0" * 4 if checksum else b"")
+        for compressed, uncompressed in frames
+    )
+    footer = struct.pack("<IBI", len(frames), 0x80 if checksum else 0, 0x8F92EAB1)
+    return struct.pack("<II", 0x184D2A5E, len(entries) + len(footer)) + entries + footer
+
+
+@pytest.mark.parametrize("checksum", [False, True])
+def test_seek_table_round_trip(checksum):
+    rng = random.Random(0)
+    frames = [(rng.randint(1, 1 << 20), rng.randint(1, 1 << 22)) for _ in range(50)]
+    table = _seek_table(frames, checksum)
+    data = b"frames" + table
+
+    assert seek_table_size(data[-9:]) == len(table)
+    parsed = parse_seek_table(data[-len(table) :])
+
+    compressed = uncompressed = 0
+    for i, (c, u) in enumerate(frames):
+        compressed += c
+        uncompressed += u
+        assert (parsed.compressed_ends[i], parsed.uncompressed_ends[i]) == (compressed, uncompressed)
+    assert parsed.count == len(frames)
+
+
+def test_not_a_seek_table():
+    table = _seek_table([(10, 20)])
+    assert seek_table_size(b"") is None
+    assert seek_table_size(b"\0" * 9) is None
+    # 描述符的保留位不为 0
+    assert seek_table_size(table[:-5] + b"\x04" + table[-4:]) is None
+    # 帧长度与 footer 中的帧数不一致
+    assert parse_seek_table(table[:4] + struct.pack("<I", 99) + table[8:]) is None
+    assert parse_seek_table(b"\0" * 4 + table[4:]) is None
+
+
+def test_seek_table_locates_zstd_frames():
+    zstandard = pytest.importorskip("zstandard")
+    rng = random.Random(1)
+    chunks = [rng.randbytes(rng.randint(0, 5000)).hex().encode() for _ in range(30)]
+    compressor = zstandard.ZstdCompressor()
+    frames = [compressor.compress(chunk) for chunk in chunks]
+    text = b"".join(chunks)
+    data = b"".join(frames) + _seek_table([(len(f), len(c)) for f, c in zip(frames, chunks)])
+
+    table = parse_seek_table(data[-seek_table_size(data[-9:]) :])
+
+    for offset in [0, len(text) - 1] + [rng.randrange(len(text)) for _ in range(100)]:
+        compressed, uncompressed = table.find_uncompressed(offset)
+        assert uncompressed <= offset
+        output = zstandard.ZstdDecompressor().decompressobj().decompress(data[compressed:])
+        assert output == text[uncompressed : uncompressed + len(output)]
+        assert uncompressed + len(output) > offset
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from vis3.internal.common.jobs import JobQueueFull, JobRegistry, JobState
+
+
+def test_queued_kind_does_not_take_shared_slots():
+    registry = JobRegistry(max_concurrency=1, ttl=60)
+    registry.add_queue("profile", max_concurrency=1, max_pending=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def wait(job):
+            await release.wait()
+
+        profiling = registry.submit("profile", "a", wait)
+        await asyncio.sleep(0)
+        queued = registry.submit("profile", "b", wait)
+        with pytest.raises(JobQueueFull):
+            registry.submit("profile", "c", wait)
+        # 同一对象重复提交返回已有任务，不受排队上限影响
+        assert registry.submit("profile", "b", wait) is queued
+
+        index = registry.submit("line_index", "a", lambda job: asyncio.sleep(0, "built"))
+        await asyncio.wait_for(index.task, 1)
+        assert index.state == JobState.DONE
+        assert (profiling.state, queued.state) == (JobState.RUNNING, JobState.PENDING)
+        assert registry.stats()["queues"]["profile"]["pending"] == 1
+
+        release.set()
+        await asyncio.gather(profiling.task, queued.task)
+        assert queued.state == JobState.DONE
+
+    asyncio.run(run())
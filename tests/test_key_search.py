@@ -0,0 +1,39 @@
+import pytest
+
+from vis3.internal.client.key_search import compile_matcher
+from vis3.internal.common.exceptions import AppEx
+
+
+@pytest.mark.parametrize(
+    "pattern, mode, path, expected",
+    [
+        ("*.jsonl", "glob", "2024/part-0.jsonl", True),
+        ("*.jsonl", "glob", "2024/part-0.jsonl.gz", False),
+        ("*/part-*.gz", "glob", "2024/part-0.gz", True),
+        (r"^2024-\d+/.*\.parquet$", "regex", "2024-01/a.parquet", True),
+        (r"(ab|cd)+\.json", "regex", "x/abcd.json", True),
+        (r"part-\d{5}", "regex", "part-123", False),
+    ],
+)
+def test_matcher(pattern, mode, path, expected):
+    assert compile_matcher(pattern, mode)(path) is expected
+
+
+@pytest.mark.parametrize(
+    "pattern, mode",
+    [
+        ("(a+)+$", "regex"),
+        (r"(\w*/)*x", "regex"),
+        ("((ab)*c)+", "regex"),
+        ("(a|b+)*", "regex"),
+        ("(?:x(?=y+))*", "regex"),
+        ("(", "regex"),
+        ("a" * 300, "regex"),
+        ("*" * 300, "glob"),
+        ("*.jsonl", "prefix"),
+    ],
+)
+def test_rejected_patterns(pattern, mode):
+    with pytest.raises(AppEx) as exc:
+        compile_matcher(pattern, mode)
+    assert exc.value.status_code == 400
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from vis3.internal.client.line_index import LineIndex, LineIndexBuilder
+
+
+def _index(text: bytes, stride: int, rng: random.Random) -> LineIndex:
+    builder = LineIndexBuilder(stride)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 300)
+        builder.feed(text[position : position + size])
+        position += size
+    return builder.finish()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_rows_match_line_split(seed):
+    rng = random.Random(seed)
+    rows = [b"x" * rng.choice([0, 1, 5, 80]) for _ in range(rng.randint(1, 500))]
+    text = b"\n".join(rows) + (b"\n" if rng.random() < 0.5 else b"")
+    # 以换行结尾时最后一段不是一行
+    rows = text.split(b"\n")
+    if text.endswith(b"\n"):
+        rows.pop()
+    stride = rng.choice([1, 2, 7, 100, 1000])
+
+    index = LineIndex.from_bytes(_index(text, stride, rng).to_bytes())
+
+    assert (index.lines, index.size, index.stride) == (len(rows), len(text), stride)
+    for row in rng.sample(range(len(rows)), min(len(rows), 50)):
+        offset, skip = index.locate(row)
+        assert text[offset:].split(b"\n")[skip] == rows[row]
+
+
+def test_empty_and_single_line_files():
+    assert _index(b"", 10, random.Random(0)).lines == 0
+    assert _index(b"\n", 1, random.Random(0)).lines == 1
+    index = _index(b"a\nb\n", 1, random.Random(0))
+    # 最后一个换行之后没有内容，不记录检查点
+    assert (index.lines, list(index.offsets)) == (2, [0, 2])
+
+
+def test_corrupt_index_is_rejected():
+    data = _index(b"a\nb\nc\n", 1, random.Random(0)).to_bytes()
+    with pytest.raises(ValueError):
+        LineIndex.from_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        LineIndex.from_bytes(data[:-1])
@@ -0,0 +1,71 @@
+import pytest
+
+from vis3.internal.client.list_cursor import (ListingCursorCache, ListingKey, decode_cursor,
+                                              encode_cursor, resume_after)
+from vis3.internal.common.exceptions import AppEx
+
+_LISTING = ListingKey("http://s3", "bkt", "data/", "/", 100)
+
+
+@pytest.mark.parametrize("start_after", [None, "data/part-0001.jsonl", "data/目录/\U0010ffff"])
+def test_cursor_round_trip(start_after):
+    token = "1ueGcxLPRx1Tr/XYExHnhbYLgveDs2J/wm36Hy4vbOwM="
+    cursor = encode_cursor(_LISTING, 7, token, start_after)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, _LISTING) == (7, token, start_after)
+
+
+def test_cursor_is_bound_to_its_listing():
+    cursor = encode_cursor(_LISTING, 2, "token")
+    other = _LISTING._replace(page_size=50)
+
+    with pytest.raises(AppEx) as exc:
+        decode_cursor(cursor, other)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "e30", encode_cursor(_LISTING, 2, "t")[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(AppEx) as exc:
+        decode_cursor(cursor, _LISTING)
+    assert exc.value.status_code == 400
+
+
+def test_cache_returns_nearest_known_page():
+    cache = ListingCursorCache(max_listings=10, ttl=60, max_pages=3)
+    assert cache.nearest(_LISTING, 5) == (1, None)
+
+    cache.set(_LISTING, 1, "ignored")
+    cache.set(_LISTING, 3, "t3")
+    cache.set(_LISTING, 6, "t6")
+    assert cache.nearest(_LISTING, 2) == (1, None)
+    assert cache.nearest(_LISTING, 5) == (3, "t3")
+    assert cache.nearest(_LISTING, 100) == (6, "t6")
+
+    # 每个列表最多记录 max_pages 页，已记录的页仍可更新
+    cache.set(_LISTING, 9, "t9")
+    cache.set(_LISTING, 12, "t12")
+    cache.set(_LISTING, 3, "t3b")
+    assert cache.nearest(_LISTING, 100) == (9, "t9")
+    assert cache.nearest(_LISTING, 4) == (3, "t3b")
+
+
+def test_cache_invalidation():
+    cache = ListingCursorCache(max_listings=10, ttl=60, max_pages=10)
+    other = _LISTING._replace(bucket="other")
+    cache.set(_LISTING, 2, "a")
+    cache.set(other, 2, "b")
+
+    cache.invalidate(bucket="bkt")
+    assert cache.nearest(_LISTING, 2) == (1, None)
+    assert cache.nearest(other, 2) == (2, "b")
+
+    cache.invalidate(listing=other)
+    assert cache.nearest(other, 2) == (1, None)
+
+
+def test_resume_after_skips_directories():
+    assert resume_after("data/a.jsonl", "/") == "data/a.jsonl"
+    assert resume_after("data/sub/", "/") > "data/sub/\uffff/x.jsonl"
+    assert resume_after("data/sub/", "") == "data/sub/"
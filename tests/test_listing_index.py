@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from vis3.internal.client.listing_index import ListingIndex
+
+
+class _Reader:
+    """按页返回 files 与 dirs 的假 S3Reader，fail_at 指定的页抛出异常"""
+
+    endpoint_url = "http://s3"
+    bucket_name = "bkt"
+    key_without_query = "data/"
+
+    def __init__(self, files: list[str], dirs: list[str], page_size: int = 3):
+        self.files = files
+        self.dirs = dirs
+        self.page_size = page_size
+        self.fail_at: int | None = None
+        self.on_page = None
+
+    def listing_key(self, page_size: int, recursive: bool = False):
+        return ("data/", "/", page_size)
+
+    async def fetch_listing_page(self, listing, token):
+        page = int(token or 0)
+        if page == self.fail_at:
+            raise RuntimeError("listing failed")
+        if self.on_page is not None:
+            await self.on_page(page)
+
+        items = [("file", key) for key in self.files] + [("dir", key) for key in self.dirs]
+        chunk = items[page * self.page_size : (page + 1) * self.page_size]
+        result = {
+            "Contents": [
+                {
+                    "Key": key,
+                    "Size": len(key),
+                    "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    "ETag": f'"{key}"',
+                }
+                for kind, key in chunk
+                if kind == "file"
+            ],
+            "CommonPrefixes": [{"Prefix": key} for kind, key in chunk if kind == "dir"],
+        }
+        if (page + 1) * self.page_size < len(items):
+            result["NextContinuationToken"] = str(page + 1)
+        return result
+
+
+def _index(tmp_path) -> ListingIndex:
+    return ListingIndex(str(tmp_path / "listing.sqlite"), refresh_after=60, max_age=3600)
+
+
+async def _keys(index: ListingIndex, reader: _Reader) -> list[str]:
+    entries = await index.query(reader, 0, 1000)
+    return [details.get("Key") or details["Prefix"] for _, details, _ in entries]
+
+
+def test_crawl_replaces_previous_generation(tmp_path):
+    index = _index(tmp_path)
+    reader = _Reader(
+        [f"data/{i:02d}.jsonl" for i in range(7)] + ["data/marker/"], ["data/a/", "data/b/"]
+    )
+
+    async def run():
+        assert await index.state(reader) is None
+        assert await index.crawl(reader) == 9
+        state = await index.state(reader)
+        assert (state.generation, state.entries) == (1, 9)
+        assert index.is_usable(state) and not index.needs_refresh(state)
+        # 以 "/" 结尾的占位对象不计入
+        assert "data/marker/" not in await _keys(index, reader)
+
+        reader.files = ["data/00.jsonl", "data/07.jsonl"]
+        reader.dirs = ["data/b/", "data/c/"]
+        assert await index.crawl(reader) == 4
+        state = await index.state(reader)
+        assert (state.generation, state.entries) == (2, 4)
+        keys = await _keys(index, reader)
+        assert keys == ["data/00.jsonl", "data/07.jsonl", "data/b/", "data/c/"]
+
+        page = await index.query(reader, 1, 2, sort="size", descending=True)
+        assert [details.get("Key") for _, details, _ in page] == ["data/00.jsonl", None]
+
+    asyncio.run(run())
+
+
+def test_readers_see_a_complete_listing_during_refresh(tmp_path):
+    index = _index(tmp_path)
+    reader = _Reader([f"data/{i:02d}.jsonl" for i in range(6)], [])
+    seen = []
+
+    async def run():
+        await index.crawl(reader)
+
+        reader.files = [f"data/{i:02d}.jsonl" for i in range(4, 10)]
+
+        async def on_page(page):
+            # 新 generation 写了一部分时，旧的条目仍然可以读到
+            seen.append(await _keys(index, reader))
+
+        reader.on_page = on_page
+        await index.crawl(reader)
+        seen.append(await _keys(index, reader))
+
+    asyncio.run(run())
+
+    old = [f"data/{i:02d}.jsonl" for i in range(6)]
+    assert seen[0] == old
+    assert seen[1] == old + ["data/06.jsonl"]
+    assert seen[2] == [f"data/{i:02d}.jsonl" for i in range(4, 10)]
+
+
+def test_failed_crawl_keeps_previous_generation(tmp_path):
+    index = _index(tmp_path)
+    reader = _Reader([f"data/{i:02d}.jsonl" for i in range(6)], [])
+
+    async def run():
+        await index.crawl(reader)
+        before = await index.state(reader)
+
+        reader.files = ["data/new.jsonl"] + reader.files[3:]
+        reader.fail_at = 1
+        with pytest.raises(RuntimeError):
+            await index.crawl(reader)
+
+        state = await index.state(reader)
+        assert (state.generation, state.entries, state.completed_at) == (
+            before.generation,
+            before.entries,
+            before.completed_at,
+        )
+        # 已写入的新条目与旧条目并存，旧条目没有被删除
+        keys = await _keys(index, reader)
+        assert set(keys) == {f"data/{i:02d}.jsonl" for i in range(6)} | {"data/new.jsonl"}
+
+        reader.fail_at = None
+        assert await index.crawl(reader) == 4
+        assert (await index.state(reader)).generation == before.generation + 1
+        assert await _keys(index, reader) == sorted(reader.files)
+
+    asyncio.run(run())
+
+
+def test_invalidate_by_bucket(tmp_path):
+    index = _index(tmp_path)
+    reader = _Reader(["data/a.jsonl"], [])
+
+    async def run():
+        await index.crawl(reader)
+        await index.invalidate("http://s3", "other")
+        assert await index.state(reader) is not None
+        await index.invalidate("http://s3", "bkt")
+        assert await index.state(reader) is None
+        assert await _keys(index, reader) == []
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from vis3.internal.client import prefix_stats
+from vis3.internal.client.list_cursor import resume_after
+from vis3.internal.client.prefix_stats import list_children
+
+
+class _FakeTransport:
+    """按 ListObjectsV2 的语义在内存中列出 key"""
+
+    def __init__(self, keys: list[str]):
+        self.keys = sorted(keys)
+
+    async def list_objects_v2(
+        self, Bucket, Prefix, Delimiter, MaxKeys, StartAfter=None, ContinuationToken=None
+    ):
+        start = ContinuationToken or StartAfter or ""
+        contents, prefixes, entries = [], [], []
+        for key in self.keys:
+            if not key.startswith(Prefix) or key <= start:
+                continue
+            rest = key[len(Prefix) :]
+            if Delimiter in rest:
+                common = Prefix + rest[: rest.index(Delimiter) + 1]
+                if entries and entries[-1] == common:
+                    continue
+                if len(entries) == MaxKeys:
+                    break
+                prefixes.append({"Prefix": common})
+                entries.append(common)
+            else:
+                if len(entries) == MaxKeys:
+                    break
+                contents.append({"Key": key, "Size": 1})
+                entries.append(key)
+
+        result = {"Contents": contents, "CommonPrefixes": prefixes}
+        if len(entries) == MaxKeys:
+            result["NextContinuationToken"] = resume_after(entries[-1], Delimiter)
+        return result
+
+
+def _list(keys: list[str], prefix: str) -> tuple[list[str], list[str]]:
+    reader = SimpleNamespace(bucket_name="bkt", transport=_FakeTransport(keys))
+    objects, directories = [], []
+
+    def on_page(contents: list[dict], prefixes: list[str]):
+        objects.extend(content["Key"] for content in contents)
+        directories.extend(prefixes)
+
+    asyncio.run(list_children(reader, prefix, asyncio.Semaphore(4), on_page))
+    return objects, directories
+
+
+def test_prefix_at_end_of_first_page_is_counted_once(monkeypatch):
+    monkeypatch.setattr(prefix_stats, "_PAGE_SIZE", 5)
+    keys = (
+        [f"d/f{i:03d}" for i in range(4)]
+        + [f"d/sub/{i}" for i in range(5)]
+        + [f"d/t{i:03d}" for i in range(10)]
+        + [f"d/u/{i}" for i in range(3)]
+        + [f"d/{ch}{i}" for ch in "wxz" for i in range(7)]
+    )
+
+    objects, directories = _list(keys, "d/")
+
+    assert sorted(directories) == ["d/sub/", "d/u/"]
+    assert sorted(objects) == sorted(key for key in keys if "/" not in key[2:])
+
+
+class _SlowTransport(_FakeTransport):
+    """记录请求数与同时进行的请求数"""
+
+    def __init__(self, keys: list[str]):
+        super().__init__(keys)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def list_objects_v2(self, **kwargs):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            return await super().list_objects_v2(**kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def test_dense_flat_prefix_is_listed_in_parallel(monkeypatch):
+    monkeypatch.setattr(prefix_stats, "_PAGE_SIZE", 10)
+    keys = [f"d/part-{i:07d}.jsonl" for i in range(2000)] + ["d/z/1"]
+    transport = _SlowTransport(keys)
+    reader = SimpleNamespace(bucket_name="bkt", transport=transport)
+    objects, directories = [], []
+    progress: dict = {}
+
+    def on_page(contents: list[dict], prefixes: list[str]):
+        objects.extend(content["Key"] for content in contents)
+        directories.extend(prefixes)
+
+    asyncio.run(list_children(reader, "d/", asyncio.Semaphore(64), on_page, progress))
+
+    assert sorted(objects) == keys[:-1]
+    assert directories == ["d/z/"]
+    assert transport.max_in_flight > 8
+    # 每个区间最多多读一页
+    assert transport.requests <= 2.5 * len(keys) / 10
+    assert progress["shards_done"] == progress["shards"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_keys_are_listed_once(monkeypatch, seed):
+    monkeypatch.setattr(prefix_stats, "_PAGE_SIZE", 7)
+    rng = random.Random(seed)
+    alphabet = "0189aAzZ-_/."
+    keys = sorted(
+        {"p/" + "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8))) for _ in range(800)}
+    )
+
+    objects, directories = _list(keys, "p/")
+
+    rests = [key[2:] for key in keys]
+    assert sorted(objects) == [f"p/{rest}" for rest in rests if "/" not in rest]
+    assert sorted(directories) == sorted(
+        {f"p/{rest.split('/')[0]}/" for rest in rests if "/" in rest}
+    )
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from vis3.internal.client.block_cache import block_cache
+from vis3.internal.client.meta_cache import ObjectPath
+from vis3.internal.client.readahead import ReadAhead
+
+_MB = 1 << 20
+_KEY = ObjectPath("http://s3", "bkt", "data/a.jsonl")
+
+
+class _Reader:
+    endpoint_url = "http://s3"
+    bucket_name = "bkt"
+    key_without_query = "data/a.jsonl"
+
+    def __init__(self, session: str | None, fetches: list):
+        self.session = session
+        self.fetches = fetches
+
+    async def read_range(self, start: int, end: int) -> bytes:
+        self.fetches.append((self.session, start, end))
+        await asyncio.sleep(10)
+        return b""
+
+
+@pytest.fixture(autouse=True)
+def _enabled(monkeypatch):
+    monkeypatch.setattr(block_cache, "block_size", 1 << 16)
+    monkeypatch.setattr(block_cache, "max_bytes", 64 * _MB)
+
+
+def _in_flight(readahead: ReadAhead) -> list[asyncio.Task]:
+    streams = readahead._streams.get(_KEY) or []
+    return [stream.task for stream in streams if stream.task is not None and not stream.task.done()]
+
+
+def test_jump_cancels_the_readers_previous_window():
+    readahead = ReadAhead(min_window=_MB, max_window=8 * _MB, max_in_flight=64 * _MB)
+    fetches = []
+    reader = _Reader("user:1", fetches)
+
+    async def run():
+        # 每次跳转到新的位置，之前的预读都被取消
+        for offset in range(0, 100 * _MB, 10 * _MB):
+            readahead.on_read(reader, offset, offset + 1000, size=200 * _MB)
+            await asyncio.sleep(0)
+            assert len(_in_flight(readahead)) == 1
+        await asyncio.sleep(0)
+        assert readahead.in_flight == _MB
+        assert readahead.stats()["cancelled"] == 9
+
+        # 顺序读取时窗口翻倍
+        readahead.on_read(reader, 90 * _MB + 1000, 90 * _MB + 2000, size=200 * _MB)
+        assert readahead._streams.get(_KEY)[0].window == 2 * _MB
+        for task in _in_flight(readahead):
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def test_readers_have_independent_streams():
+    readahead = ReadAhead(min_window=_MB, max_window=8 * _MB, max_in_flight=64 * _MB)
+    fetches = []
+    first = _Reader("user:1", fetches)
+    second = _Reader("10.0.0.2", fetches)
+
+    async def run():
+        readahead.on_read(first, 0, 1000, size=200 * _MB)
+        readahead.on_read(second, 50 * _MB, 50 * _MB + 1000, size=200 * _MB)
+        await asyncio.sleep(0)
+        assert len(_in_flight(readahead)) == 2
+
+        # 一个读取者跳转不影响另一个读取者的预读
+        readahead.on_read(second, 100 * _MB, 100 * _MB + 1000, size=200 * _MB)
+        await asyncio.sleep(0)
+        assert len(_in_flight(readahead)) == 2
+        assert readahead.stats()["cancelled"] == 1
+        assert {session for session, _, _ in fetches} == {"user:1", "10.0.0.2"}
+        for task in _in_flight(readahead):
+            task.cancel()
+
+    asyncio.run(run())
+
@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from vis3.internal.client.gzip_members import GzipMemberIndexBuilder
+from vis3.internal.client.row_scan import RowScanner
+from vis3.internal.client.scan_worker import (ScanSpec, profile_block, scan_block,
+                                              scan_compressed_block)
+
+
+def _gzip_members(text: bytes, member_size: int) -> bytes:
+    """按固定的解压后大小切分 member，行跨越 member 边界（类似 BGZF）"""
+    return b"".join(
+        gzip.compress(text[i : i + member_size]) for i in range(0, len(text), member_size)
+    )
+
+
+def _groups(data: bytes, block_size: int) -> list:
+    builder = GzipMemberIndexBuilder()
+    builder.feed(data)
+    members = builder.finish()
+
+    async def read_range(start: int, end: int) -> bytes:
+        return data[start:end]
+
+    async def collect():
+        reader = SimpleNamespace(read_range=read_range)
+        progress = {"bytes": 0}
+        groups = [
+            group
+            async for group in RowScanner(0, block_size)._iter_member_groups(
+                reader, members, progress
+            )
+        ]
+        assert progress["bytes"] == len(data)
+        return groups
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("block_size", [1, 700, 5000, 1 << 20])
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_member_groups_split_unaligned_members(block_size, trailing_newline):
+    text = b"".join(b'{"id": %d, "text": "%s"}\n' % (i, b"y" * (i % 300 if i % 100 else 5000)) for i in range(2000))
+    text += b"" if trailing_newline else b'{"id": -1}'
+    data = _gzip_members(text, 1000)
+    spec = ScanSpec(contains="1")
+
+    groups = _groups(data, block_size)
+    if block_size < 1 << 20:
+        assert max(len(group.data) for group, _ in groups) < block_size + 4000
+
+    lines = 0
+    matches = []
+    rows = 0
+    for group, base in groups:
+        count, found = scan_compressed_block("gzip", spec, group, len(text))
+        matches += [(lines + line_no, base + start, base + end, content) for line_no, start, end, content in found]
+        lines += count
+        rows += profile_block("gzip", group, 10)["rows"]
+
+    expected_lines, expected = scan_block(spec, text, len(text))
+    assert lines == expected_lines
+    assert matches == [(line_no, start, end, text[start:end]) for line_no, start, end in expected]
+    assert rows == expected_lines
+
+
+def test_profile_counts_blank_lines_as_rows():
+    text = b'{"a": 1}\n\r\n\n[1]\nnot json\n{"a": null}'
+    part = profile_block(None, text, 10)
+    expected_lines, _ = scan_block(ScanSpec(contains="a"), text, len(text))
+    assert part["rows"] == expected_lines == 6
+    assert part["empty"] == 2
+    assert (part["invalid"], part["non_object"]) == (1, 1)
+    assert part["fields"] == {"a": {"int": 1, "null": 1}}
+
+    blank = profile_block(None, b"\n\n", 10)
+    assert (blank["rows"], blank["empty"], blank["min"]) == (2, 2, None)
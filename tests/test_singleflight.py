@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from vis3.internal.client.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+        assert results == [1] * 5
+        # 上一次调用完成后重新发起
+        assert await flight.do("k", fetch) == 2
+
+    asyncio.run(run())
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "shared": 4, "cancelled": 0}
+
+
+def test_exception_is_shared():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError("missing")
+
+    async def run():
+        results = await asyncio.gather(
+            *(flight.do("k", fail) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, KeyError) for result in results)
+
+    asyncio.run(run())
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def run():
+        gate = asyncio.Event()
+        upstream_cancelled = False
+
+        async def fetch():
+            nonlocal upstream_cancelled
+            try:
+                await gate.wait()
+            except asyncio.CancelledError:
+                upstream_cancelled = True
+                raise
+            return "value"
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        gate.set()
+        assert await second == "value"
+        assert not upstream_cancelled
+
+    asyncio.run(run())
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_cancelling_all_waiters_cancels_upstream_call():
+    flight = SingleFlight()
+
+    async def run():
+        started = asyncio.Event()
+        upstream_cancelled = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("k", fetch)) for _ in range(3)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+        assert flight.stats()["in_flight"] == 0
+
+        # 取消后同一 key 的新调用重新发起上游请求
+        async def fetch_again():
+            return "fresh"
+
+        assert await flight.do("k", fetch_again) == "fresh"
+
+    asyncio.run(run())
+    assert flight.stats()["leaders"] == 2
+    assert flight.stats()["cancelled"] == 1
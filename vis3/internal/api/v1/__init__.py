@@ -4,6 +4,7 @@ from vis3.internal.config import settings
 from .endpoints.auth import router as auth_router
 from .endpoints.bucket import router as bucket_router
 from .endpoints.keychain import router as keychain_router
+from .endpoints.system import router as system_router
 
 v1_router = APIRouter(prefix="/v1")
 
@@ -12,4 +13,5 @@ if settings.ENABLE_AUTH:
     v1_router.include_router(auth_router)
     
 v1_router.include_router(bucket_router)
-v1_router.include_router(keychain_router)
\ No newline at end of file
+v1_router.include_router(keychain_router)
+v1_router.include_router(system_router)
\ No newline at end of file
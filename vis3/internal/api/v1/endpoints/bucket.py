@@ -10,7 +10,8 @@ from vis3.internal.api.v1.schema.request.bucket import (BucketCreateBody,
                                                         BucketUpdatePayload)
 from vis3.internal.api.v1.schema.response import (ItemResponse, ListResponse,
                                                   OkResponse)
-from vis3.internal.api.v1.schema.response.bucket import (BucketResponse,
+from vis3.internal.api.v1.schema.response.bucket import (BucketListResponse,
+                                                         BucketResponse,
                                                          PathType)
 from vis3.internal.common.db import get_db
 from vis3.internal.common.exceptions import AppEx, ErrorCode
@@ -19,7 +20,10 @@ from vis3.internal.crud.bucket import bucket_crud
 from vis3.internal.crud.keychain import keychain_crud
 from vis3.internal.models.user import User
 from vis3.internal.service.bucket import (get_bucket, get_buckets_or_objects,
-                                          preview_file)
+                                          get_gzip_members,
+                                          invalidate_bucket_caches,
+                                          preview_file, stream_key_search,
+                                          stream_path_size, stream_row_scan)
 from vis3.internal.utils import ping_host, validate_path_accessibility
 from vis3.internal.utils.path import (accurate_s3_path, is_s3_path,
                                       split_s3_path)
@@ -30,7 +34,11 @@ router = APIRouter(tags=["buckets"])
 @router.get(
     "/bucket",
     summary="获取所有 bucket 列表",
-    response_model=Union[ListResponse[BucketResponse], ItemResponse[BucketResponse]],
+    response_model=Union[
+        BucketListResponse,
+        ListResponse[BucketResponse],
+        ItemResponse[BucketResponse],
+    ],
 )
 async def read_bucket_request(
     request: Request,
@@ -38,21 +46,36 @@ async def read_bucket_request(
     path: str = None,
     page_no: int = 1,
     page_size: int = 10,
+    cursor: str | None = None,
+    sort: str | None = None,
+    start_after: str | None = None,
     db: Session = Depends(get_db),
     current_user: User | None = Depends(get_auth_user_or_error),
 ):
     """
-    获取指定 bucket 下的所有对象
+    获取指定 bucket 下的所有对象，目录可以通过上一页返回的 cursor 直接获取下一页。
+
+    sort 可选 key、size、last_modified，前面加 - 表示倒序，需要开启本地列表索引。
+    start_after 为当前目录下的名称或完整的 key，直接从该 key 之后开始列出，之后通过 cursor 继续翻页。
     """
     path = accurate_s3_path(path)
+    # 顺序预读按用户（未登录时按客户端地址）区分读取流
+    if current_user:
+        session = f"user:{current_user.id}"
+    else:
+        session = request.client.host if request.client else None
 
     result = await get_buckets_or_objects(
         path=path,
         id=id,
         page_no=page_no,
         page_size=page_size,
+        cursor=cursor,
+        sort=sort,
+        start_after=start_after,
         db=db,
         user_id=current_user.id if current_user else None,
+        session=session,
     )
 
     return result
@@ -105,6 +128,7 @@ async def update_bucket_request(
     """
     更新bucket
     """
+    await invalidate_bucket_caches(await bucket_crud.get(db, id=id))
     result = await bucket_crud.update(db, id=id, obj_in=BucketUpdatePayload(
         **bucket_in.model_dump(),
         updated_by=current_user.id if current_user else None,
@@ -210,6 +234,120 @@ async def make_ping_request(url: str):
     return OkResponse(data=result)
 
 
+@router.get("/bucket/size", summary="获取路径的大小")
+async def get_path_size_request(
+    path: str,
+    id: int | None = None,
+    refresh: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    递归统计路径下文件的总大小、数量以及按扩展名的分布，以 NDJSON 流式返回累计值，最后一行 done 为 true。
+
+    refresh 为 true 时忽略缓存，重新列出所有目录。
+    """
+    path = accurate_s3_path(path)
+
+    return await stream_path_size(path=path, db=db, id=id, refresh=refresh)
+
+
+@router.get("/bucket/search", summary="搜索 key")
+async def search_keys_request(
+    path: str,
+    pattern: str,
+    id: int | None = None,
+    mode: str = "glob",
+    limit: int = 100,
+    recursive: bool = True,
+    ignore_case: bool = False,
+    format: str = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    在目录下按名称搜索对象，边列出边返回匹配的结果。
+
+    mode 为 glob（默认，不含 / 时只匹配文件名）或 regex；format 为 ndjson（默认）或 sse。
+    """
+    path = accurate_s3_path(path)
+
+    return await stream_key_search(
+        path=path,
+        pattern=pattern,
+        db=db,
+        id=id,
+        mode=mode,
+        limit=limit,
+        recursive=recursive,
+        ignore_case=ignore_case,
+        format=format,
+    )
+
+
+@router.get("/bucket/scan", summary="按条件过滤文件中的行")
+async def scan_rows_request(
+    path: str,
+    id: int | None = None,
+    field: str | None = None,
+    op: str = "eq",
+    value: str | None = None,
+    contains: str | None = None,
+    regex: str | None = None,
+    ignore_case: bool = False,
+    limit: int = 100,
+    format: str = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    在服务端逐行过滤 JSONL / 文本文件（支持 gzip、zstd、xz、bz2、lz4 压缩），边读取边返回匹配的行。
+
+    field 为以 . 分隔的 JSON 字段路径，op 为 eq、ne、contains、regex、exists、gt、gte、lt、lte，
+    value 按 JSON 解析（例如 3、true、"en"、["a", "b"]），解析失败时作为字符串；contains / regex 直接匹配原始行。
+    多个条件同时给出时需要全部满足。format 为 ndjson（默认）或 sse。
+    """
+    path = accurate_s3_path(path)
+
+    return await stream_row_scan(
+        path=path,
+        db=db,
+        id=id,
+        field=field,
+        op=op,
+        value=value,
+        contains=contains,
+        regex=regex,
+        ignore_case=ignore_case,
+        limit=limit,
+        format=format,
+    )
+
+
+@router.get("/bucket/members", summary="获取压缩文件的 member 索引")
+async def get_gzip_members_request(
+    path: str,
+    id: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+    refresh: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    获取多 member 压缩文件（.jsonl.gz、.warc.gz、BGZF、多 frame 的 zstd / lz4 等）各 member 的压缩位置、解压位置与行数。
+
+    索引不存在时在后台建立并返回任务 job_id，可通过 /system/jobs/{id} 查询进度；refresh 为 true 时重新建立。
+    """
+    path = accurate_s3_path(path)
+
+    return OkResponse(
+        data=await get_gzip_members(
+            path=path, db=db, id=id, offset=offset, limit=limit, refresh=refresh
+        )
+    )
+
+
 @router.get("/bucket/{id}", summary="获取bucket详情", response_model=BucketResponse)
 async def get_bucket_request(
     id: int,
@@ -245,12 +383,6 @@ async def delete_bucket_request(
     """
     删除bucket
     """
+    await invalidate_bucket_caches(await bucket_crud.get(db, id=id))
     await bucket_crud.delete(db, id=id)
     return OkResponse()
-
-
-
-# TODO: 删除此接口
-@router.get("/bucket/size", summary="获取路径的大小")
-async def get_path_size_request():
-    pass
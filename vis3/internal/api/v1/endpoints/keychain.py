@@ -10,6 +10,7 @@ from vis3.internal.api.v1.schema.request.keychain import (
 )
 from vis3.internal.api.v1.schema.response import ListResponse
 from vis3.internal.api.v1.schema.response.keychain import KeyChainResponse
+from vis3.internal.client.transport import invalidate_s3_clients
 from vis3.internal.common.db import get_db
 from vis3.internal.common.exceptions import AppEx, ErrorCode
 from vis3.internal.crud.keychain import keychain_crud
@@ -147,6 +148,7 @@ async def update_keychain(
             status_code=status.HTTP_403_FORBIDDEN,
         )
     
+    invalidate_s3_clients(access_key_id=keychain.access_key_id)
     keychain = await keychain_crud.update(db=db, id=keychain_id, obj_in=keychain_in)
     return make_keychain_response(keychain)
 
@@ -174,5 +176,6 @@ async def delete_keychain(
             status_code=status.HTTP_403_FORBIDDEN,
         )
     
+    invalidate_s3_clients(access_key_id=keychain.access_key_id)
     keychain = await keychain_crud.delete(db=db, id=keychain_id)
     return make_keychain_response(keychain)
\ No newline at end of file
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, status
+
+from vis3.internal.api.dependencies.auth import get_auth_user_or_error
+from vis3.internal.api.v1.schema.response import OkResponse
+from vis3.internal.client.block_cache import block_cache
+from vis3.internal.client.cache_backend import cache_backend
+from vis3.internal.client.executor import (cpu_executor, endpoint_limiter,
+                                           gzip_executor, s3_io_executor)
+from vis3.internal.client.list_cursor import list_cursor_cache
+from vis3.internal.client.meta_cache import object_meta_cache
+from vis3.internal.client.pool import s3_client_pool
+from vis3.internal.client.prefix_stats import prefix_counter, prefix_sizer
+from vis3.internal.client.readahead import readahead
+from vis3.internal.client.singleflight import s3_single_flight
+from vis3.internal.common.exceptions import AppEx, ErrorCode
+from vis3.internal.common.jobs import job_registry
+from vis3.internal.models.user import User
+
+router = APIRouter(tags=["system"])
+
+
+@router.get("/system/stats", summary="获取运行时指标")
+async def get_runtime_stats_request(
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    获取线程池、endpoint 并发、client 池以及缓存的运行时指标
+    """
+    return OkResponse(
+        data={
+            "executors": {
+                "s3_io": s3_io_executor.stats(),
+                "cpu": cpu_executor.stats(),
+                "indexed_gzip": gzip_executor.stats(),
+            },
+            "endpoints": endpoint_limiter.stats(),
+            "client_pool": s3_client_pool.stats(),
+            "block_cache": block_cache.stats(),
+            "meta_cache": object_meta_cache.stats(),
+            "list_cursors": list_cursor_cache.stats(),
+            "prefix_stats": prefix_counter.stats(),
+            "prefix_sizes": prefix_sizer.stats(),
+            "row_cache": cache_backend.stats() if cache_backend else None,
+            "single_flight": s3_single_flight.stats(),
+            "readahead": readahead.stats(),
+            "jobs": job_registry.stats(),
+        }
+    )
+
+
+@router.get("/system/jobs", summary="获取后台任务列表")
+async def get_jobs_request(
+    kind: str | None = None,
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    """
+    获取后台任务（目录计数、索引刷新等）及其进度
+    """
+    return OkResponse(data=[job.to_dict() for job in job_registry.list(kind)])
+
+
+@router.get("/system/jobs/{job_id}", summary="获取后台任务进度")
+async def get_job_request(
+    job_id: str,
+    current_user: User | None = Depends(get_auth_user_or_error),
+):
+    job = job_registry.get(job_id)
+    if job is None:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return OkResponse(data=job.to_dict())
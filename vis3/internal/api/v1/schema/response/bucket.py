@@ -3,6 +3,8 @@ from enum import StrEnum
 
 from pydantic import BaseModel
 
+from vis3.internal.api.v1.schema.response import ListResponse
+
 
 class PathType(StrEnum):
     Bucket = "bucket"
@@ -10,6 +12,11 @@ class PathType(StrEnum):
     File = "file"
 
 
+class RowResponse(BaseModel):
+    content: str
+    path: str
+
+
 class BucketResponse(BaseModel):
     # common
     id: int
@@ -25,4 +32,21 @@ class BucketResponse(BaseModel):
     content: str | None = None
     last_modified: datetime | None = None
     keychain_id: int | None = None
-    keychain_name: str | None = None
\ No newline at end of file
+    keychain_name: str | None = None
+    # 批量读取（lines=K）时的各行内容与位置
+    rows: list[RowResponse] | None = None
+    # JSONL 文件概况：统计完成时 state 为 done，包含行数、行长度分布与字段信息；否则为后台任务的 state、job_id 与进度。
+    # 路径带 profile=1 时才会开始统计，否则只返回已有的结果或进行中的任务。
+    # rows 与行索引、row=N 一致，包含空行（另见 empty_rows）；行长度与字段只统计非空行
+    profile: dict | None = None
+
+
+class BucketListResponse(ListResponse[BucketResponse]):
+    # 目录下一页的游标，没有更多数据时为空
+    cursor: str | None = None
+    # 目录数据来源：index 为本地列表索引，live 为直接列出 S3
+    source: str | None = None
+    # exact：total 为目录子项总数；estimating：后台计数中，total 为目前已知的下限
+    total_state: str | None = None
+    # 后台计数任务 id，可通过 /system/jobs/{id} 查询进度
+    total_job_id: str | None = None
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple
+
+from vis3.internal.config import settings
+
+
+class ObjectKey(NamedTuple):
+    endpoint: str | None
+    bucket: str
+    key: str
+    version: str
+
+
+class BlockCache:
+    """
+    进程级字节块缓存。
+
+    对象按 block_size 对齐切块，以 (endpoint, bucket, key, ETag/version, 块序号) 为键，
+    超过字节预算后按 LRU 淘汰。对象更新后 ETag 变化，旧块不会再被命中并逐渐被淘汰。
+    """
+
+    def __init__(self, block_size: int, max_bytes: int):
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self._blocks: OrderedDict[tuple[ObjectKey, int], bytes] = OrderedDict()
+        self._lock = Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.block_size > 0
+
+    def get(self, obj: ObjectKey, index: int) -> bytes | None:
+        with self._lock:
+            block = self._blocks.get((obj, index))
+            if block is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end((obj, index))
+            self.hits += 1
+            return block
+
+    def put(self, obj: ObjectKey, index: int, block: bytes):
+        if not self.enabled or len(block) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._blocks.pop((obj, index), None)
+            if old is not None:
+                self.size -= len(old)
+            self._blocks[(obj, index)] = block
+            self.size += len(block)
+
+            while self.size > self.max_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(
+        self,
+        endpoint: str | None = None,
+        bucket: str | None = None,
+        key: str | None = None,
+    ):
+        with self._lock:
+            for cache_key in list(self._blocks.keys()):
+                obj = cache_key[0]
+                if endpoint is not None and obj.endpoint != endpoint:
+                    continue
+                if bucket is not None and obj.bucket != bucket:
+                    continue
+                if key is not None and obj.key != key:
+                    continue
+                self.size -= len(self._blocks.pop(cache_key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "block_size": self.block_size,
+                "max_bytes": self.max_bytes,
+                "size": self.size,
+                "blocks": len(self._blocks),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+            }
+
+
+block_cache = BlockCache(
+    block_size=settings.S3_BLOCK_SIZE,
+    max_bytes=settings.S3_BLOCK_CACHE_MAX_BYTES,
+)
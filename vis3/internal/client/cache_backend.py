@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+
+from loguru import logger
+
+from vis3.internal.client.transport import run_in_executor
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+from vis3.internal.utils.sqlite import ThreadLocalSqlite
+
+
+class CacheBackend(ABC):
+    """
+    字符串键值缓存的统一接口，接口形式与 redis 的 get / set(ex=) 保持一致。
+
+    缓存只用于加速：后端出错时记录日志并按未命中处理，不影响正常读取。
+    """
+
+    name: str = ""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> str | None:
+        try:
+            value = await self._get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"{self.name} cache get failed: {e}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ex: int | None = None):
+        try:
+            await self._set(key, value, ex)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"{self.name} cache set failed: {e}")
+
+    async def delete_prefix(self, prefix: str):
+        """删除以 prefix 开头的所有 key"""
+        try:
+            await self._delete_prefix(prefix)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"{self.name} cache delete failed: {e}")
+
+    @abstractmethod
+    async def _get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    async def _set(self, key: str, value: str, ex: int | None): ...
+
+    @abstractmethod
+    async def _delete_prefix(self, prefix: str): ...
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内 LRU，每个 worker 各自一份"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: int):
+        super().__init__()
+        self._cache: TTLCache[str] = TTLCache(max_size=max_entries, ttl=ttl)
+
+    async def _get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def _set(self, key: str, value: str, ex: int | None):
+        self._cache.set(key, value, ttl=ex)
+
+    async def _delete_prefix(self, prefix: str):
+        self._cache.invalidate(lambda key: key.startswith(prefix))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": self._cache.stats()["size"]}
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    基于 SQLite 的磁盘缓存，重启后保留，同一台机器上的多个 uvicorn worker 共享。
+
+    过期时间使用墙上时间以便跨进程比较，读写在 I/O 线程池中执行。
+    """
+
+    name = "disk"
+
+    _TRIM_INTERVAL = 256
+
+    def __init__(self, path: str, max_entries: int, ttl: int):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._db = ThreadLocalSqlite(
+            path,
+            [
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)",
+            ],
+        )
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._db.connect()
+
+    def _get_sync(self, key: str) -> str | None:
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_sync(self, key: str, value: str, ex: int | None):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + (ex or self.ttl)),
+        )
+        self._writes += 1
+        if self._writes % self._TRIM_INTERVAL == 0:
+            self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection):
+        """清理过期数据，超过容量时按过期时间从早到晚淘汰"""
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires_at "
+            "LIMIT max((SELECT COUNT(*) FROM cache) - ?, 0))",
+            (self.max_entries,),
+        )
+
+    def _delete_prefix_sync(self, prefix: str):
+        self._connect().execute(
+            "DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+
+    async def _get(self, key: str) -> str | None:
+        return await run_in_executor(self._get_sync, key)
+
+    async def _set(self, key: str, value: str, ex: int | None):
+        await run_in_executor(self._set_sync, key, value, ex)
+
+    async def _delete_prefix(self, prefix: str):
+        await run_in_executor(self._delete_prefix_sync, prefix)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "path": self.path}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 协议缓存，多台机器上的 worker 共享。
+
+    需要安装 redis；client 可以传入任何兼容 redis.asyncio 接口的对象（例如本地的替身实现）。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: int, client=None):
+        super().__init__()
+        self.url = url
+        self.ttl = ttl
+        self._client = client
+
+    def _get_client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    async def _get(self, key: str) -> str | None:
+        value = await self._get_client().get(key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    async def _set(self, key: str, value: str, ex: int | None):
+        await self._get_client().set(key, value, ex=ex or self.ttl)
+
+    async def _delete_prefix(self, prefix: str):
+        client = self._get_client()
+        pattern = "".join(f"\\{c}" if c in "*?[]\\" else c for c in prefix) + "*"
+        keys = []
+        async for key in client.scan_iter(match=pattern, count=500):
+            keys.append(key)
+            if len(keys) >= 500:
+                await client.delete(*keys)
+                keys = []
+        if keys:
+            await client.delete(*keys)
+
+
+def create_cache_backend(kind: str | None = None) -> CacheBackend | None:
+    """
+    按 CACHE_BACKEND 创建缓存后端，为 none 时返回 None 表示不缓存。
+    """
+    kind = (kind or settings.CACHE_BACKEND).lower()
+    ttl = settings.ROW_CACHE_TTL
+
+    if kind == "none":
+        return None
+
+    if kind == "redis":
+        try:
+            import redis  # noqa: F401
+
+            return RedisCacheBackend(settings.CACHE_REDIS_URL, ttl=ttl)
+        except ModuleNotFoundError:
+            logger.warning(
+                "CACHE_BACKEND is redis but redis is not installed "
+                "(pip install vis3[redis]), falling back to the in-process cache"
+            )
+            kind = "memory"
+
+    if kind == "disk":
+        path = settings.CACHE_DISK_PATH or os.path.join(
+            settings.BASE_DATA_DIR, "vis3.cache.sqlite"
+        )
+        return SqliteCacheBackend(path, max_entries=settings.CACHE_MAX_ENTRIES, ttl=ttl)
+
+    if kind != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND {kind}, using the in-process cache")
+
+    return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES, ttl=ttl)
+
+
+cache_backend = create_cache_backend()
@@ -0,0 +1,384 @@
+import bz2
+import lzma
+import zlib
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+BZ2_MAGIC = b"BZh"
+LZ4_MAGIC = b"\x04\x22\x4d\x18"
+
+# bz2 / xz / lz4 / zstd 解压器会把输入复制到内部缓冲，每次最多交给解压器的压缩数据
+_INPUT_STEP = 64 << 10
+
+
+class _ChunkedDecompressObj:
+    """
+    把 bz2 / xz / lz4 的解压器包装成与 zlib.decompressobj 相同的接口：
+    每次最多输出 max_length 字节，还没交给解压器的输入放在 unconsumed_tail 中；流结束后的数据放在 unused_data 中。
+
+    输出达到 max_length 时剩余的输出留在解压器中（needs_input 为 False）。如果此时输入已经全部交给解压器，
+    unconsumed_tail 中放回一个已交出的字节作为占位，调用方照常传回时跳过，保证调用方会继续调用直到取完输出。
+    """
+
+    def __init__(self, decompressor):
+        self._decompressor = decompressor
+        self._placeholder = b""
+        self.unconsumed_tail = b""
+        self.unused_data = b""
+        self.eof = False
+
+    def _needs_input(self) -> bool:
+        return self._decompressor.needs_input
+
+    def _stream_end(self) -> bool:
+        return self._decompressor.eof
+
+    def _decompress(self, data: bytes, max_length: int) -> tuple[bytes, bytes]:
+        """返回 (输出, 没有交给解压器的输入)"""
+        return self._decompressor.decompress(data, max_length), b""
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        placeholder, self._placeholder = self._placeholder, b""
+        data = data[len(placeholder) :]
+        if self._needs_input():
+            head, tail = data[:_INPUT_STEP], data[_INPUT_STEP:]
+        else:
+            head, tail = b"", data
+
+        # zlib 中 max_length 为 0 表示不限制，其它解压器为 -1
+        output, rest = self._decompress(head, max_length or -1)
+        tail = rest + tail if rest else tail
+
+        if self._stream_end():
+            self.eof = True
+            self.unused_data = self._decompressor.unused_data + tail
+            self.unconsumed_tail = b""
+        elif not tail and not self._needs_input():
+            self._placeholder = (head or placeholder)[-1:]
+            self.unconsumed_tail = self._placeholder
+        else:
+            self.unconsumed_tail = tail
+        return output
+
+
+class _ZstdFrameParser:
+    """
+    解析单个 zstd frame 的结构，找出每个 block 结束的位置。
+    block 是 zstd 解压的最小单位，单个 block 解压后不超过 128KB。
+    """
+
+    def __init__(self):
+        self._state = "header"
+        self._header = b""
+        self._need = 0
+        self._last = False
+        self._checksum = False
+
+    def _read_header(self, data: bytes, pos: int, size: int) -> int:
+        """把 data[pos:] 读入头部缓冲直到凑满 size 字节，返回新的位置"""
+        take = min(size - len(self._header), len(data) - pos)
+        self._header += data[pos : pos + take]
+        return pos + take
+
+    def next_step(self, data: bytes) -> int:
+        """返回本次应交给解压器的字节数：到下一个 block 结束为止，data 不够时为全部"""
+        pos = 0
+        while pos < len(data):
+            if self._state == "end":
+                return len(data)
+
+            if self._state == "header":
+                pos = self._read_header(data, pos, 5)
+                if len(self._header) < 5:
+                    break
+                if _is_skippable_frame(self._header):
+                    # 可跳过帧中没有数据，整个交给解压器
+                    self._state = "end"
+                    continue
+                descriptor = self._header[4]
+                single_segment = descriptor >> 5 & 1
+                self._checksum = bool(descriptor >> 2 & 1)
+                self._need = (
+                    (0 if single_segment else 1)
+                    + (0, 1, 2, 4)[descriptor & 3]
+                    + (single_segment, 2, 4, 8)[descriptor >> 6]
+                )
+                self._header = b""
+                self._state = "frame_header"
+            elif self._state == "block_header":
+                pos = self._read_header(data, pos, 3)
+                if len(self._header) < 3:
+                    break
+                value = int.from_bytes(self._header, "little")
+                self._header = b""
+                self._last = bool(value & 1)
+                # RLE block 的内容只有 1 字节
+                self._need = 1 if value >> 1 & 3 == 1 else value >> 3
+                self._state = "block"
+            else:
+                take = min(self._need, len(data) - pos)
+                pos += take
+                self._need -= take
+                if self._need:
+                    break
+                if self._state == "frame_header":
+                    self._state = "block_header"
+                elif self._state == "block":
+                    if self._last:
+                        self._need = 4 if self._checksum else 0
+                        self._state = "checksum"
+                    else:
+                        self._state = "block_header"
+                    return pos
+                else:
+                    self._state = "end"
+                    return pos
+        return pos
+
+
+class _ZstdDecompressObj(_ChunkedDecompressObj):
+    """
+    zstd 解压器不支持限制输出长度，按 block 逐个交给解压器，输出达到 max_length 即停止；
+    最后一个 block 超出 max_length 的部分暂存，下次调用时输出。
+    """
+
+    def __init__(self):
+        import zstandard
+
+        super().__init__(zstandard.ZstdDecompressor().decompressobj())
+        self._frame = _ZstdFrameParser()
+        self._buffer = b""
+
+    def _needs_input(self) -> bool:
+        return not self._buffer
+
+    def _stream_end(self) -> bool:
+        return self._decompressor.eof and not self._buffer
+
+    def _decompress(self, data: bytes, max_length: int) -> tuple[bytes, bytes]:
+        output = [self._buffer] if self._buffer else []
+        produced = len(self._buffer)
+        pos = 0
+        while pos < len(data) and (max_length < 0 or produced < max_length):
+            if self._decompressor.eof:
+                break
+            step = self._frame.next_step(data[pos:])
+            block = self._decompressor.decompress(data[pos : pos + step])
+            output.append(block)
+            produced += len(block)
+            pos += step
+
+        result = b"".join(output)
+        if 0 <= max_length < len(result):
+            result, self._buffer = result[:max_length], result[max_length:]
+        else:
+            self._buffer = b""
+        return result, data[pos:]
+
+
+def _new_lz4_decompressor():
+    import lz4.frame
+
+    return _ChunkedDecompressObj(lz4.frame.LZ4FrameDecompressor())
+
+
+class Codec:
+    """
+    压缩格式。文件可以由多个独立的流（gzip member、zstd / lz4 frame、bz2 / xz stream）拼接而成，
+    decompressobj() 返回解压单个流的 zlib 风格解压器，流结束后由调用方为下一个流新建解压器。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        extensions: tuple[str, ...],
+        magic: bytes,
+        mimetype: str,
+        factory,
+        module: str | None = None,
+        skippable_frames: bool = False,
+    ):
+        self.name = name
+        self.extensions = extensions
+        self.magic = magic
+        self.mimetype = mimetype
+        # 需要额外安装的依赖
+        self.module = module
+        # 流之间可能有可跳过帧（zstd 的 skippable frame，例如 seekable 格式的 seek table），作为一个空的流
+        self.skippable_frames = skippable_frames
+        self._factory = factory
+        self._available: bool | None = None if module else True
+
+    @property
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                __import__(self.module)
+                self._available = True
+            except ModuleNotFoundError:
+                self._available = False
+        return self._available
+
+    def decompressobj(self):
+        return self._factory()
+
+    def is_stream_start(self, data: bytes) -> bool:
+        """data 是否为下一个流的开头；data 比 magic 短时只要是 magic 的前缀就认为是，等待更多数据"""
+        if self.is_skippable(data):
+            return True
+        return data.startswith(self.magic) or self.magic.startswith(data)
+
+    def is_skippable(self, data: bytes) -> bool:
+        """data 是否为可跳过帧的开头，可跳过帧中没有数据"""
+        return self.skippable_frames and _is_skippable_frame(data)
+
+
+def _is_skippable_frame(data: bytes) -> bool:
+    # zstd 可跳过帧的 magic 为 0x184D2A50 ~ 0x184D2A5F（小端）
+    return bool(data) and data[0] & 0xF0 == 0x50 and b"\x2a\x4d\x18".startswith(data[1:4])
+
+
+GZIP = Codec(
+    "gzip",
+    (".gz",),
+    GZIP_MAGIC,
+    "application/gzip",
+    lambda: zlib.decompressobj(32 + zlib.MAX_WBITS),
+)
+ZSTD = Codec(
+    "zstd",
+    (".zst", ".zstd"),
+    ZSTD_MAGIC,
+    "application/zstd",
+    _ZstdDecompressObj,
+    module="zstandard",
+    skippable_frames=True,
+)
+XZ = Codec(
+    "xz",
+    (".xz",),
+    XZ_MAGIC,
+    "application/x-xz",
+    lambda: _ChunkedDecompressObj(lzma.LZMADecompressor()),
+)
+BZ2 = Codec(
+    "bz2",
+    (".bz2",),
+    BZ2_MAGIC,
+    "application/x-bzip2",
+    lambda: _ChunkedDecompressObj(bz2.BZ2Decompressor()),
+)
+LZ4 = Codec(
+    "lz4",
+    (".lz4",),
+    LZ4_MAGIC,
+    "application/x-lz4",
+    _new_lz4_decompressor,
+    module="lz4",
+)
+
+CODECS = {codec.name: codec for codec in (GZIP, ZSTD, XZ, BZ2, LZ4)}
+COMPRESSED_EXTENSIONS = tuple(ext for codec in CODECS.values() for ext in codec.extensions)
+
+
+def get_codec(key: str) -> Codec | None:
+    """根据扩展名返回压缩格式，未压缩的文件返回 None"""
+    lower = key.lower()
+    for codec in CODECS.values():
+        if lower.endswith(codec.extensions):
+            return codec
+    return None
+
+
+def strip_codec_extension(key: str) -> str:
+    """去掉压缩扩展名，例如 a.jsonl.zst -> a.jsonl"""
+    codec = get_codec(key)
+    if codec is None:
+        return key
+    lower = key.lower()
+    for ext in codec.extensions:
+        if lower.endswith(ext):
+            return key[: -len(ext)]
+    return key
+
+
+class StreamDecompressor:
+    """
+    增量解压器，支持多个流拼接的文件。
+
+    输入按块喂入，每次调用最多输出 max_block_size 字节，
+    未消费的输入保留在内部，因此压缩比很高的数据也不会一次性占用大量内存。
+    """
+
+    def __init__(self, codec: Codec, max_block_size: int = 1 << 20):
+        self.codec = codec
+        self.max_block_size = max_block_size
+        self._decompressor = codec.decompressobj()
+        self._pending = b""
+        self._finished = False
+
+    @property
+    def needs_input(self) -> bool:
+        """内部缓冲已经消费完，需要喂入新的压缩数据"""
+        return self._finished or not self._pending
+
+    @property
+    def finished(self) -> bool:
+        """遇到无法识别的尾部数据（例如填充的 0），后续输入会被忽略"""
+        return self._finished
+
+    def decompress(self, data: bytes = b"") -> bytes:
+        if self._finished:
+            return b""
+
+        if data:
+            self._pending = self._pending + data if self._pending else data
+
+        output = []
+        produced = 0
+
+        while self._pending and produced < self.max_block_size:
+            block = self._decompressor.decompress(
+                self._pending, self.max_block_size - produced
+            )
+            output.append(block)
+            produced += len(block)
+
+            if self._decompressor.eof:
+                # 当前流结束，剩余数据可能是下一个流
+                rest = self._decompressor.unused_data
+                self._decompressor = self.codec.decompressobj()
+                if rest and not self.codec.is_stream_start(rest):
+                    self._pending = b""
+                    self._finished = True
+                    break
+                self._pending = rest
+            else:
+                self._pending = self._decompressor.unconsumed_tail
+                if not block and not self._pending:
+                    break
+
+        return b"".join(output)
+
+
+class LineSplitter:
+    """
+    将连续的数据块切分为完整的行，跨块的半行会保留到下一次调用。
+    """
+
+    def __init__(self):
+        self._carry = b""
+
+    def feed(self, data: bytes) -> list[bytes]:
+        if not data:
+            return []
+
+        data = self._carry + data if self._carry else data
+        lines = data.split(b"\n")
+        self._carry = lines.pop()
+        return lines
+
+    def flush(self) -> list[bytes]:
+        carry, self._carry = self._carry, b""
+        return [carry] if carry else []
@@ -0,0 +1,166 @@
+"""
+按对象版本（ETag）保存在本地的派生数据：行索引、gzip 索引、member 索引与文件概况。
+
+文件名只由 endpoint、bucket 与 key 决定，文件开头记录生成它的 ETag：对象被覆盖后新版本的结果直接替换旧文件，
+ETag 不一致的文件视为不存在。读取时更新文件的修改时间，目录超过大小上限或文件长时间未被使用时按修改时间清理。
+"""
+
+import hashlib
+import os
+import struct
+import time
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+from loguru import logger
+
+from vis3.internal.client.transport import run_in_executor
+from vis3.internal.common.jobs import Job, job_registry
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+T = TypeVar("T")
+
+# ETag 长度，之后依次为 ETag 与内容
+_HEADER = struct.Struct("<H")
+# 两次清理之间的最短间隔（秒）
+_SWEEP_INTERVAL = 600
+
+
+class ETagStore(Generic[T]):
+    """
+    子类提供 kind（后台任务类型）、suffix（文件后缀）、_dumps / _loads 与 build；
+    _loads 遇到损坏的内容时抛出 ValueError 或 struct.error，对应的文件会被删除。
+    """
+
+    kind: str
+    suffix: str
+
+    def __init__(
+        self,
+        path: str,
+        max_loaded: int,
+        max_bytes: int,
+        max_age: int,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._loaded: TTLCache[T] = TTLCache(max_size=max_loaded, ttl=3600)
+        self._swept_at: float | None = None
+
+    def _dumps(self, value: T) -> bytes:
+        raise NotImplementedError
+
+    def _loads(self, data: bytes) -> T:
+        raise NotImplementedError
+
+    async def build(self, reader: "S3Reader", etag: str, job: Job | None = None) -> T:
+        raise NotImplementedError
+
+    @staticmethod
+    def _key(reader: "S3Reader", etag: str) -> tuple:
+        return reader.endpoint_url or "", reader.bucket_name, reader.key_without_query, etag
+
+    def _file(self, key: tuple) -> str:
+        # 不含 ETag，同一对象的各个版本使用同一个文件
+        digest = hashlib.sha256("|".join(key[:-1]).encode("utf-8")).hexdigest()
+        return os.path.join(self.path, digest[:2], f"{digest}{self.suffix}")
+
+    def _load_sync(self, file: str, etag: str) -> T | None:
+        try:
+            with open(file, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            (length,) = _HEADER.unpack_from(data)
+            end = _HEADER.size + length
+            if data[_HEADER.size : end].decode("utf-8") != etag:
+                return None
+            value = self._loads(data[end:])
+        except (ValueError, struct.error):
+            os.remove(file)
+            return None
+
+        try:
+            os.utime(file)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _save_sync(self, file: str, etag: str, value: T):
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = f"{file}.{os.getpid()}.tmp"
+        encoded = etag.encode("utf-8")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(len(encoded)))
+            f.write(encoded)
+            f.write(self._dumps(value))
+        os.replace(tmp, file)
+
+    def _sweep_sync(self):
+        """删除超过 max_age 未被使用的文件，总大小仍超过 max_bytes 时再从最久未使用的开始删除"""
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if not name.endswith(self.suffix):
+                    continue
+                file = os.path.join(root, name)
+                try:
+                    stat = os.stat(file)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        expired = time.time() - self.max_age if self.max_age > 0 else None
+        for mtime, size, file in files:
+            too_old = expired is not None and mtime < expired
+            too_big = self.max_bytes > 0 and total > self.max_bytes
+            if not too_old and not too_big:
+                break
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    async def _sweep(self):
+        now = time.monotonic()
+        if self._swept_at is not None and now - self._swept_at < _SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        try:
+            await run_in_executor(self._sweep_sync)
+        except OSError as e:
+            logger.warning(f"failed to clean up {self.path}: {e}")
+
+    async def get(self, reader: "S3Reader", etag: str) -> T | None:
+        key = self._key(reader, etag)
+        value = self._loaded.get(key)
+        if value is None:
+            value = await run_in_executor(self._load_sync, self._file(key), etag)
+            if value is not None:
+                self._loaded.set(key, value)
+        return value
+
+    async def save(self, reader: "S3Reader", etag: str, value: T):
+        key = self._key(reader, etag)
+        await run_in_executor(self._save_sync, self._file(key), etag, value)
+        self._loaded.set(key, value)
+        await self._sweep()
+
+    def find_job(self, reader: "S3Reader", etag: str) -> Job | None:
+        return job_registry.find(self.kind, self._key(reader, etag))
+
+    def schedule(self, reader: "S3Reader", etag: str) -> Job:
+        """在后台执行 build，同一对象同一版本同时只有一个任务"""
+        return job_registry.submit(
+            self.kind,
+            self._key(reader, etag),
+            lambda job: self.build(reader, etag, job),
+        )
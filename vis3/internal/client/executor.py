@@ -0,0 +1,141 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from threading import Lock
+
+from vis3.internal.config import settings
+
+
+class InstrumentedExecutor:
+    """
+    带监控指标的线程池：记录排队深度、运行中任务数以及任务从提交到开始执行的等待时间。
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"vis3-{name}"
+        )
+        self._lock = Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+
+        # 是否已移出排队数，由开始执行的线程或被取消的等待方之一完成
+        dequeued = False
+
+        with self._lock:
+            self.queued += 1
+
+        def wrapper():
+            nonlocal dequeued
+
+            wait = time.monotonic() - submitted_at
+            with self._lock:
+                if not dequeued:
+                    dequeued = True
+                    self.queued -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        future = loop.run_in_executor(self._executor, wrapper)
+        try:
+            return await future
+        finally:
+            # 等待方在任务开始前被取消时，任务不会再执行，需要在这里移出排队数
+            if future.cancelled():
+                with self._lock:
+                    if not dequeued:
+                        dequeued = True
+                        self.queued -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "avg_wait_ms": round(self.total_wait / started * 1000, 3) if started else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class EndpointLimiter:
+    """
+    按 endpoint 限制并发的 S3 请求数，避免单个缓慢的 endpoint 占满整个 I/O 线程池。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._waiting: dict[str, int] = {}
+        self._in_flight: dict[str, int] = {}
+        self._max_wait: dict[str, float] = {}
+
+    @asynccontextmanager
+    async def acquire(self, endpoint: str | None):
+        if self.limit <= 0:
+            yield
+            return
+
+        key = endpoint or ""
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self.limit))
+
+        started = time.monotonic()
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[key] -= 1
+
+        wait = time.monotonic() - started
+        self._max_wait[key] = max(self._max_wait.get(key, 0.0), wait)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_flight[key] -= 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            endpoint or "default": {
+                "limit": self.limit,
+                "waiting": self._waiting.get(endpoint, 0),
+                "in_flight": self._in_flight.get(endpoint, 0),
+                "max_wait_ms": round(self._max_wait.get(endpoint, 0.0) * 1000, 3),
+            }
+            for endpoint in self._semaphores
+        }
+
+
+# 阻塞的 boto3 / 网络 / 磁盘缓存调用
+s3_io_executor = InstrumentedExecutor("s3-io", settings.S3_IO_MAX_WORKERS)
+# WARC 解析、解压、parquet 解码等 CPU 密集任务
+cpu_executor = InstrumentedExecutor("cpu", settings.CPU_MAX_WORKERS)
+# indexed_gzip 的阻塞解压，读取数据时会等待 s3_io_executor，因此不能在 s3_io_executor 中运行
+gzip_executor = InstrumentedExecutor("indexed-gzip", settings.GZIP_INDEX_MAX_WORKERS)
+endpoint_limiter = EndpointLimiter(settings.S3_ENDPOINT_CONCURRENCY)
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    return await cpu_executor.run(func, *args, **kwargs)
@@ -0,0 +1,522 @@
+"""
+gzip 文件的随机访问。
+
+单个 gzip 流只能从头解压，为了跳到任意位置，建立索引时每读取 GZIP_INDEX_SPACING 字节压缩数据
+记录一个检查点（压缩位置、解压位置以及解压器状态），读取时从最近的检查点继续解压。
+同时在解压后的数据上建立稀疏行索引，用于按行号定位。
+
+安装了 indexed_gzip（pip install vis3[indexed-gzip]）时由它生成 zran 风格的检查点（含 32KB 窗口），随行索引一起按 ETag 保存在本地；
+否则使用 zlib 解压器的快照作为检查点，快照无法序列化，只保存在内存中，进程重启后需要重新建立。
+"""
+
+import asyncio
+import io
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, NamedTuple
+
+from vis3.internal.client.codec import GZIP, Codec
+from vis3.internal.client.etag_store import ETagStore
+from vis3.internal.client.executor import gzip_executor, run_cpu_bound
+from vis3.internal.client.line_index import LineIndex, LineIndexBuilder
+from vis3.internal.common.jobs import Job
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+_MAGIC = b"VGIX"
+_VERSION = 1
+# magic, version, 行索引长度；之后依次为行索引与 indexed_gzip 导出的检查点
+_HEADER = struct.Struct("<4sHQ")
+
+# 每次读取的压缩数据与每次解压输出的上限
+_READ_SIZE = 256 << 10
+_OUTPUT_STEP = 1 << 20
+
+_indexed_gzip_available: bool | None = None
+
+
+def _new_decompressor():
+    return zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+
+def has_indexed_gzip() -> bool:
+    global _indexed_gzip_available
+
+    if _indexed_gzip_available is None:
+        try:
+            import indexed_gzip  # noqa: F401
+
+            _indexed_gzip_available = True
+        except ModuleNotFoundError:
+            _indexed_gzip_available = False
+    return _indexed_gzip_available
+
+
+class GzipCheckpoint(NamedTuple):
+    # 从该压缩位置继续输入
+    compressed: int
+    # 对应的解压位置
+    uncompressed: int
+    # zlib 解压器快照，None 表示从 gzip member 的开头解压
+    state: Any
+
+
+class GzipLine(NamedTuple):
+    # 行在解压后数据中的起始位置
+    offset: int
+    # 行内容，不含换行符；连续读取多行时为以换行分隔的多行
+    data: bytes
+    # 行结束位置（含换行符）
+    end: int
+    # 之后是否还有数据
+    has_more: bool
+    # 行恰好在某个 gzip member 结束时结束，为该 member 结束的压缩位置，否则为 None
+    member_end: int | None
+
+
+class GzipIndex:
+    def __init__(
+        self,
+        lines: LineIndex,
+        checkpoints: list[GzipCheckpoint] | None = None,
+        exported: bytes | None = None,
+    ):
+        self.lines = lines
+        self.checkpoints = checkpoints
+        self.exported = exported
+
+    @property
+    def seekable(self) -> bool:
+        """是否有可用的检查点，没有时只能从头解压"""
+        return self.checkpoints is not None or (bool(self.exported) and has_indexed_gzip())
+
+    def nearest(self, offset: int) -> GzipCheckpoint:
+        positions = [checkpoint.uncompressed for checkpoint in self.checkpoints]
+        return self.checkpoints[max(bisect_right(positions, offset) - 1, 0)]
+
+    def to_bytes(self) -> bytes:
+        lines = self.lines.to_bytes()
+        return _HEADER.pack(_MAGIC, _VERSION, len(lines)) + lines + (self.exported or b"")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GzipIndex":
+        magic, version, lines_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Unsupported gzip index format")
+        start = _HEADER.size
+        lines = LineIndex.from_bytes(data[start : start + lines_size])
+        return cls(lines, exported=data[start + lines_size :] or None)
+
+
+class _LineCollector:
+    """
+    接收连续的解压数据，跳过 skip_bytes 字节与 skip_lines 行后取出 lines 行（超过 max_bytes 字节后不再取下一行），
+    取到后再看是否还有后续数据。
+    """
+
+    def __init__(
+        self,
+        base: int,
+        skip_bytes: int,
+        skip_lines: int,
+        max_line: int,
+        lines: int = 1,
+        max_bytes: int = 0,
+    ):
+        self.position = base
+        self.target = base + skip_bytes
+        self.skip_lines = skip_lines
+        self.max_line = max_line
+        self.lines = lines
+        self.max_bytes = max_bytes
+        self.start: int | None = None
+        self.end: int | None = None
+        # 从 start 开始的原始数据，含换行符
+        self.buffer = bytearray()
+        # 已取到的完整行数与它们的总长度
+        self.count = 0
+        self.complete = 0
+        self.has_more: bool | None = None
+
+    def feed(self, data: bytes) -> bool:
+        """返回是否已经取到所需的行并确定了之后是否还有数据"""
+        chunk_start = self.position
+        self.position += len(data)
+
+        if self.end is not None:
+            if data:
+                self.has_more = True
+            return self.has_more is not None
+
+        i = 0
+        if self.start is None:
+            if self.position <= self.target:
+                return False
+            i = max(self.target - chunk_start, 0)
+            while self.skip_lines:
+                newline = data.find(b"\n", i)
+                if newline == -1:
+                    self.target = self.position
+                    return False
+                i = newline + 1
+                self.skip_lines -= 1
+            if i == len(data):
+                self.target = self.position
+                return False
+            self.start = chunk_start + i
+
+        while True:
+            newline = data.find(b"\n", i)
+            if newline == -1:
+                self.buffer += data[i:]
+                limit = self.max_line
+                if self.count and self.max_bytes:
+                    limit = min(limit, self.max_bytes)
+                if len(self.buffer) < limit:
+                    return False
+                if self.count:
+                    # 已经取到的完整行先返回，未读完的行留给下一次读取
+                    del self.buffer[self.complete :]
+                    self.end = self.start + self.complete
+                else:
+                    # 超长的行截断返回，剩余部分作为下一行
+                    self.end = self.position
+                self.has_more = True
+                return True
+
+            self.buffer += data[i : newline + 1]
+            self.complete = len(self.buffer)
+            self.count += 1
+            i = newline + 1
+            if self.count >= self.lines or (self.max_bytes and self.complete >= self.max_bytes):
+                break
+
+        self.end = chunk_start + i
+        if i < len(data):
+            self.has_more = True
+            return True
+        return False
+
+    def result(self, member_end: int | None = None) -> GzipLine | None:
+        if self.start is None:
+            return None
+        if self.end is None:
+            self.end = self.position
+        data = self.buffer[:-1] if self.buffer.endswith(b"\n") else self.buffer
+        return GzipLine(
+            offset=self.start,
+            data=bytes(data),
+            end=self.end,
+            has_more=bool(self.has_more),
+            member_end=member_end,
+        )
+
+
+async def inflate_line(
+    read: Callable[[int, int], Awaitable[bytes]],
+    size: int,
+    start: int,
+    base: int = 0,
+    decompressor=None,
+    skip_bytes: int = 0,
+    skip_lines: int = 0,
+    max_line: int = 10 << 20,
+    codec: Codec = GZIP,
+    lines: int = 1,
+    max_bytes: int = 0,
+) -> GzipLine | None:
+    """
+    从压缩位置 start（解压位置为 base）开始解压，跳过 skip_bytes 字节与 skip_lines 行后读取一行。
+    lines 大于 1 时在一次解压中连续读取最多 lines 行，超过 max_bytes（不为 0）字节后不再读取下一行，
+    返回的 data 为以换行分隔的多行。
+
+    decompressor 为检查点的解压器快照，为空时 start 必须是 gzip member（其他格式为 frame / stream）的开头。
+    行之后超出文件末尾时返回 None。
+    """
+    collector = _LineCollector(base, skip_bytes, skip_lines, max_line, lines, max_bytes)
+    decompressor = decompressor or codec.decompressobj()
+    position = start
+    pending = b""
+    member_end = None
+
+    while True:
+        if not pending:
+            if position >= size:
+                break
+            pending = await read(position, min(position + _READ_SIZE, size))
+            if not pending:
+                break
+            position += len(pending)
+
+        done = collector.feed(decompressor.decompress(pending, _OUTPUT_STEP))
+
+        if not decompressor.eof:
+            pending = decompressor.unconsumed_tail
+        else:
+            rest = decompressor.unused_data
+            # 之后可能是没有数据的可跳过帧（例如 seek table），需要继续向后看
+            lookahead = codec.skippable_frames and (
+                codec.is_skippable(rest) or (not rest and position < size)
+            )
+            if collector.end is not None and member_end is None and not lookahead:
+                # 行结束后遇到的第一个 member 边界
+                member_end = position - len(rest) if collector.position == collector.end else -1
+                if member_end >= 0:
+                    collector.has_more = member_end < size
+                    done = True
+            if rest and not codec.is_stream_start(rest):
+                break
+            decompressor = codec.decompressobj()
+            pending = rest
+
+        if done:
+            break
+
+    return collector.result(member_end if member_end is not None and member_end >= 0 else None)
+
+
+class _CheckpointBuilder:
+    """流式解压整个对象，在解压数据上建立行索引，并每隔 spacing 字节压缩数据记录一个解压器快照"""
+
+    def __init__(self, spacing: int, stride: int):
+        self.spacing = spacing
+        self.lines = LineIndexBuilder(stride)
+        self.checkpoints = [GzipCheckpoint(0, 0, None)]
+        self.compressed = 0
+        self.finished = False
+        self._decompressor = _new_decompressor()
+
+    def feed(self, chunk: bytes):
+        self.compressed += len(chunk)
+        pending = chunk
+        while pending and not self.finished:
+            self.lines.feed(self._decompressor.decompress(pending, _OUTPUT_STEP))
+            if not self._decompressor.eof:
+                pending = self._decompressor.unconsumed_tail
+                continue
+            pending = self._decompressor.unused_data
+            self._decompressor = _new_decompressor()
+            if pending and not GZIP.is_stream_start(pending):
+                # 尾部填充的无效数据
+                self.finished = True
+
+        if not self.finished and self.compressed - self.checkpoints[-1].compressed >= self.spacing:
+            self.checkpoints.append(
+                GzipCheckpoint(self.compressed, self.lines.position, self._decompressor.copy())
+            )
+
+
+class _S3RangeFile(io.RawIOBase):
+    """
+    供 indexed_gzip 在线程中使用的只读文件对象，读取通过事件循环中的 S3Reader.read_range 完成（经过块缓存）。
+
+    read_range 需要 s3_io_executor 中的线程，使用该对象的阻塞调用必须在 gzip_executor 中运行，
+    否则 I/O 线程全部等待读取时会互相死锁。
+    """
+
+    def __init__(self, reader: "S3Reader", size: int, loop: asyncio.AbstractEventLoop):
+        self._reader = reader
+        self._size = size
+        self._loop = loop
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        end = min(self._position + len(buffer), self._size)
+        if end <= self._position:
+            return 0
+        data = asyncio.run_coroutine_threadsafe(
+            self._reader.read_range(self._position, end), self._loop
+        ).result()
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class GzipIndexStore(ETagStore[GzipIndex]):
+    """
+    gzip 索引的存储，索引文件按对象的 ETag 保存在本地；
+    最近使用的索引、zlib 快照与打开的 indexed_gzip 文件保留在内存中。
+    """
+
+    kind = "gzip_index"
+    suffix = ".gzidx"
+
+    def __init__(
+        self, path: str, spacing: int, stride: int, max_loaded: int, max_bytes: int, max_age: int
+    ):
+        super().__init__(path, max_loaded, max_bytes, max_age)
+        self.spacing = spacing
+        self.stride = stride
+        self._handles: TTLCache[tuple[Any, threading.Lock, asyncio.Lock]] = TTLCache(
+            max_size=max_loaded, ttl=3600
+        )
+
+    def _dumps(self, value: GzipIndex) -> bytes:
+        return value.to_bytes()
+
+    def _loads(self, data: bytes) -> GzipIndex:
+        return GzipIndex.from_bytes(data)
+
+    def _build_with_indexed_gzip(self, fileobj: _S3RangeFile, job: Job | None) -> GzipIndex:
+        import indexed_gzip
+
+        builder = LineIndexBuilder(self.stride)
+        with indexed_gzip.IndexedGzipFile(
+            fileobj=fileobj, spacing=self.spacing, drop_handles=False
+        ) as f:
+            while True:
+                data = f.read(settings.LINE_INDEX_CHUNK_SIZE)
+                if not data:
+                    break
+                builder.feed(data)
+                if job is not None:
+                    job.progress.update(bytes=fileobj.tell(), lines=builder.newlines)
+            exported = io.BytesIO()
+            f.export_index(fileobj=exported)
+
+        return GzipIndex(builder.finish(), exported=exported.getvalue())
+
+    async def _build_with_zlib(self, reader: "S3Reader", etag: str, job: Job | None) -> GzipIndex:
+        builder = _CheckpointBuilder(self.spacing, self.stride)
+        async for chunk in reader.transport.iter_object(
+            min(settings.LINE_INDEX_CHUNK_SIZE, self.spacing),
+            Bucket=reader.bucket_name,
+            Key=reader.key_without_query,
+            IfMatch=etag,
+        ):
+            await run_cpu_bound(builder.feed, chunk)
+            if job is not None:
+                job.progress.update(bytes=builder.compressed, lines=builder.lines.newlines)
+            if builder.finished:
+                break
+
+        return GzipIndex(builder.lines.finish(), checkpoints=builder.checkpoints)
+
+    async def build(self, reader: "S3Reader", etag: str, job: Job | None = None) -> GzipIndex:
+        """流式解压整个对象建立索引"""
+        size = (reader._header_info or {}).get("ContentLength") or 0
+        if job is not None:
+            job.progress.update(bytes=0, total_bytes=size, lines=0)
+
+        if has_indexed_gzip():
+            fileobj = _S3RangeFile(reader, size, asyncio.get_running_loop())
+            index = await gzip_executor.run(self._build_with_indexed_gzip, fileobj, job)
+        else:
+            index = await self._build_with_zlib(reader, etag, job)
+
+        await self.save(reader, etag, index)
+        self._handles.pop(self._key(reader, etag))
+        if job is not None:
+            job.progress["lines"] = index.lines.lines
+        return index
+
+    def _open_sync(self, fileobj: _S3RangeFile, exported: bytes):
+        import indexed_gzip
+
+        f = indexed_gzip.IndexedGzipFile(
+            fileobj=fileobj, spacing=self.spacing, drop_handles=False
+        )
+        f.import_index(fileobj=io.BytesIO(exported))
+        return f, threading.Lock(), asyncio.Lock()
+
+    @staticmethod
+    def _read_line_sync(
+        handle, offset: int, skip_lines: int, max_line: int, lines: int, max_bytes: int
+    ) -> GzipLine | None:
+        f, lock, _ = handle
+        collector = _LineCollector(offset, 0, skip_lines, max_line, lines, max_bytes)
+        with lock:
+            f.seek(offset)
+            while True:
+                data = f.read(_OUTPUT_STEP)
+                if not data or collector.feed(data):
+                    break
+        return collector.result()
+
+    async def read_line(
+        self,
+        reader: "S3Reader",
+        etag: str,
+        index: GzipIndex | None,
+        size: int,
+        offset: int,
+        skip_lines: int = 0,
+        max_line: int = 10 << 20,
+        lines: int = 1,
+        max_bytes: int = 0,
+    ) -> GzipLine | None:
+        """
+        读取解压后位置 offset 之后第 skip_lines 行（lines、max_bytes 见 inflate_line），索引不可用时从文件开头解压
+        """
+        if index is not None and index.checkpoints is not None:
+            checkpoint = index.nearest(offset)
+            return await inflate_line(
+                reader.read_range,
+                size,
+                checkpoint.compressed,
+                base=checkpoint.uncompressed,
+                decompressor=checkpoint.state.copy() if checkpoint.state else None,
+                skip_bytes=offset - checkpoint.uncompressed,
+                skip_lines=skip_lines,
+                max_line=max_line,
+                lines=lines,
+                max_bytes=max_bytes,
+            )
+
+        if index is not None and index.seekable:
+            key = self._key(reader, etag)
+            handle = self._handles.get(key)
+            if handle is None:
+                fileobj = _S3RangeFile(reader, size, asyncio.get_running_loop())
+                handle = await gzip_executor.run(self._open_sync, fileobj, index.exported)
+                self._handles.set(key, handle)
+            # 同一文件的读取在事件循环中排队，不占用等待锁的线程；
+            # 线程锁保证等待方被取消后仍在运行的读取不会与下一次读取交错
+            async with handle[2]:
+                return await gzip_executor.run(
+                    self._read_line_sync, handle, offset, skip_lines, max_line, lines, max_bytes
+                )
+
+        return await inflate_line(
+            reader.read_range,
+            size,
+            0,
+            skip_bytes=offset,
+            skip_lines=skip_lines,
+            max_line=max_line,
+            lines=lines,
+            max_bytes=max_bytes,
+        )
+
+
+gzip_index_store = GzipIndexStore(
+    path=settings.GZIP_INDEX_DIR or os.path.join(settings.BASE_DATA_DIR, "gzip_index"),
+    spacing=settings.GZIP_INDEX_SPACING,
+    stride=settings.LINE_INDEX_STRIDE,
+    max_loaded=settings.GZIP_INDEX_MAX_LOADED,
+    max_bytes=settings.LOCAL_STORE_MAX_BYTES,
+    max_age=settings.LOCAL_STORE_MAX_AGE,
+)
@@ -0,0 +1,374 @@
+"""
+多 member gzip 文件（每行 / 每条 WARC 记录一个 member、BGZF 等）的 member 边界索引。
+
+每个 member 都可以单独解压，记录每个 member 结束时的压缩位置、解压位置与累计换行数后，
+跳到第 N 行只需要从所在 member 的开头解压，不需要解压器快照，索引可以完整保存在本地。
+zstd / lz4 的 frame 与 bz2 / xz 的 stream 同样可以单独解压，按相同的方式建立索引，下文统称 member。
+
+seekable zstd 文件末尾的 seek table 记录了每个 frame 的压缩与解压长度，不需要建立索引即可按解压后的位置跳转。
+"""
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, NamedTuple
+
+from vis3.internal.client.codec import GZIP, GZIP_MAGIC, ZSTD, Codec
+from vis3.internal.client.etag_store import ETagStore
+from vis3.internal.client.executor import run_cpu_bound
+from vis3.internal.common.jobs import Job
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+_MAGIC = b"VGMX"
+_VERSION = 1
+# magic, version, bgzf, member 数, 总行数
+_HEADER = struct.Struct("<4sHBQQ")
+_OUTPUT_STEP = 1 << 20
+# 判断是否为多 member 文件时最多解压的压缩数据
+_PROBE_SIZE = 1 << 20
+
+# seekable zstd 的 seek table：位于文件末尾的可跳过帧，
+# 帧头（magic、长度）之后为每个 frame 的（压缩长度、解压长度[、校验和]），最后是 footer（frame 数、描述符、magic）
+_SEEK_TABLE_FRAME_MAGIC = 0x184D2A5E
+_SEEKABLE_MAGIC = 0x8F92EAB1
+_SEEK_TABLE_HEADER = struct.Struct("<II")
+_SEEK_TABLE_FOOTER = struct.Struct("<IBI")
+
+
+def is_bgzf(header: bytes) -> bool:
+    """BGZF 的 member 头部带有 BC 扩展字段（记录 member 的压缩长度）"""
+    return (
+        len(header) >= 18
+        and header[:2] == GZIP_MAGIC
+        and header[3] & 4 != 0
+        and header[12:14] == b"BC"
+    )
+
+
+def _first_member_size(codec: Codec, data: bytes) -> int | None:
+    """返回第一个 member 的压缩长度，data 中没有完整的 member 时返回 None"""
+    decompressor = codec.decompressobj()
+    pending = data
+    while pending and not decompressor.eof:
+        decompressor.decompress(pending, _OUTPUT_STEP)
+        pending = decompressor.unconsumed_tail
+    if not decompressor.eof:
+        return None
+    return len(data) - len(decompressor.unused_data)
+
+
+class GzipMember(NamedTuple):
+    compressed: int
+    compressed_size: int
+    uncompressed: int
+    uncompressed_size: int
+    # member 的数据从第几行（从 0 开始）开始
+    row: int
+    # member 中的换行数
+    newlines: int
+
+
+class SeekTable(NamedTuple):
+    """seekable zstd 文件中每个 frame 结束时的压缩位置与解压位置"""
+
+    compressed_ends: array
+    uncompressed_ends: array
+
+    @property
+    def count(self) -> int:
+        return len(self.compressed_ends)
+
+    def find_uncompressed(self, offset: int) -> tuple[int, int]:
+        """返回包含解压后位置 offset 的 frame 开头的 (压缩位置, 解压位置)"""
+        i = min(bisect_right(self.uncompressed_ends, offset), self.count - 1)
+        if i <= 0:
+            return 0, 0
+        return self.compressed_ends[i - 1], self.uncompressed_ends[i - 1]
+
+
+def seek_table_size(footer: bytes) -> int | None:
+    """根据文件末尾的 footer 返回 seek table 的总长度，不是 seekable zstd 文件时返回 None"""
+    if len(footer) < _SEEK_TABLE_FOOTER.size:
+        return None
+    frames, descriptor, magic = _SEEK_TABLE_FOOTER.unpack_from(
+        footer, len(footer) - _SEEK_TABLE_FOOTER.size
+    )
+    # 描述符的保留位必须为 0
+    if magic != _SEEKABLE_MAGIC or descriptor & 0x7C:
+        return None
+    entry_size = 12 if descriptor & 0x80 else 8
+    return _SEEK_TABLE_HEADER.size + frames * entry_size + _SEEK_TABLE_FOOTER.size
+
+
+def parse_seek_table(table: bytes) -> SeekTable | None:
+    """解析完整的 seek table（包括可跳过帧的帧头与 footer），格式不对时返回 None"""
+    frame_magic, frame_size = _SEEK_TABLE_HEADER.unpack_from(table)
+    frames, descriptor, _ = _SEEK_TABLE_FOOTER.unpack_from(table, len(table) - _SEEK_TABLE_FOOTER.size)
+    entry_size = 12 if descriptor & 0x80 else 8
+    if frame_magic != _SEEK_TABLE_FRAME_MAGIC or frame_size != len(table) - _SEEK_TABLE_HEADER.size:
+        return None
+
+    compressed_ends = array("Q")
+    uncompressed_ends = array("Q")
+    compressed = uncompressed = 0
+    for i in range(frames):
+        compressed_size, uncompressed_size = struct.unpack_from(
+            "<II", table, _SEEK_TABLE_HEADER.size + i * entry_size
+        )
+        compressed += compressed_size
+        uncompressed += uncompressed_size
+        compressed_ends.append(compressed)
+        uncompressed_ends.append(uncompressed)
+    return SeekTable(compressed_ends, uncompressed_ends)
+
+
+class GzipMemberIndex:
+    """
+    compressed_ends[i]、uncompressed_ends[i]、newline_ends[i] 为第 i 个 member 结束时的压缩位置、
+    解压位置与累计换行数；aligned[i] 表示第 i 个 member 的数据是否以换行结束。
+    """
+
+    def __init__(
+        self,
+        compressed_ends: array,
+        uncompressed_ends: array,
+        newline_ends: array,
+        aligned: bytearray,
+        lines: int,
+        bgzf: bool,
+    ):
+        self.compressed_ends = compressed_ends
+        self.uncompressed_ends = uncompressed_ends
+        self.newline_ends = newline_ends
+        self.aligned = aligned
+        self.lines = lines
+        self.bgzf = bgzf
+
+    @property
+    def count(self) -> int:
+        return len(self.compressed_ends)
+
+    def member(self, i: int) -> GzipMember:
+        compressed = self.compressed_ends[i - 1] if i else 0
+        uncompressed = self.uncompressed_ends[i - 1] if i else 0
+        row = self.newline_ends[i - 1] if i else 0
+        return GzipMember(
+            compressed=compressed,
+            compressed_size=self.compressed_ends[i] - compressed,
+            uncompressed=uncompressed,
+            uncompressed_size=self.uncompressed_ends[i] - uncompressed,
+            row=row,
+            newlines=self.newline_ends[i] - row,
+        )
+
+    def find_compressed(self, offset: int) -> int | None:
+        """返回从压缩位置 offset 开始的 member，offset 不是 member 边界时返回 None"""
+        if offset == 0:
+            return 0 if self.count else None
+        i = bisect_left(self.compressed_ends, offset)
+        if i < self.count - 1 and self.compressed_ends[i] == offset:
+            return i + 1
+        return None
+
+    def find_uncompressed(self, offset: int) -> int:
+        """返回包含解压后位置 offset 的 member"""
+        return min(bisect_right(self.uncompressed_ends, offset), self.count - 1)
+
+    def locate_row(self, row: int) -> tuple[int, int]:
+        """
+        返回 (第 row 行所在的 member, 从该 member 开头需要跳过的换行数)
+        """
+        if row == 0:
+            return 0, 0
+        # 第 row 行从第 row 个换行之后开始
+        i = min(bisect_left(self.newline_ends, row), self.count - 1)
+        return i, row - (self.newline_ends[i - 1] if i else 0)
+
+    def to_bytes(self) -> bytes:
+        arrays = [self.compressed_ends, self.uncompressed_ends, self.newline_ends]
+        if sys.byteorder != "little":
+            arrays = [array("Q", values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+        header = _HEADER.pack(_MAGIC, _VERSION, int(self.bgzf), self.count, self.lines)
+        return header + b"".join(values.tobytes() for values in arrays) + bytes(self.aligned)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GzipMemberIndex":
+        magic, version, bgzf, count, lines = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Unsupported gzip member index format")
+        if len(data) != _HEADER.size + count * 25:
+            raise ValueError("Truncated gzip member index")
+
+        arrays = []
+        position = _HEADER.size
+        for _ in range(3):
+            values = array("Q")
+            values.frombytes(data[position : position + count * 8])
+            if sys.byteorder != "little":
+                values.byteswap()
+            arrays.append(values)
+            position += count * 8
+        return cls(*arrays, aligned=bytearray(data[position:]), lines=lines, bgzf=bool(bgzf))
+
+
+class GzipMemberIndexBuilder:
+    """流式解压整个对象，在每个 member 结束时记录位置与累计换行数"""
+
+    def __init__(self, codec: Codec = GZIP):
+        self.codec = codec
+        self.compressed_ends = array("Q")
+        self.uncompressed_ends = array("Q")
+        self.newline_ends = array("Q")
+        self.aligned = bytearray()
+        self.compressed = 0
+        self.uncompressed = 0
+        self.newlines = 0
+        self.last_byte = b""
+        self.bgzf: bool | None = None
+        self.finished = False
+        self._decompressor = codec.decompressobj()
+
+    def feed(self, chunk: bytes):
+        if self.bgzf is None:
+            self.bgzf = is_bgzf(chunk)
+        self.compressed += len(chunk)
+
+        pending = chunk
+        while pending and not self.finished:
+            data = self._decompressor.decompress(pending, _OUTPUT_STEP)
+            if data:
+                self.uncompressed += len(data)
+                self.newlines += data.count(b"\n")
+                self.last_byte = data[-1:]
+            if not self._decompressor.eof:
+                pending = self._decompressor.unconsumed_tail
+                continue
+
+            pending = self._decompressor.unused_data
+            self.compressed_ends.append(self.compressed - len(pending))
+            self.uncompressed_ends.append(self.uncompressed)
+            self.newline_ends.append(self.newlines)
+            self.aligned.append(self.last_byte == b"\n")
+            self._decompressor = self.codec.decompressobj()
+            if pending and not self.codec.is_stream_start(pending):
+                # 尾部填充的无效数据
+                self.finished = True
+
+    def finish(self) -> GzipMemberIndex:
+        if self.uncompressed > (self.uncompressed_ends[-1] if self.uncompressed_ends else 0):
+            # 最后一个 member 不完整（缺少尾部），同样记录，便于定位其中的行
+            self.compressed_ends.append(self.compressed)
+            self.uncompressed_ends.append(self.uncompressed)
+            self.newline_ends.append(self.newlines)
+            self.aligned.append(self.last_byte == b"\n")
+
+        lines = self.newlines
+        if self.uncompressed and self.last_byte != b"\n":
+            # 最后一行没有换行符
+            lines += 1
+        return GzipMemberIndex(
+            self.compressed_ends,
+            self.uncompressed_ends,
+            self.newline_ends,
+            self.aligned,
+            lines=lines,
+            bgzf=bool(self.bgzf),
+        )
+
+
+class GzipMemberStore(ETagStore[GzipMemberIndex]):
+    """
+    member 索引的存储，索引文件按对象的 ETag 保存在本地，最近使用的索引保留在内存中
+    """
+
+    kind = "gzip_members"
+    suffix = ".members"
+
+    def __init__(self, path: str, max_loaded: int, max_bytes: int, max_age: int):
+        super().__init__(path, max_loaded, max_bytes, max_age)
+        # 是否为多 member 文件的探测结果
+        self._probed: TTLCache[bool] = TTLCache(max_size=10000, ttl=3600)
+        # seekable zstd 文件的 seek table，不是 seekable 格式时为 False
+        self._seek_tables: TTLCache[SeekTable | bool] = TTLCache(max_size=max_loaded, ttl=3600)
+
+    def _dumps(self, value: GzipMemberIndex) -> bytes:
+        return value.to_bytes()
+
+    def _loads(self, data: bytes) -> GzipMemberIndex:
+        return GzipMemberIndex.from_bytes(data)
+
+    async def is_multi_member(self, reader: "S3Reader", etag: str, size: int) -> bool:
+        """解压文件开头的数据，第一个 member 在 _PROBE_SIZE 以内结束时认为是多 member 文件"""
+        key = self._key(reader, etag)
+        probed = self._probed.get(key)
+        if probed is not None:
+            return probed
+
+        probed = await run_cpu_bound(
+            _first_member_size, reader.codec, await reader.read_range(0, min(size, _PROBE_SIZE))
+        )
+        probed = probed is not None and probed < size
+        self._probed.set(key, probed)
+        return probed
+
+    async def seek_table(self, reader: "S3Reader", etag: str, size: int) -> SeekTable | None:
+        """读取 seekable zstd 文件末尾的 seek table，其他文件返回 None"""
+        if reader.codec is not ZSTD:
+            return None
+        key = self._key(reader, etag)
+        table = self._seek_tables.get(key)
+        if table is None:
+            footer = await reader.read_range(max(size - _SEEK_TABLE_FOOTER.size, 0), size)
+            table_size = seek_table_size(footer)
+            table = False
+            if table_size is not None and table_size <= size:
+                table = parse_seek_table(await reader.read_range(size - table_size, size)) or False
+            self._seek_tables.set(key, table)
+        return table or None
+
+    async def build(self, reader: "S3Reader", etag: str, job: Job | None = None) -> GzipMemberIndex:
+        """
+        流式读取整个对象建立索引，读取期间对象被覆盖时 IfMatch 失败，不会写入错误的索引
+        """
+        builder = GzipMemberIndexBuilder(reader.codec)
+        size = (reader._header_info or {}).get("ContentLength") or 0
+        if job is not None:
+            job.progress.update(bytes=0, total_bytes=size, members=0, lines=0)
+
+        async for chunk in reader.transport.iter_object(
+            settings.LINE_INDEX_CHUNK_SIZE,
+            Bucket=reader.bucket_name,
+            Key=reader.key_without_query,
+            IfMatch=etag,
+        ):
+            await run_cpu_bound(builder.feed, chunk)
+            if job is not None:
+                job.progress.update(
+                    bytes=builder.compressed,
+                    members=len(builder.compressed_ends),
+                    lines=builder.newlines,
+                )
+            if builder.finished:
+                break
+
+        index = builder.finish()
+        await self.save(reader, etag, index)
+        if job is not None:
+            job.progress.update(members=index.count, lines=index.lines)
+        return index
+
+
+gzip_member_store = GzipMemberStore(
+    path=settings.GZIP_INDEX_DIR or os.path.join(settings.BASE_DATA_DIR, "gzip_index"),
+    max_loaded=settings.GZIP_INDEX_MAX_LOADED,
+    max_bytes=settings.LOCAL_STORE_MAX_BYTES,
+    max_age=settings.LOCAL_STORE_MAX_AGE,
+)
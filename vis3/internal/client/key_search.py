@@ -0,0 +1,176 @@
+import asyncio
+import fnmatch
+import re
+from typing import TYPE_CHECKING, AsyncIterator, Callable
+
+from fastapi import status
+
+from vis3.internal.client.listing_index import listing_index
+from vis3.internal.client.prefix_stats import list_children, walk_prefixes
+from vis3.internal.common.exceptions import AppEx, ErrorCode
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_parse
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+_INDEX_PAGE_SIZE = 1000
+# 匹配在事件循环中对每个 key 执行，限制规则的长度与复杂度
+_MAX_PATTERN_LENGTH = 256
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+def _invalid(detail: str) -> AppEx:
+    return AppEx(
+        code=ErrorCode.CODE_00003_CLIENT_ERROR,
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=detail,
+    )
+
+
+def _has_nested_repeat(items, repeated: bool = False) -> bool:
+    """
+    正则中是否有嵌套的量词，例如 (a+)+、(\\w*/)*，这类规则在不匹配时可能需要指数级的回溯
+    """
+    for op, av in items:
+        if op in _REPEATS:
+            _, max_repeat, item = av
+            if max_repeat > 1 and repeated:
+                return True
+            if _has_nested_repeat(item, repeated or max_repeat > 1):
+                return True
+            continue
+
+        children = [av]
+        while children:
+            child = children.pop()
+            if isinstance(child, sre_parse.SubPattern):
+                if _has_nested_repeat(child, repeated):
+                    return True
+            elif isinstance(child, (tuple, list)):
+                children.extend(child)
+    return False
+
+
+def compile_matcher(pattern: str, mode: str = "glob", ignore_case: bool = False) -> Callable[[str], bool]:
+    """
+    编译 key 的匹配规则，参数为相对于搜索目录的路径（目录不带末尾的 /）。
+
+    glob 中没有 / 时只匹配文件名，例如 *.jsonl；有 / 时匹配完整的相对路径，例如 */part-00*.gz。
+    regex 在相对路径中搜索，例如 ^2024-\\d+/.*\\.parquet$。
+    规则超过 _MAX_PATTERN_LENGTH 个字符，或正则中有嵌套的量词时返回 400。
+    """
+    if len(pattern) > _MAX_PATTERN_LENGTH:
+        raise _invalid(f"Pattern is longer than {_MAX_PATTERN_LENGTH} characters")
+    if mode not in ("glob", "regex"):
+        raise _invalid(f"Invalid search mode: {mode}")
+
+    flags = re.IGNORECASE if ignore_case else 0
+    try:
+        if mode == "regex":
+            if _has_nested_repeat(sre_parse.parse(pattern, flags)):
+                raise _invalid("Nested quantifiers are not supported")
+            compiled = re.compile(pattern, flags)
+            return lambda path: compiled.search(path) is not None
+        compiled = re.compile(fnmatch.translate(pattern), flags)
+    except re.error as e:
+        raise _invalid(f"Invalid pattern: {e}")
+
+    if "/" in pattern:
+        return lambda path: compiled.match(path) is not None
+    return lambda path: compiled.match(path.rsplit("/", 1)[-1]) is not None
+
+
+async def _index_children(
+    reader: "S3Reader",
+    prefix: str,
+    on_page: Callable[[list[dict], list[str]], None],
+) -> bool:
+    """
+    本地索引中有该目录的可用数据时从索引读取子项，返回是否读取成功
+    """
+    if listing_index is None:
+        return False
+    state = await listing_index.state(reader, prefix)
+    if not listing_index.is_usable(state):
+        return False
+
+    start_after = None
+    while True:
+        entries = await listing_index.query(
+            reader, 0, _INDEX_PAGE_SIZE, start_after=start_after, prefix=prefix
+        )
+        on_page(
+            [details for _, details, entry_type in entries if entry_type == "file"],
+            [details["Prefix"] for _, details, entry_type in entries if entry_type == "directory"],
+        )
+        if len(entries) < _INDEX_PAGE_SIZE:
+            return True
+        start_after = entries[-1][1].get("Key") or entries[-1][1].get("Prefix")
+
+
+async def search_keys(
+    reader: "S3Reader",
+    match: Callable[[str], bool],
+    limit: int,
+    concurrency: int,
+    recursive: bool = True,
+    progress: dict | None = None,
+) -> AsyncIterator[tuple[str, dict, str]]:
+    """
+    在 reader 所在的目录下搜索 key，按找到的顺序返回与 S3Reader.list_page 相同格式的条目。
+
+    以子目录为分片并行列出，单个目录很大时再按字符区间切分；本地索引中已有的目录直接读取索引。
+    找到 limit 个结果，或者调用方停止迭代时，立即取消尚未完成的 LIST 请求。
+    """
+    root = reader.key_without_query
+    progress = progress if progress is not None else {}
+    progress.update(directories=0, scanned=0, matches=0, truncated=False)
+
+    results: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    def emit(key: str, details: dict, entry_type: str):
+        if progress["matches"] >= limit:
+            progress["truncated"] = True
+            return
+        if match(key[len(root):].rstrip("/")):
+            progress["matches"] += 1
+            results.put_nowait((f"s3://{reader.bucket_name}/{key}", details, entry_type))
+
+    async def visit(prefix: str) -> list[str]:
+        children: list[str] = []
+
+        def on_page(contents: list[dict], prefixes: list[str]):
+            progress["scanned"] += len(contents) + len(prefixes)
+            for content in contents:
+                emit(content["Key"], content, "file")
+            for _prefix in prefixes:
+                emit(_prefix, {"Prefix": _prefix}, "directory")
+            children.extend(prefixes)
+
+        if not await _index_children(reader, prefix, on_page):
+            await list_children(reader, prefix, semaphore, on_page)
+        progress["directories"] += 1
+        return children if recursive else []
+
+    walk = asyncio.ensure_future(walk_prefixes(root, visit, concurrency))
+    walk.add_done_callback(lambda _: results.put_nowait(None))
+    try:
+        found = 0
+        while found < limit:
+            entry = await results.get()
+            if entry is None:
+                break
+            found += 1
+            yield entry
+
+        if found >= limit and not walk.done():
+            progress["truncated"] = True
+        elif walk.done() and not walk.cancelled() and walk.exception():
+            raise walk.exception()
+    finally:
+        walk.cancel()
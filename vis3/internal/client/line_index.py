@@ -0,0 +1,162 @@
+import os
+import struct
+import sys
+from array import array
+from typing import TYPE_CHECKING
+
+from vis3.internal.client.etag_store import ETagStore
+from vis3.internal.client.executor import run_cpu_bound
+from vis3.internal.common.jobs import Job
+from vis3.internal.config import settings
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+# 可以按行号定位的文本文件
+LINE_INDEX_EXTENSIONS = (".jsonl", ".ndjson", ".txt", ".csv", ".tsv", ".log")
+
+_MAGIC = b"VLIX"
+_VERSION = 1
+# magic, version, stride, lines, size, checkpoints
+_HEADER = struct.Struct("<4sHIQQQ")
+
+
+class LineIndex:
+    """
+    稀疏行索引：offsets[i] 为第 i * stride 行（从 0 开始）起始的字节位置。
+
+    定位任意一行只需要从最近的检查点向后跳过不超过 stride - 1 行。
+    """
+
+    def __init__(self, stride: int, offsets: array, lines: int, size: int):
+        self.stride = stride
+        self.offsets = offsets
+        self.lines = lines
+        self.size = size
+
+    def locate(self, row: int) -> tuple[int, int]:
+        """返回 (检查点的字节位置, 需要跳过的行数)"""
+        return self.offsets[row // self.stride], row % self.stride
+
+    def to_bytes(self) -> bytes:
+        offsets = self.offsets
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self.stride, self.lines, self.size, len(offsets)
+        )
+        return header + offsets.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LineIndex":
+        magic, version, stride, lines, size, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Unsupported line index format")
+        offsets = array("Q")
+        offsets.frombytes(data[_HEADER.size : _HEADER.size + count * 8])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        if len(offsets) != count:
+            raise ValueError("Truncated line index")
+        return cls(stride, offsets, lines, size)
+
+
+class LineIndexBuilder:
+    """按块扫描换行符，记录每 stride 行的起始位置"""
+
+    def __init__(self, stride: int):
+        self.stride = stride
+        self.offsets = array("Q", [0])
+        self.newlines = 0
+        # 距离上一个检查点已经过的行数
+        self.since = 0
+        self.position = 0
+        self.last_byte = b""
+
+    def feed(self, chunk: bytes):
+        base = self.position
+        self.position += len(chunk)
+        if not chunk:
+            return
+        self.last_byte = chunk[-1:]
+
+        total = chunk.count(b"\n")
+        if self.since + total < self.stride:
+            self.since += total
+            self.newlines += total
+            return
+
+        pos = 0
+        for _ in range(total):
+            pos = chunk.find(b"\n", pos) + 1
+            self.newlines += 1
+            self.since += 1
+            if self.since == self.stride:
+                self.since = 0
+                # 文件最后一个换行之后没有内容时不记录检查点，在 finish 中处理
+                self.offsets.append(base + pos)
+
+    def finish(self) -> LineIndex:
+        lines = self.newlines
+        if self.position and self.last_byte != b"\n":
+            # 最后一行没有换行符
+            lines += 1
+        offsets = self.offsets
+        while len(offsets) > 1 and offsets[-1] >= self.position:
+            offsets.pop()
+        return LineIndex(self.stride, offsets, lines, self.position)
+
+
+class LineIndexStore(ETagStore[LineIndex]):
+    """
+    行索引的存储，索引文件按对象的 ETag 保存在本地，对象更新后旧索引自然失效；
+    最近使用的索引同时保留在内存中。
+    """
+
+    kind = "line_index"
+    suffix = ".idx"
+
+    def __init__(self, path: str, stride: int, max_loaded: int, max_bytes: int, max_age: int):
+        super().__init__(path, max_loaded, max_bytes, max_age)
+        self.stride = stride
+
+    def _dumps(self, value: LineIndex) -> bytes:
+        return value.to_bytes()
+
+    def _loads(self, data: bytes) -> LineIndex:
+        return LineIndex.from_bytes(data)
+
+    async def build(self, reader: "S3Reader", etag: str, job: Job | None = None) -> LineIndex:
+        """
+        流式读取整个对象建立索引，读取期间对象被覆盖时 IfMatch 失败，不会写入错误的索引
+        """
+        builder = LineIndexBuilder(self.stride)
+        size = (reader._header_info or {}).get("ContentLength") or 0
+        if job is not None:
+            job.progress.update(bytes=0, total_bytes=size, lines=0)
+
+        async for chunk in reader.transport.iter_object(
+            settings.LINE_INDEX_CHUNK_SIZE,
+            Bucket=reader.bucket_name,
+            Key=reader.key_without_query,
+            IfMatch=etag,
+        ):
+            await run_cpu_bound(builder.feed, chunk)
+            if job is not None:
+                job.progress.update(bytes=builder.position, lines=builder.newlines)
+
+        index = builder.finish()
+        await self.save(reader, etag, index)
+        if job is not None:
+            job.progress["lines"] = index.lines
+        return index
+
+
+line_index_store = LineIndexStore(
+    path=settings.LINE_INDEX_DIR or os.path.join(settings.BASE_DATA_DIR, "line_index"),
+    stride=settings.LINE_INDEX_STRIDE,
+    max_loaded=settings.LINE_INDEX_MAX_LOADED,
+    max_bytes=settings.LOCAL_STORE_MAX_BYTES,
+    max_age=settings.LOCAL_STORE_MAX_AGE,
+)
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import json
+from typing import NamedTuple
+
+from fastapi import status
+
+from vis3.internal.common.exceptions import AppEx, ErrorCode
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+
+# 字典序最大的字符，拼在目录后面作为 StartAfter 时跳过整个目录
+_MAX_CHAR = "\U0010ffff"
+
+
+class ListingKey(NamedTuple):
+    endpoint: str | None
+    bucket: str
+    prefix: str
+    delimiter: str
+    page_size: int
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(repr(tuple(self)).encode("utf-8")).hexdigest()[:16]
+
+
+class ListCursor(NamedTuple):
+    page_no: int
+    token: str
+    # 从某个 key 之后开始的列表（start_after），页码未知时 page_no 为 0
+    start_after: str | None = None
+
+
+def resume_after(key: str, delimiter: str) -> str:
+    """
+    返回从 key 之后继续列出时使用的 StartAfter，key 是目录时跳过目录下的所有对象
+    """
+    if delimiter and key.endswith(delimiter):
+        return key + _MAX_CHAR
+    return key
+
+
+class ListingCursorCache:
+    """
+    目录分页的页边界缓存。
+
+    记录每个列表（endpoint、bucket、前缀、分隔符、每页大小）中各页起始的 ContinuationToken，
+    第一次遍历之后跳到任意已经到达过的页只需要一次 LIST。
+    """
+
+    def __init__(self, max_listings: int, ttl: float, max_pages: int):
+        self.max_pages = max_pages
+        self._listings: TTLCache[dict[int, str]] = TTLCache(
+            max_size=max_listings, ttl=ttl
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._listings.enabled
+
+    def nearest(self, listing: ListingKey, page_no: int) -> tuple[int, str | None]:
+        """
+        返回不超过 page_no 的最近一个已知页及其起始 token，第 1 页的 token 为 None
+        """
+        pages = self._listings.get(listing)
+        if not pages:
+            return 1, None
+
+        known = [page for page in pages if page <= page_no]
+        if not known:
+            return 1, None
+
+        page = max(known)
+        return page, pages[page]
+
+    def set(self, listing: ListingKey, page_no: int, token: str):
+        if not self.enabled or page_no <= 1:
+            return
+
+        pages = self._listings.get(listing)
+        if pages is None:
+            pages = {}
+        if page_no not in pages and len(pages) >= self.max_pages:
+            return
+        pages[page_no] = token
+        self._listings.set(listing, pages)
+
+    def invalidate(
+        self,
+        endpoint: str | None = None,
+        bucket: str | None = None,
+        listing: ListingKey | None = None,
+    ):
+        if listing is not None:
+            self._listings.pop(listing)
+            return
+
+        self._listings.invalidate(
+            lambda key: (endpoint is None or key.endpoint == endpoint)
+            and (bucket is None or key.bucket == bucket)
+        )
+
+    def stats(self) -> dict:
+        return self._listings.stats()
+
+
+def encode_cursor(
+    listing: ListingKey, page_no: int, token: str, start_after: str | None = None
+) -> str:
+    """
+    生成下一页的游标，游标绑定所属的列表，不能用于其他目录
+    """
+    payload = {"l": listing.fingerprint, "p": page_no, "t": token}
+    if start_after is not None:
+        payload["a"] = start_after
+    payload = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, listing: ListingKey) -> ListCursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        fingerprint, page_no, token = payload["l"], int(payload["p"]), payload["t"]
+        start_after = payload.get("a")
+    except Exception as exc:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        ) from exc
+
+    if fingerprint != listing.fingerprint:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not belong to this path",
+        )
+
+    return ListCursor(page_no, token, start_after)
+
+
+list_cursor_cache = ListingCursorCache(
+    max_listings=settings.S3_LIST_CURSOR_CACHE_SIZE,
+    ttl=settings.S3_LIST_CURSOR_TTL,
+    max_pages=settings.S3_LIST_CURSOR_MAX_PAGES,
+)
@@ -0,0 +1,282 @@
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, NamedTuple
+
+from vis3.internal.client.transport import run_in_executor
+from vis3.internal.common.jobs import Job, job_registry
+from vis3.internal.config import settings
+from vis3.internal.utils.sqlite import ThreadLocalSqlite
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+# 可用于排序的列
+SORT_COLUMNS = {
+    "key": "key",
+    "size": "size",
+    "last_modified": "last_modified",
+}
+
+_CRAWL_PAGE_SIZE = 1000
+
+
+class CrawlState(NamedTuple):
+    generation: int
+    entries: int
+    started_at: float | None
+    completed_at: float | None
+
+    @property
+    def age(self) -> float | None:
+        return time.time() - self.completed_at if self.completed_at else None
+
+
+class ListingIndex:
+    """
+    目录列表的本地索引（SQLite）。
+
+    后台任务按分隔符 "/" 完整列出一个前缀的直接子项写入索引，每次刷新使用新的 generation 覆盖写入，
+    完成后删除旧 generation 中已经不存在的条目，刷新期间读取的始终是完整的列表。
+    索引在 LISTING_INDEX_MAX_AGE 秒内可用于查询，超过 LISTING_INDEX_REFRESH_AFTER 秒后在后台刷新。
+    """
+
+    def __init__(self, path: str, refresh_after: float, max_age: float):
+        self.path = path
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self._db = ThreadLocalSqlite(
+            path,
+            [
+                "CREATE TABLE IF NOT EXISTS listing_entries ("
+                "endpoint TEXT NOT NULL, bucket TEXT NOT NULL, prefix TEXT NOT NULL, "
+                "key TEXT NOT NULL, type TEXT NOT NULL, size INTEGER, last_modified TEXT, "
+                "etag TEXT, owner_name TEXT, owner_id TEXT, generation INTEGER NOT NULL, "
+                "PRIMARY KEY (endpoint, bucket, prefix, key))",
+                "CREATE INDEX IF NOT EXISTS listing_entries_size "
+                "ON listing_entries (endpoint, bucket, prefix, size)",
+                "CREATE INDEX IF NOT EXISTS listing_entries_last_modified "
+                "ON listing_entries (endpoint, bucket, prefix, last_modified)",
+                "CREATE TABLE IF NOT EXISTS listing_crawls ("
+                "endpoint TEXT NOT NULL, bucket TEXT NOT NULL, prefix TEXT NOT NULL, "
+                "generation INTEGER NOT NULL, entries INTEGER NOT NULL DEFAULT 0, "
+                "started_at REAL, completed_at REAL, "
+                "PRIMARY KEY (endpoint, bucket, prefix))",
+            ],
+        )
+
+    @staticmethod
+    def _scope(reader: "S3Reader", prefix: str | None = None) -> tuple[str, str, str]:
+        if prefix is None:
+            prefix = reader.key_without_query
+        return reader.endpoint_url or "", reader.bucket_name, prefix
+
+    def _state_sync(self, scope: tuple[str, str, str]) -> CrawlState | None:
+        row = self._db.connect().execute(
+            "SELECT generation, entries, started_at, completed_at FROM listing_crawls "
+            "WHERE endpoint = ? AND bucket = ? AND prefix = ?",
+            scope,
+        ).fetchone()
+        return CrawlState(*row) if row else None
+
+    async def state(self, reader: "S3Reader", prefix: str | None = None) -> CrawlState | None:
+        return await run_in_executor(self._state_sync, self._scope(reader, prefix))
+
+    def is_usable(self, state: CrawlState | None) -> bool:
+        return state is not None and state.age is not None and state.age <= self.max_age
+
+    def needs_refresh(self, state: CrawlState | None) -> bool:
+        return state is None or state.age is None or state.age > self.refresh_after
+
+    def _query_sync(
+        self,
+        scope: tuple[str, str, str],
+        offset: int,
+        limit: int,
+        sort: str,
+        descending: bool,
+        start_after: str | None,
+    ) -> list[tuple]:
+        column = SORT_COLUMNS[sort]
+        order = "DESC" if descending else "ASC"
+        sql = (
+            "SELECT key, type, size, last_modified, etag, owner_name, owner_id "
+            "FROM listing_entries WHERE endpoint = ? AND bucket = ? AND prefix = ?"
+        )
+        params: list = list(scope)
+        if start_after:
+            sql += " AND key > ?"
+            params.append(start_after)
+        sql += f" ORDER BY {column} {order}, key {order} LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return self._db.connect().execute(sql, params).fetchall()
+
+    async def query(
+        self,
+        reader: "S3Reader",
+        offset: int,
+        limit: int,
+        sort: str = "key",
+        descending: bool = False,
+        start_after: str | None = None,
+        prefix: str | None = None,
+    ) -> list[tuple[str, dict, str]]:
+        """
+        从索引中读取一页，返回与 S3Reader.list_page 相同格式的条目，prefix 默认为 reader 所在的目录
+        """
+        rows = await run_in_executor(
+            self._query_sync,
+            self._scope(reader, prefix),
+            offset,
+            limit,
+            sort,
+            descending,
+            start_after,
+        )
+
+        entries = []
+        for key, entry_type, size, last_modified, etag, owner_name, owner_id in rows:
+            if entry_type == "directory":
+                details = {"Prefix": key}
+            else:
+                details = {
+                    "Key": key,
+                    "Size": size,
+                    "LastModified": datetime.fromisoformat(last_modified)
+                    if last_modified
+                    else None,
+                    "ETag": etag,
+                }
+                if owner_name is not None or owner_id is not None:
+                    details["Owner"] = {"DisplayName": owner_name, "ID": owner_id}
+            entries.append((f"s3://{reader.bucket_name}/{key}", details, entry_type))
+        return entries
+
+    def _begin_sync(self, scope: tuple[str, str, str]) -> int:
+        conn = self._db.connect()
+        row = conn.execute(
+            "SELECT generation FROM listing_crawls WHERE endpoint = ? AND bucket = ? AND prefix = ?",
+            scope,
+        ).fetchone()
+        generation = row[0] + 1 if row else 1
+        conn.execute(
+            "INSERT INTO listing_crawls (endpoint, bucket, prefix, generation, started_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (endpoint, bucket, prefix) DO UPDATE SET started_at = excluded.started_at",
+            (*scope, generation, time.time()),
+        )
+        return generation
+
+    def _write_sync(self, scope: tuple[str, str, str], generation: int, rows: list[tuple]):
+        conn = self._db.connect()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO listing_entries (endpoint, bucket, prefix, key, type, "
+                "size, last_modified, etag, owner_name, owner_id, generation) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(*scope, *row, generation) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _finish_sync(self, scope: tuple[str, str, str], generation: int, entries: int):
+        conn = self._db.connect()
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                "DELETE FROM listing_entries WHERE endpoint = ? AND bucket = ? AND prefix = ? "
+                "AND generation < ?",
+                (*scope, generation),
+            )
+            conn.execute(
+                "UPDATE listing_crawls SET generation = ?, entries = ?, completed_at = ? "
+                "WHERE endpoint = ? AND bucket = ? AND prefix = ?",
+                (generation, entries, time.time(), *scope),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def crawl(self, reader: "S3Reader", job: Job | None = None) -> int:
+        """
+        完整列出 reader 对应的前缀并写入索引，返回条目数
+        """
+        scope = self._scope(reader)
+        generation = await run_in_executor(self._begin_sync, scope)
+        listing = reader.listing_key(_CRAWL_PAGE_SIZE, recursive=False)
+
+        entries = 0
+        token = None
+        while True:
+            result = await reader.fetch_listing_page(listing, token)
+            rows = []
+            for content in result.get("Contents", []):
+                if content["Key"].endswith("/"):
+                    continue
+                owner = content.get("Owner") or {}
+                last_modified = content.get("LastModified")
+                rows.append(
+                    (
+                        content["Key"],
+                        "file",
+                        content.get("Size"),
+                        last_modified.isoformat() if last_modified else None,
+                        content.get("ETag"),
+                        owner.get("DisplayName"),
+                        owner.get("ID"),
+                    )
+                )
+            for _prefix in result.get("CommonPrefixes", []):
+                rows.append((_prefix["Prefix"], "directory", None, None, None, None, None))
+
+            if rows:
+                await run_in_executor(self._write_sync, scope, generation, rows)
+                entries += len(rows)
+            if job is not None:
+                job.progress["entries"] = entries
+
+            token = result.get("NextContinuationToken")
+            if not token:
+                break
+
+        await run_in_executor(self._finish_sync, scope, generation, entries)
+        return entries
+
+    def schedule_crawl(self, reader: "S3Reader") -> Job:
+        """
+        在后台刷新索引，同一前缀同时只有一个刷新任务
+        """
+        return job_registry.submit(
+            "listing_crawl",
+            self._scope(reader),
+            lambda job: self.crawl(reader, job),
+        )
+
+    def _invalidate_sync(self, endpoint: str | None, bucket: str | None):
+        conn = self._db.connect()
+        for table in ("listing_entries", "listing_crawls"):
+            sql = f"DELETE FROM {table} WHERE endpoint = ?"
+            params = [endpoint or ""]
+            if bucket:
+                sql += " AND bucket = ?"
+                params.append(bucket)
+            conn.execute(sql, params)
+
+    async def invalidate(self, endpoint: str | None = None, bucket: str | None = None):
+        await run_in_executor(self._invalidate_sync, endpoint, bucket)
+
+
+listing_index = (
+    ListingIndex(
+        path=settings.LISTING_INDEX_PATH
+        or os.path.join(settings.BASE_DATA_DIR, "vis3.listing.sqlite"),
+        refresh_after=settings.LISTING_INDEX_REFRESH_AFTER,
+        max_age=settings.LISTING_INDEX_MAX_AGE,
+    )
+    if settings.LISTING_INDEX_ENABLED
+    else None
+)
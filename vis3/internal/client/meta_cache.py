@@ -0,0 +1,88 @@
+import time
+from typing import Any, NamedTuple
+
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+
+class ObjectPath(NamedTuple):
+    endpoint: str | None
+    bucket: str
+    key: str
+
+
+class ObjectMetaCache:
+    """
+    跨请求共享的对象元数据缓存。
+
+    每个对象缓存 HEAD 结果（ContentLength、ETag、LastModified 等）、识别出的 mimetype 以及 owner，
+    在 S3_META_CACHE_TTL 秒内直接复用，超过该时间窗口后重新向 S3 获取。
+    各字段单独记录过期时间，之后写入的字段（例如 owner）不会延长已缓存的 HEAD 结果的有效期。
+
+    同一前缀下的对象通常属于同一个 owner，因此 owner 额外按前缀缓存，
+    避免每次打开文件都发起一次 LIST。
+    """
+
+    def __init__(self, max_size: int, ttl: float, owner_ttl: float):
+        self.ttl = ttl
+        # 字段 -> (过期时间, 值)
+        self._cache: TTLCache[dict[str, tuple[float, Any]]] = TTLCache(max_size=max_size, ttl=ttl)
+        self._prefix_owners: TTLCache[str | None] = TTLCache(
+            max_size=max_size, ttl=owner_ttl
+        )
+
+    def get(self, obj: ObjectPath, field: str, default: Any = None) -> Any:
+        entry = self._cache.get(obj)
+        item = entry.get(field) if entry else None
+        if item is None or item[0] < time.monotonic():
+            return default
+        return item[1]
+
+    def update(self, obj: ObjectPath, **fields: Any):
+        expires_at = time.monotonic() + self.ttl
+        entry = self._cache.get(obj)
+        updated = {name: (expires_at, value) for name, value in fields.items()}
+        self._cache.set(obj, {**entry, **updated} if entry else updated)
+
+    def get_prefix_owner(self, prefix: ObjectPath, default: Any = None) -> Any:
+        return self._prefix_owners.get(prefix, default)
+
+    def set_prefix_owner(self, prefix: ObjectPath, owner: str | None):
+        self._prefix_owners.set(prefix, owner)
+
+    def invalidate(
+        self,
+        endpoint: str | None = None,
+        bucket: str | None = None,
+        key: str | None = None,
+    ):
+        def match(obj: ObjectPath) -> bool:
+            return (
+                (endpoint is None or obj.endpoint == endpoint)
+                and (bucket is None or obj.bucket == bucket)
+                and (key is None or obj.key == key)
+            )
+
+        self._cache.invalidate(match)
+        self._prefix_owners.invalidate(match)
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "prefix_owners": self._prefix_owners.stats(),
+        }
+
+
+def parent_prefix(key: str) -> str:
+    return key.rsplit("/", 1)[0] + "/" if "/" in key else ""
+
+
+def format_owner(owner: dict | None) -> str | None:
+    return f"{owner.get('DisplayName')}/{owner.get('ID')}" if owner else None
+
+
+object_meta_cache = ObjectMetaCache(
+    max_size=settings.S3_META_CACHE_SIZE,
+    ttl=settings.S3_META_CACHE_TTL,
+    owner_ttl=settings.S3_OWNER_CACHE_TTL,
+)
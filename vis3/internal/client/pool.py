@@ -0,0 +1,160 @@
+import hashlib
+import time
+from threading import Lock
+from typing import Any, NamedTuple
+
+import boto3
+from botocore.client import Config
+from loguru import logger
+
+from vis3.internal.config import settings
+
+
+class ClientKey(NamedTuple):
+    access_key_id: str
+    endpoint: str | None
+    region_name: str | None
+    addressing_style: str
+
+
+class _PooledClient:
+    __slots__ = ("client", "secret_digest", "last_used")
+
+    def __init__(self, client: Any, secret_digest: str):
+        self.client = client
+        self.secret_digest = secret_digest
+        self.last_used = time.monotonic()
+
+
+def _digest(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class S3ClientPool:
+    """
+    进程级 boto3 client 注册表。
+
+    boto3 client 是线程安全的，同一 (ak, endpoint, region, addressing_style) 共享一个 client，
+    从而复用 botocore session、endpoint 解析结果以及底层 urllib3 连接池（TLS 连接）。
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = 50,
+        tcp_keepalive: bool = True,
+        idle_timeout: float = 600,
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.tcp_keepalive = tcp_keepalive
+        self.idle_timeout = idle_timeout
+        self._clients: dict[ClientKey, _PooledClient] = {}
+        self._lock = Lock()
+        # boto3 默认 session 创建 client 时并非线程安全，使用独立 session 并加锁
+        self._session = boto3.session.Session()
+        self._last_sweep = time.monotonic()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _build_config(self, addressing_style: str) -> Config:
+        config_kwargs: dict[str, Any] = {
+            "s3": {"addressing_style": addressing_style},
+            "signature_version": "s3v4",
+            "max_pool_connections": self.max_pool_connections,
+            "tcp_keepalive": self.tcp_keepalive,
+        }
+        if addressing_style == "path":
+            config_kwargs["retries"] = {"max_attempts": 8}
+        return Config(**config_kwargs)
+
+    def _create_client(self, key: ClientKey, sk: str):
+        return self._session.client(
+            "s3",
+            aws_access_key_id=key.access_key_id,
+            aws_secret_access_key=sk,
+            region_name=key.region_name,
+            endpoint_url=key.endpoint,
+            config=self._build_config(key.addressing_style),
+        )
+
+    def get(
+        self,
+        ak: str,
+        sk: str,
+        endpoint: str | None,
+        region_name: str | None,
+        addressing_style: str = "virtual",
+    ):
+        """
+        获取（或创建）共享的 client。secret key 变化时自动重建。
+        """
+        key = ClientKey(ak, endpoint, region_name, addressing_style)
+        secret_digest = _digest(sk or "")
+
+        with self._lock:
+            self._evict_idle_locked()
+
+            entry = self._clients.get(key)
+            if entry is not None and entry.secret_digest == secret_digest:
+                entry.last_used = time.monotonic()
+                self.reused += 1
+                return entry.client
+
+            if entry is not None:
+                self._close(entry)
+
+            client = self._create_client(key, sk)
+            self._clients[key] = _PooledClient(client, secret_digest)
+            self.created += 1
+            return client
+
+    def invalidate(self, access_key_id: str | None = None, endpoint: str | None = None):
+        """
+        移除匹配的 client，keychain 或 bucket 更新/删除后调用。
+
+        两个参数都为空时清空整个注册表。
+        """
+        with self._lock:
+            for key in list(self._clients.keys()):
+                if access_key_id is not None and key.access_key_id != access_key_id:
+                    continue
+                if endpoint is not None and key.endpoint != endpoint:
+                    continue
+                self._close(self._clients.pop(key))
+                self.evicted += 1
+
+    def _evict_idle_locked(self):
+        now = time.monotonic()
+        if self.idle_timeout <= 0 or now - self._last_sweep < min(self.idle_timeout, 60):
+            return
+        self._last_sweep = now
+
+        for key, entry in list(self._clients.items()):
+            if now - entry.last_used > self.idle_timeout:
+                self._close(self._clients.pop(key))
+                self.evicted += 1
+
+    @staticmethod
+    def _close(entry: _PooledClient):
+        try:
+            close = getattr(entry.client, "close", None)
+            if close:
+                close()
+        except Exception as e:
+            logger.warning(f"Failed to close s3 client: {e}")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+s3_client_pool = S3ClientPool(
+    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=settings.S3_TCP_KEEPALIVE,
+    idle_timeout=settings.S3_CLIENT_IDLE_TIMEOUT,
+)
@@ -0,0 +1,466 @@
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, NamedTuple
+
+from vis3.internal.client.list_cursor import _MAX_CHAR, resume_after
+from vis3.internal.common.jobs import Job, job_registry
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+# 并行列出时在切分点的词干后按这些字符切分 key 空间
+_SHARD_CHARS = "0123456789ACEGIKMOQSUWYacegikmoqsuwy"
+_PAGE_SIZE = 1000
+# 按扩展名统计时最多保留的扩展名数量，其余合并到 "*"
+_MAX_EXTENSIONS = 50
+_MAX_EXTENSION_LENGTH = 16
+
+
+def _start_after(bound: str) -> str:
+    # 比 bound 小的最大字符串（忽略包含 U+10FFFF 的 key），用于构造区间起点的 StartAfter
+    return bound[:-1] + chr(ord(bound[-1]) - 1) + _MAX_CHAR
+
+
+def _children(result: dict) -> tuple[list[dict], list[str]]:
+    contents = [
+        content
+        for content in result.get("Contents", [])
+        if not content["Key"].endswith("/")
+    ]
+    return contents, [_prefix["Prefix"] for _prefix in result.get("CommonPrefixes", [])]
+
+
+def _entry_keys(result: dict) -> list[str]:
+    return [content["Key"] for content in result.get("Contents", [])] + [
+        _prefix["Prefix"] for _prefix in result.get("CommonPrefixes", [])
+    ]
+
+
+async def _list(
+    reader: "S3Reader",
+    prefix: str,
+    semaphore: asyncio.Semaphore,
+    start_after: str | None,
+    token: str | None,
+) -> dict:
+    params = {
+        "Bucket": reader.bucket_name,
+        "Prefix": prefix,
+        "Delimiter": "/",
+        "MaxKeys": _PAGE_SIZE,
+    }
+    if token:
+        params["ContinuationToken"] = token
+    elif start_after:
+        params["StartAfter"] = start_after
+    # 只在单次请求期间占用并发额度，嵌套的并行列出不会互相等待
+    async with semaphore:
+        return await reader.transport.list_objects_v2(**params)
+
+
+def _shard_chars(char: str | None) -> str:
+    # 切分点处的字符已知时只在同类字符（数字、大写、小写字母）中切分，避免切出大量空区间
+    for test in (str.isdigit, str.isupper, str.islower):
+        if char is not None and test(char):
+            return "".join(ch for ch in _SHARD_CHARS if test(ch))
+    return _SHARD_CHARS
+
+
+def _split_bounds(prefix: str, keys: list[str], last: str, upper: str | None) -> list[str]:
+    """
+    按已列出的一页 key 选择 (last, upper) 区间的切分点。
+
+    取这一页 key 的公共前缀，去掉最后一个字符作为词干，在词干后切分；
+    key 都很相近时（如 part-0000123.jsonl）切分点也随之加深。词干后选不出切分点时逐级缩短词干，直到 prefix。
+    """
+    common = os.path.commonprefix(keys)
+    for depth in range(max(len(common) - 1, len(prefix)), len(prefix) - 1, -1):
+        stem = common[:depth]
+        bounds = [
+            stem + ch
+            for ch in _shard_chars(common[depth] if depth < len(common) else None)
+            if stem + ch > last and (upper is None or stem + ch < upper)
+        ]
+        if bounds:
+            return bounds
+    return []
+
+
+def _emit(
+    result: dict,
+    start_after: str | None,
+    upper: str | None,
+    on_page: Callable[[list[dict], list[str]], None],
+):
+    # StartAfter 落在某个子目录内时 S3 仍会返回该子目录，它已经属于上一个区间，按区间下界过滤掉
+    contents, prefixes = _children(result)
+    if start_after is not None:
+        prefixes = [_prefix for _prefix in prefixes if _prefix > start_after]
+    if upper is not None:
+        contents = [content for content in contents if content["Key"] < upper]
+        prefixes = [_prefix for _prefix in prefixes if _prefix < upper]
+    on_page(contents, prefixes)
+
+
+def _exhausted(result: dict, upper: str | None) -> bool:
+    # 没有下一页，或本页已越过区间上界（后续页都属于下一个区间）
+    entries = _entry_keys(result)
+    return not result.get("NextContinuationToken") or (
+        upper is not None and bool(entries) and max(entries) >= upper
+    )
+
+
+async def _list_range(
+    reader: "S3Reader",
+    prefix: str,
+    semaphore: asyncio.Semaphore,
+    start_after: str,
+    upper: str | None,
+    on_page: Callable[[list[dict], list[str]], None],
+    progress: dict | None,
+):
+    """列出 (start_after, upper) 区间内的子项，upper 为 None 表示直到末尾"""
+    result = await _list(reader, prefix, semaphore, start_after, None)
+    _emit(result, start_after, upper, on_page)
+    if not _exhausted(result, upper):
+        await _list_rest(reader, prefix, semaphore, result, upper, on_page, progress)
+    if progress is not None:
+        progress["shards_done"] += 1
+
+
+async def _list_rest(
+    reader: "S3Reader",
+    prefix: str,
+    semaphore: asyncio.Semaphore,
+    result: dict,
+    upper: str | None,
+    on_page: Callable[[list[dict], list[str]], None],
+    progress: dict | None,
+):
+    """
+    列出 result 这一页之后、upper 之前的子项。
+
+    按这一页的 key 切分剩余区间，以 StartAfter 并行列出；每个区间读完第一页后仍有数据时再按同样的方式切分，
+    因此只集中在一个区间内的大量 key 也会被并行列出。选不出切分点时按 continuation token 读取下一页后重试。
+    """
+    while True:
+        entries = _entry_keys(result)
+        # 这一页的最后一项是子目录时，从该子目录之后继续，否则会再次得到它
+        last = resume_after(max(entries), "/")
+        bounds = _split_bounds(prefix, entries, last, upper)
+        if bounds:
+            break
+
+        result = await _list(reader, prefix, semaphore, None, result["NextContinuationToken"])
+        _emit(result, None, upper, on_page)
+        if _exhausted(result, upper):
+            return
+
+    ranges = list(zip([last] + [_start_after(bound) for bound in bounds], bounds + [upper]))
+    if progress is not None:
+        progress["shards"] += len(ranges)
+
+    tasks = [
+        asyncio.ensure_future(
+            _list_range(reader, prefix, semaphore, a, b, on_page, progress)
+        )
+        for a, b in ranges
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def list_children(
+    reader: "S3Reader",
+    prefix: str,
+    semaphore: asyncio.Semaphore,
+    on_page: Callable[[list[dict], list[str]], None],
+    progress: dict | None = None,
+):
+    """
+    列出 prefix 的直接子项，每页调用 on_page(文件, 子目录)。
+
+    先顺序读取第一页，只有一页的目录只需一次请求；更大的目录按已列出的 key 逐级切分成多个区间并行列出（见 _list_rest），
+    每个区间最多多读一页。
+    """
+    first = await _list(reader, prefix, semaphore, None, None)
+    on_page(*_children(first))
+    if not first.get("NextContinuationToken"):
+        return
+
+    if progress is not None:
+        progress.setdefault("shards", 0)
+        progress.setdefault("shards_done", 0)
+    await _list_rest(reader, prefix, semaphore, first, None, on_page, progress)
+
+
+async def walk_prefixes(
+    root: str,
+    visit: Callable[[str], Awaitable[Iterable[str]]],
+    concurrency: int,
+):
+    """
+    从 root 开始按子目录并行遍历：concurrency 个 worker 从队列中取出目录，
+    visit 处理一个目录并返回它的子目录，所有目录处理完或任一 visit 出错时结束。
+    """
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    queue.put_nowait(root)
+
+    async def worker():
+        while True:
+            prefix = await queue.get()
+            try:
+                for child in await visit(prefix):
+                    queue.put_nowait(child)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(concurrency, 1))]
+    join = asyncio.ensure_future(queue.join())
+    try:
+        done, _ = await asyncio.wait([join, *workers], return_when=asyncio.FIRST_COMPLETED)
+        if join not in done:
+            # worker 只会因异常退出
+            for task in done:
+                task.result()
+    finally:
+        join.cancel()
+        for task in workers:
+            task.cancel()
+
+
+class PrefixCount(NamedTuple):
+    objects: int
+    directories: int
+    counted_at: float
+
+    @property
+    def total(self) -> int:
+        return self.objects + self.directories
+
+
+class PrefixCounter:
+    """
+    统计目录下直接子项（文件与子目录）的数量。
+
+    结果按 S3_PREFIX_STATS_TTL 缓存，计数在后台任务中进行，进度通过任务的 progress 查询。
+    """
+
+    def __init__(self, ttl: float, concurrency: int):
+        self.concurrency = concurrency
+        self._results: TTLCache[PrefixCount] = TTLCache(max_size=10000, ttl=ttl)
+
+    @staticmethod
+    def _scope(reader: "S3Reader") -> tuple[str | None, str, str]:
+        return reader.endpoint_url, reader.bucket_name, reader.key_without_query
+
+    def get(self, reader: "S3Reader") -> PrefixCount | None:
+        return self._results.get(self._scope(reader))
+
+    def set(self, reader: "S3Reader", objects: int, directories: int):
+        self._results.set(
+            self._scope(reader), PrefixCount(objects, directories, time.time())
+        )
+
+    def find_job(self, reader: "S3Reader") -> Job | None:
+        return job_registry.find("prefix_count", self._scope(reader))
+
+    def schedule(self, reader: "S3Reader") -> Job:
+        return job_registry.submit(
+            "prefix_count",
+            self._scope(reader),
+            lambda job: self.count(reader, job),
+        )
+
+    async def count(self, reader: "S3Reader", job: Job | None = None) -> PrefixCount:
+        progress = job.progress if job is not None else {}
+        progress.update(objects=0, directories=0)
+
+        def on_page(contents: list[dict], prefixes: list[str]):
+            progress["objects"] += len(contents)
+            progress["directories"] += len(prefixes)
+
+        await list_children(
+            reader,
+            reader.key_without_query,
+            asyncio.Semaphore(max(self.concurrency, 1)),
+            on_page,
+            progress,
+        )
+
+        self.set(reader, progress["objects"], progress["directories"])
+        return self.get(reader)
+
+    def invalidate(self, endpoint: str | None = None, bucket: str | None = None):
+        self._results.invalidate(
+            lambda scope: (endpoint is None or scope[0] == endpoint)
+            and (bucket is None or scope[1] == bucket)
+        )
+
+    def stats(self) -> dict:
+        return self._results.stats()
+
+
+def _extension(key: str) -> str:
+    extension = os.path.splitext(key.rsplit("/", 1)[-1])[1].lower()
+    return extension if len(extension) <= _MAX_EXTENSION_LENGTH else ""
+
+
+class DirectorySize(NamedTuple):
+    """单个目录直接包含的文件的统计，以及它的子目录"""
+
+    bytes: int
+    objects: int
+    # 扩展名 -> [文件数, 字节数]
+    extensions: dict[str, list[int]]
+    children: tuple[str, ...]
+    listed_at: float
+
+
+class SizeTotals:
+    """递归统计过程中的累计值"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.objects = 0
+        self.directories = 0
+        self.extensions: dict[str, list[int]] = {}
+
+    def add(self, directory: DirectorySize):
+        self.bytes += directory.bytes
+        self.objects += directory.objects
+        self.directories += len(directory.children)
+        for extension, (objects, size) in directory.extensions.items():
+            total = self.extensions.setdefault(extension, [0, 0])
+            total[0] += objects
+            total[1] += size
+
+    def to_dict(self) -> dict:
+        ranked = sorted(self.extensions.items(), key=lambda item: item[1][1], reverse=True)
+        extensions = {
+            extension: {"objects": objects, "bytes": size}
+            for extension, (objects, size) in ranked[:_MAX_EXTENSIONS]
+        }
+        if len(ranked) > _MAX_EXTENSIONS:
+            extensions["*"] = {
+                "objects": sum(objects for _, (objects, _) in ranked[_MAX_EXTENSIONS:]),
+                "bytes": sum(size for _, (_, size) in ranked[_MAX_EXTENSIONS:]),
+            }
+        return {
+            "bytes": self.bytes,
+            "objects": self.objects,
+            "directories": self.directories,
+            "extensions": extensions,
+        }
+
+
+class PrefixSizer:
+    """
+    递归统计前缀下所有文件的大小、数量以及按扩展名的分布。
+
+    以子目录（CommonPrefixes）为分片，多个 worker 并行列出各个目录，单个目录很大时再按字符区间切分；
+    所有 LIST 请求共享 S3_PREFIX_SIZE_CONCURRENCY 的并发额度。
+    每个目录的统计单独缓存，再次统计时只重新列出超过 S3_PREFIX_SIZE_REFRESH_AFTER 秒的目录。
+    """
+
+    def __init__(self, max_directories: int, ttl: float, refresh_after: float, concurrency: int):
+        self.refresh_after = refresh_after
+        self.concurrency = concurrency
+        self._directories: TTLCache[DirectorySize] = TTLCache(
+            max_size=max_directories, ttl=ttl
+        )
+
+    @staticmethod
+    def _scope(reader: "S3Reader") -> tuple[str | None, str, str]:
+        return reader.endpoint_url, reader.bucket_name, reader.key_without_query
+
+    def schedule(self, reader: "S3Reader", refresh: bool = False) -> Job:
+        """
+        在后台统计，同一前缀同时只有一个统计任务
+        """
+        return job_registry.submit(
+            "prefix_size",
+            self._scope(reader),
+            lambda job: self.measure(reader, job, refresh),
+        )
+
+    async def _list_directory(
+        self, reader: "S3Reader", prefix: str, semaphore: asyncio.Semaphore
+    ) -> DirectorySize:
+        totals = {"bytes": 0, "objects": 0}
+        extensions: dict[str, list[int]] = {}
+        children: list[str] = []
+
+        def on_page(contents: list[dict], prefixes: list[str]):
+            for content in contents:
+                size = content.get("Size") or 0
+                totals["bytes"] += size
+                totals["objects"] += 1
+                total = extensions.setdefault(_extension(content["Key"]), [0, 0])
+                total[0] += 1
+                total[1] += size
+            children.extend(prefixes)
+
+        await list_children(reader, prefix, semaphore, on_page)
+        return DirectorySize(
+            totals["bytes"],
+            totals["objects"],
+            extensions,
+            tuple(sorted(children)),
+            time.time(),
+        )
+
+    async def measure(self, reader: "S3Reader", job: Job | None = None, refresh: bool = False) -> dict:
+        progress = job.progress if job is not None else {}
+        totals = SizeTotals()
+        progress.update(totals.to_dict(), directories_done=0, directories_listed=0)
+
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        now = time.time()
+
+        async def visit(prefix: str) -> tuple[str, ...]:
+            key = (reader.endpoint_url, reader.bucket_name, prefix)
+            directory = self._directories.get(key)
+            if directory is None or refresh or now - directory.listed_at > self.refresh_after:
+                directory = await self._list_directory(reader, prefix, semaphore)
+                self._directories.set(key, directory)
+                progress["directories_listed"] += 1
+
+            totals.add(directory)
+            progress.update(totals.to_dict())
+            progress["directories_done"] += 1
+            return directory.children
+
+        await walk_prefixes(reader.key_without_query, visit, self.concurrency)
+
+        result = totals.to_dict()
+        progress.update(result)
+        return result
+
+    def invalidate(self, endpoint: str | None = None, bucket: str | None = None):
+        self._directories.invalidate(
+            lambda scope: (endpoint is None or scope[0] == endpoint)
+            and (bucket is None or scope[1] == bucket)
+        )
+
+    def stats(self) -> dict:
+        return self._directories.stats()
+
+
+prefix_counter = PrefixCounter(
+    ttl=settings.S3_PREFIX_STATS_TTL,
+    concurrency=settings.S3_PREFIX_STATS_CONCURRENCY,
+)
+
+prefix_sizer = PrefixSizer(
+    max_directories=settings.S3_PREFIX_SIZE_CACHE_SIZE,
+    ttl=settings.S3_PREFIX_SIZE_TTL,
+    refresh_after=settings.S3_PREFIX_SIZE_REFRESH_AFTER,
+    concurrency=settings.S3_PREFIX_STATS_CONCURRENCY,
+)
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from vis3.internal.client.block_cache import block_cache
+from vis3.internal.client.meta_cache import ObjectPath
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+
+# 每个对象最多同时跟踪的顺序读取流，以及流多久没有读取后视为失效
+_MAX_STREAMS = 8
+_STREAM_IDLE = 60
+
+
+class _Stream:
+    __slots__ = ("session", "next_offset", "window", "prefetched_until", "task", "last_read")
+
+    def __init__(self, session: str | None, window: int):
+        self.session = session
+        self.next_offset = -1
+        self.window = window
+        self.prefetched_until = 0
+        self.task: asyncio.Task | None = None
+        self.last_read = 0.0
+
+
+class ReadAhead:
+    """
+    顺序翻页的后台预读。
+
+    每个对象为每个读取者（S3Reader.session，即用户或客户端）跟踪一个顺序读取流，记录上一次读取结束的位置：
+    读取从该位置（或已预读的范围内）开始时视为顺序访问，预读窗口翻倍直到 max_window；
+    否则视为跳转，取消该读取者在途的预读并从 min_window 重新开始，不影响其他读取者的流。
+    超过 _STREAM_IDLE 秒没有读取的流、以及流数超过 _MAX_STREAMS 时最久没有读取的流被丢弃并取消其预读。
+    预读的数据写入块缓存，所有在途预读的字节数受 max_in_flight 限制。
+    """
+
+    def __init__(self, min_window: int, max_window: int, max_in_flight: int):
+        self.min_window = min_window
+        self.max_window = max_window
+        self.max_in_flight = max_in_flight
+        self._streams: TTLCache[list[_Stream]] = TTLCache(max_size=1024, ttl=600)
+        self.in_flight = 0
+        self.started = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.prefetched_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_window > 0 and self.max_in_flight > 0 and block_cache.enabled
+
+    def on_read(self, reader: "S3Reader", start: int, end: int, size: int | None = None):
+        """
+        记录一次 [start, end) 的读取并按需发起预读，size 为对象大小
+        """
+        if not self.enabled or end <= start:
+            return
+
+        key = ObjectPath(reader.endpoint_url, reader.bucket_name, reader.key_without_query)
+        now = time.monotonic()
+        streams = []
+        for stream in self._streams.get(key) or []:
+            if now - stream.last_read > _STREAM_IDLE:
+                self._cancel(stream)
+            else:
+                streams.append(stream)
+
+        stream = next((stream for stream in streams if stream.session == reader.session), None)
+        if stream is None:
+            stream = _Stream(reader.session, self.min_window)
+            stream.last_read = now
+            streams.append(stream)
+            if len(streams) > _MAX_STREAMS:
+                stale = min(streams, key=lambda item: item.last_read)
+                self._cancel(stale)
+                streams.remove(stale)
+        elif stream.next_offset <= start <= max(stream.next_offset, stream.prefetched_until):
+            stream.window = min(stream.window * 2, self.max_window)
+        else:
+            # 跳转：原位置之后的预读不再需要
+            self._cancel(stream)
+            stream.window = self.min_window
+            stream.prefetched_until = 0
+
+        stream.next_offset = end
+        stream.last_read = now
+        self._streams.set(key, streams)
+        if stream.task is not None and not stream.task.done():
+            # 上一段还没读完，等下一次读取再继续扩展
+            return
+
+        if stream.prefetched_until - end > stream.window // 2:
+            # 已预读的数据还够用，不足半个窗口时再补充
+            return
+
+        fetch_start = max(end, stream.prefetched_until)
+        fetch_end = end + stream.window
+        if size is not None:
+            fetch_end = min(fetch_end, size)
+        if fetch_end <= fetch_start:
+            return
+
+        budget = self.max_in_flight - self.in_flight
+        if budget < block_cache.block_size:
+            self.skipped += 1
+            return
+        fetch_end = min(fetch_end, fetch_start + budget)
+
+        length = fetch_end - fetch_start
+        self.in_flight += length
+        self.started += 1
+        stream.prefetched_until = fetch_end
+        stream.task = asyncio.ensure_future(self._fetch(reader, fetch_start, fetch_end))
+        stream.task.add_done_callback(
+            lambda task: self._on_done(task, stream, fetch_start, length)
+        )
+
+    @staticmethod
+    async def _fetch(reader: "S3Reader", start: int, end: int) -> int:
+        return len(await reader.read_range(start, end))
+
+    def _on_done(self, task: asyncio.Task, stream: _Stream, start: int, length: int):
+        self.in_flight -= length
+        # 跳转后发起的新预读不受旧任务结果影响
+        current = stream.task is task
+
+        if task.cancelled():
+            if current:
+                stream.prefetched_until = min(stream.prefetched_until, start)
+            return
+
+        error = task.exception()
+        if error is not None:
+            logger.debug(f"read-ahead failed: {error}")
+            if current:
+                stream.prefetched_until = min(stream.prefetched_until, start)
+            return
+
+        self.prefetched_bytes += task.result()
+
+    def _cancel(self, stream: _Stream):
+        if stream.task is not None and not stream.task.done():
+            stream.task.cancel()
+            self.cancelled += 1
+        stream.task = None
+
+    def stats(self) -> dict:
+        return {
+            "min_window": self.min_window,
+            "max_window": self.max_window,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "streams": self._streams.stats()["size"],
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "prefetched_bytes": self.prefetched_bytes,
+        }
+
+
+readahead = ReadAhead(
+    min_window=settings.S3_READAHEAD_MIN_WINDOW,
+    max_window=settings.S3_READAHEAD_MAX_WINDOW,
+    max_in_flight=settings.S3_READAHEAD_MAX_IN_FLIGHT,
+)
@@ -0,0 +1,194 @@
+"""
+JSONL 文件概况：行数、行长度分布、顶层字段的类型与空值率。
+
+统计在 row_scanner 的子进程中按数据块并行进行（orjson 解析），各块的结果在主进程中合并，
+结果按对象的 ETag 保存在本地，对象不变时不会重复统计。
+"""
+
+import os
+from contextlib import aclosing
+from typing import TYPE_CHECKING
+
+import orjson
+
+from vis3.internal.client.etag_store import ETagStore
+from vis3.internal.client.row_scan import row_scanner
+from vis3.internal.common.jobs import Job, job_registry
+from vis3.internal.config import settings
+from vis3.internal.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+_PERCENTILES = (50, 90, 99)
+
+
+class ProfileAccumulator:
+    """合并各数据块的统计结果（见 scan_worker.profile_block）"""
+
+    def __init__(self, max_fields: int):
+        self.max_fields = max_fields
+        self.rows = 0
+        self.empty = 0
+        self.invalid = 0
+        self.non_object = 0
+        self.bytes = 0
+        self.min: int | None = None
+        self.max = 0
+        self.lengths: dict[int, int] = {}
+        self.fields: dict[str, dict[str, int]] = {}
+        self.fields_truncated = False
+
+    def merge(self, part: dict):
+        if not part["rows"]:
+            return
+        self.rows += part["rows"]
+        self.empty += part["empty"]
+        if part["min"] is None:
+            # 数据块中只有空行
+            return
+        self.invalid += part["invalid"]
+        self.non_object += part["non_object"]
+        self.bytes += part["bytes"]
+        self.min = part["min"] if self.min is None else min(self.min, part["min"])
+        self.max = max(self.max, part["max"])
+        for bucket, count in part["lengths"].items():
+            self.lengths[bucket] = self.lengths.get(bucket, 0) + count
+
+        self.fields_truncated = self.fields_truncated or part["fields_truncated"]
+        for name, types in part["fields"].items():
+            merged = self.fields.get(name)
+            if merged is None:
+                if len(self.fields) >= self.max_fields:
+                    self.fields_truncated = True
+                    continue
+                merged = self.fields[name] = {}
+            for type_name, count in types.items():
+                merged[type_name] = merged.get(type_name, 0) + count
+
+    def _percentiles(self, measured: int) -> dict:
+        result = {}
+        buckets = sorted(self.lengths.items())
+        seen = 0
+        i = 0
+        for q in _PERCENTILES:
+            # 第 rank 行（从 1 开始）所在的长度桶
+            rank = max(1, -(-measured * q // 100))
+            while seen + buckets[i][1] < rank:
+                seen += buckets[i][1]
+                i += 1
+            result[f"p{q}"] = buckets[i][0]
+        return result
+
+    def result(self, bytes_read: int, total_bytes: int) -> dict:
+        """
+        bytes_read 为读取的原始字节数（压缩文件为压缩后的字节数），
+        小于 total_bytes 时只统计了文件开头的部分，按比例估算总行数
+        """
+        sampled = bytes_read < total_bytes
+        # 空行不参与行长度与字段的统计
+        measured = self.rows - self.empty
+        objects = measured - self.invalid - self.non_object
+        fields = [
+            {
+                "name": name,
+                "present": sum(types.values()),
+                "present_rate": round(sum(types.values()) / objects, 4) if objects else 0,
+                "null": types.get("null", 0),
+                "null_rate": round(types.get("null", 0) / objects, 4) if objects else 0,
+                "types": dict(sorted(types.items(), key=lambda item: -item[1])),
+            }
+            for name, types in self.fields.items()
+        ]
+        fields.sort(key=lambda field: (-field["present"], field["name"]))
+
+        return {
+            "rows": self.rows,
+            "estimated_rows": round(self.rows * total_bytes / bytes_read)
+            if sampled and bytes_read
+            else self.rows,
+            "sampled": sampled,
+            "bytes_read": bytes_read,
+            "total_bytes": total_bytes,
+            "empty_rows": self.empty,
+            "invalid_rows": self.invalid,
+            "non_object_rows": self.non_object,
+            "line_length": {
+                "min": self.min or 0,
+                "max": self.max,
+                "mean": round(self.bytes / measured, 1) if measured else 0,
+                **(self._percentiles(measured) if measured else {f"p{q}": 0 for q in _PERCENTILES}),
+            },
+            "fields": fields,
+            "fields_truncated": self.fields_truncated,
+        }
+
+
+class ProfileStore(ETagStore[dict]):
+    """
+    文件概况的存储，结果按对象的 ETag 保存在本地，最近使用的结果保留在内存中；
+    统计失败的对象在一段时间内不再重试，避免每次打开文件都重新读取整个对象。
+    统计任务在独立的队列中执行，等待中的任务过多时 schedule 抛出 JobQueueFull。
+    """
+
+    kind = "profile"
+    suffix = ".json"
+
+    def __init__(
+        self, path: str, max_fields: int, sample_bytes: int, max_bytes: int, max_age: int
+    ):
+        super().__init__(path, 1000, max_bytes, max_age)
+        self.max_fields = max_fields
+        # 每个文件最多读取的字节数
+        self.sample_bytes = sample_bytes
+        self._failed: TTLCache[str] = TTLCache(max_size=1000, ttl=600)
+
+    def _dumps(self, value: dict) -> bytes:
+        return orjson.dumps(value)
+
+    def _loads(self, data: bytes) -> dict:
+        return orjson.loads(data)
+
+    def failure(self, reader: "S3Reader", etag: str) -> str | None:
+        """最近一次统计失败的原因"""
+        return self._failed.get(self._key(reader, etag))
+
+    async def build(self, reader: "S3Reader", etag: str, job: Job | None = None) -> dict:
+        key = self._key(reader, etag)
+        try:
+            head = await reader.head_object()
+            total_bytes = head.get("ContentLength") or 0
+            progress = job.progress if job is not None else {}
+            progress.update(total_bytes=total_bytes, lines=0)
+
+            accumulator = ProfileAccumulator(self.max_fields)
+            async with aclosing(
+                row_scanner.profile(reader, self.max_fields, self.sample_bytes, progress)
+            ) as parts:
+                async for part in parts:
+                    accumulator.merge(part)
+                    progress["lines"] = accumulator.rows
+
+            profile = accumulator.result(progress["bytes"], total_bytes)
+        except Exception as e:
+            self._failed.set(key, str(e))
+            raise
+
+        await self.save(reader, etag, profile)
+        return profile
+
+
+
+job_registry.add_queue(
+    "profile",
+    max_concurrency=settings.PROFILE_JOB_CONCURRENCY,
+    max_pending=settings.PROFILE_MAX_PENDING,
+)
+
+profile_store = ProfileStore(
+    path=settings.PROFILE_DIR or os.path.join(settings.BASE_DATA_DIR, "profile"),
+    max_fields=settings.PROFILE_MAX_FIELDS,
+    sample_bytes=settings.PROFILE_MAX_BYTES,
+    max_bytes=settings.LOCAL_STORE_MAX_BYTES,
+    max_age=settings.LOCAL_STORE_MAX_AGE,
+)
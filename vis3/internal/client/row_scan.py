@@ -0,0 +1,280 @@
+import asyncio
+import multiprocessing
+from bisect import bisect_right
+from collections import deque
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple
+
+from vis3.internal.client.codec import StreamDecompressor
+from vis3.internal.client.executor import run_cpu_bound
+from vis3.internal.client.gzip_members import GzipMemberIndex, gzip_member_store
+from vis3.internal.client.scan_worker import (MemberGroup, ScanSpec,
+                                              profile_block, scan_block,
+                                              scan_compressed_block)
+from vis3.internal.config import settings
+
+if TYPE_CHECKING:
+    from vis3.internal.client.s3_reader import S3Reader
+
+
+class ScanMatch(NamedTuple):
+    # 行号，从 0 开始
+    row: int
+    # 行在（解压后的）数据中的字节位置与长度，不含换行符
+    offset: int
+    length: int
+    content: str
+
+
+class RowScanner:
+    """
+    流式读取对象（支持 gzip、zstd、xz、bz2、lz4），按行过滤并返回匹配的行。
+
+    数据按 SCAN_BLOCK_SIZE 切成以完整行结束的块，交给子进程并行过滤，
+    同时在途的块数为进程数的两倍，匹配结果按文件顺序返回。SCAN_WORKERS 为 0 时在线程池中过滤。
+    多 member（frame）的压缩文件有 member 索引时，按 member 边界切分压缩数据，解压也在子进程中并行进行。
+    """
+
+    def __init__(self, workers: int, block_size: int):
+        self.workers = workers
+        self.block_size = block_size
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor | None:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn 出来的子进程只导入 scan_worker，不继承应用的线程与连接
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _run(self, func, *args):
+        pool = self._get_pool()
+        if pool is None:
+            return await run_cpu_bound(func, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # 子进程异常退出（例如被 OOM kill）后进程池不可再用，下次过滤时重新创建
+            if self._pool is pool:
+                self._pool = None
+            raise
+
+    async def _iter_blocks(self, reader: "S3Reader", progress: dict) -> AsyncIterator[bytes]:
+        """读取对象并切分成以完整行结束的块，progress["bytes"] 为已读取的原始字节数"""
+        decompressor = (
+            StreamDecompressor(reader.codec, max_block_size=self.block_size)
+            if reader.is_compressed
+            else None
+        )
+        pending: list[bytes] = []
+        pending_size = 0
+
+        async def pieces():
+            async for chunk in reader.transport.iter_object(
+                settings.S3_STREAM_CHUNK_SIZE if decompressor else self.block_size,
+                Bucket=reader.bucket_name,
+                Key=reader.key_without_query,
+            ):
+                progress["bytes"] += len(chunk)
+                if decompressor is None:
+                    yield chunk
+                    continue
+                block = await run_cpu_bound(decompressor.decompress, chunk)
+                while True:
+                    if block:
+                        yield block
+                    if decompressor.needs_input:
+                        break
+                    block = await run_cpu_bound(decompressor.decompress)
+                if decompressor.finished:
+                    return
+
+        async for piece in pieces():
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size < self.block_size:
+                continue
+
+            data = b"".join(pending)
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                yield data[:cut]
+                data = data[cut:]
+            pending, pending_size = ([data], len(data)) if data else ([], 0)
+
+        if pending:
+            yield b"".join(pending)
+
+    async def _iter_member_groups(
+        self, reader: "S3Reader", members: GzipMemberIndex, progress: dict
+    ) -> AsyncIterator[tuple[MemberGroup, int]]:
+        """
+        按 member 边界读取压缩数据，每组达到 block_size 字节即切分，返回 (MemberGroup, 解压后的起始位置)。
+
+        BGZF 等按固定大小切分 member 的文件中行常常跨越 member，在这样的边界切分时，
+        本组多读到下一个含换行的 member 为止以补全最后一行（由 member 索引中的累计换行数确定），下一组跳过开头的半行。
+        """
+        start = 0
+        base = 0
+        skip_head = False
+        for i in range(members.count):
+            end = members.compressed_ends[i]
+            if i < members.count - 1 and end - start < self.block_size:
+                continue
+
+            tail = end
+            size = None
+            if i < members.count - 1 and not members.aligned[i]:
+                following = bisect_right(members.newline_ends, members.newline_ends[i])
+                if following == members.count:
+                    # 之后不再有换行，剩余部分都属于最后一行
+                    continue
+                tail = members.compressed_ends[following]
+                size = members.uncompressed_ends[i] - base
+
+            data = await reader.read_range(start, tail)
+            progress["bytes"] += end - start
+            yield MemberGroup(data, skip_head, size), base
+            skip_head = size is not None
+            start = end
+            base = members.uncompressed_ends[i]
+
+    async def _iter_sources(self, reader: "S3Reader", progress: dict):
+        """
+        返回 (压缩格式, [(数据, 解压后的起始位置)])；压缩格式不为空时数据为一组 member（MemberGroup），
+        在子进程中解压，否则为解压后以完整行结束的数据块
+        """
+        if reader.is_compressed:
+            etag = (reader._header_info or {}).get("ETag")
+            members = await gzip_member_store.get(reader, etag) if etag else None
+            if members is not None and members.count > 1:
+                return reader.codec.name, self._iter_member_groups(reader, members, progress)
+
+        async def blocks():
+            offset = 0
+            async with aclosing(self._iter_blocks(reader, progress)) as source:
+                async for block in source:
+                    yield block, offset
+                    offset += len(block)
+
+        return None, blocks()
+
+    async def scan(
+        self,
+        reader: "S3Reader",
+        spec: ScanSpec,
+        limit: int,
+        progress: dict | None = None,
+    ) -> AsyncIterator[ScanMatch | None]:
+        """
+        返回匹配的行，找到 limit 行后停止读取；每处理完一个块额外返回一个 None，便于调用方输出进度
+        """
+        progress = progress if progress is not None else {}
+        progress.update(bytes=0, lines=0, matches=0)
+
+        max_in_flight = max(self.workers, 1) * 2
+        in_flight: deque[tuple[asyncio.Future, bytes, int]] = deque()
+        codec_name, blocks = await self._iter_sources(reader, progress)
+        func = partial(scan_compressed_block, codec_name) if codec_name else scan_block
+        line_base = 0
+        found = 0
+
+        async def drain():
+            nonlocal line_base, found
+            task, block, base = in_flight.popleft()
+            lines, matches = await task
+            results = []
+            for match in matches:
+                if found >= limit:
+                    break
+                line_no, start, end = match[:3]
+                # 压缩数据在子进程中解压，行内容随结果一起返回
+                content = match[3] if len(match) > 3 else block[start:end]
+                found += 1
+                results.append(
+                    ScanMatch(
+                        row=line_base + line_no,
+                        offset=base + start,
+                        length=end - start,
+                        content=content.decode("utf-8", errors="replace"),
+                    )
+                )
+            line_base += lines
+            progress.update(lines=line_base, matches=found)
+            return results
+
+        try:
+            async for block, offset in blocks:
+                in_flight.append(
+                    (
+                        asyncio.ensure_future(self._run(func, spec, block, limit - found)),
+                        block,
+                        offset,
+                    )
+                )
+
+                while in_flight and (len(in_flight) >= max_in_flight or in_flight[0][0].done()):
+                    for match in await drain():
+                        yield match
+                    yield None
+                    if found >= limit:
+                        return
+
+            while in_flight:
+                for match in await drain():
+                    yield match
+                yield None
+                if found >= limit:
+                    return
+        finally:
+            for task, _, _ in in_flight:
+                task.cancel()
+            await blocks.aclose()
+
+    async def profile(
+        self,
+        reader: "S3Reader",
+        max_fields: int,
+        max_bytes: int = 0,
+        progress: dict | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        在子进程中统计每个数据块（见 scan_worker.profile_block），按文件顺序返回各块的结果；
+        读取的原始字节数达到 max_bytes（不为 0）后停止读取
+        """
+        progress = progress if progress is not None else {}
+        progress.update(bytes=0)
+
+        max_in_flight = max(self.workers, 1) * 2
+        in_flight: deque[asyncio.Future] = deque()
+        codec_name, blocks = await self._iter_sources(reader, progress)
+
+        try:
+            async for block, _ in blocks:
+                in_flight.append(
+                    asyncio.ensure_future(self._run(profile_block, codec_name, block, max_fields))
+                )
+                while in_flight and (len(in_flight) >= max_in_flight or in_flight[0].done()):
+                    yield await in_flight.popleft()
+                if max_bytes and progress["bytes"] >= max_bytes:
+                    break
+
+            while in_flight:
+                yield await in_flight.popleft()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await blocks.aclose()
+
+
+row_scanner = RowScanner(
+    workers=settings.SCAN_WORKERS,
+    block_size=settings.SCAN_BLOCK_SIZE,
+)
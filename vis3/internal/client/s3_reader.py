@@ -4,37 +4,57 @@ import codecs
 import io
 import json
 import urllib
-import zlib
 from bisect import bisect_right
 from decimal import Decimal
 from threading import Lock
-from typing import Any, AsyncIterator, Optional, Tuple, Union
+from typing import Any, AsyncIterator, NamedTuple, Optional, Tuple, Union
 
-import boto3
-from botocore.client import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 from fastapi import HTTPException, status
 from fastapi.responses import StreamingResponse
 from loguru import logger
 
+from vis3.internal.client.block_cache import ObjectKey, block_cache
+from vis3.internal.client.cache_backend import cache_backend
+from vis3.internal.client.codec import (GZIP, LineSplitter, StreamDecompressor,
+                                        get_codec, strip_codec_extension)
+from vis3.internal.client.executor import run_cpu_bound
+from vis3.internal.client.gzip_index import (GzipLine, gzip_index_store,
+                                             inflate_line)
+from vis3.internal.client.gzip_members import gzip_member_store
+from vis3.internal.client.line_index import line_index_store
+from vis3.internal.client.list_cursor import (ListingKey, decode_cursor,
+                                             encode_cursor, list_cursor_cache,
+                                             resume_after)
+from vis3.internal.client.meta_cache import (ObjectPath, format_owner,
+                                             object_meta_cache, parent_prefix)
+from vis3.internal.client.pool import s3_client_pool
+from vis3.internal.client.readahead import readahead
+from vis3.internal.client.transport import (AioS3Transport, S3Transport,
+                                            ThreadedS3Transport,
+                                            is_async_backend_enabled,
+                                            run_in_executor)
 from vis3.internal.common.exceptions import AppEx, ErrorCode
+from vis3.internal.config import settings
 from vis3.internal.models.bucket import Bucket
 from vis3.internal.schema import JsonRow
 from vis3.internal.utils import json_dumps, timer
-from vis3.internal.utils.path import extract_bytes_range
+from vis3.internal.utils.path import extract_bytes_range, extract_ubytes_range
 
 
-class FakeRedis:
-    async def get(self, key: str) -> str:
-        return ""
+MAX_END = 1 * 1024 * 1024
 
-    async def set(self, key: str, value: str):
-        pass
+_UNKNOWN = object()
 
 
-redis_client = FakeRedis()
+class ListPage(NamedTuple):
+    entries: list[tuple[str, dict, str]]
+    cursor: str | None
+    page_no: int
 
-MAX_END = 1 * 1024 * 1024
+
+# 后台预取任务的引用，避免任务在完成前被回收
+_background_tasks: set[asyncio.Task] = set()
 
 def _is_valid_charset(charset: str):
     try:
@@ -128,6 +148,11 @@ class S3Reader:
         '.avif': 'image/avif',
         '.zip': 'application/zip',
         '.gz': 'application/gzip',
+        '.zst': 'application/zstd',
+        '.zstd': 'application/zstd',
+        '.xz': 'application/x-xz',
+        '.bz2': 'application/x-bzip2',
+        '.lz4': 'application/x-lz4',
         '.warc': 'application/warc',
         '.doc': 'application/msword',
         '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
@@ -182,69 +207,226 @@ class S3Reader:
         self.secret_access_key = secret_access_key
         self.region_name = region_name
         self.endpoint_url = endpoint_url
-        self.is_compressed = self.key_without_query.endswith(".gz")
+        # 压缩格式（gzip、zstd、xz、bz2、lz4），未压缩的文件为 None
+        self.codec = get_codec(self.key_without_query)
+        self.is_compressed = self.codec is not None
+        # 去掉压缩扩展名后的 key，用于按解压后的内容判断文件类型
+        self.uncompressed_key = strip_codec_extension(self.key_without_query)
         self._header_info = None
         self._arrow_fs = None
         self._arrow_fs_lock = Lock()
         self._row_group_index_cache = None
         self._parquet_schema_fields_cache = None
         self._object_version_marker = None
+        self._prefetch: tuple[int, int, asyncio.Task] | None = None
+        # locate_row 在压缩文件中定位到的行，紧接着的读取直接使用
+        self._located_line: GzipLine | None = None
+        # 发起读取的用户或客户端，顺序预读按它区分读取流
+        self.session: str | None = None
+
+        self.transport: S3Transport | None = None
 
         if self.access_key_id and self.secret_access_key:
             self.client = S3Reader.get_client(self.access_key_id, self.secret_access_key, self.endpoint_url, self.region_name)
+            self.transport = self.get_transport()
+
+    def get_transport(self) -> S3Transport:
+        if is_async_backend_enabled():
+            return AioS3Transport(
+                self.access_key_id,
+                self.secret_access_key,
+                self.endpoint_url,
+                self.region_name,
+            )
+
+        return ThreadedS3Transport(self.client, endpoint=self.endpoint_url)
+
+    def ensure_codec(self):
+        """压缩格式需要的依赖（zstandard、lz4）未安装时返回错误"""
+        if self.codec is not None and not self.codec.available:
+            raise AppEx(
+                code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Reading {self.codec.name} files requires the {self.codec.module} package (pip install vis3[{self.codec.name}])",
+            )
 
     @staticmethod
     async def _run_in_executor(func, *args, **kwargs):
-        loop = asyncio.get_event_loop()
+        return await run_in_executor(func, *args, **kwargs)
+
+    def _object_cache_key(self) -> ObjectKey | None:
+        if not self._object_version_marker:
+            return None
+        return ObjectKey(
+            self.endpoint_url,
+            self.bucket_name,
+            self.key_without_query,
+            self._object_version_marker,
+        )
+
+    async def _get_range_bytes(self, start: int, end: int) -> tuple[dict, bytes]:
+        try:
+            return await self.transport.get_object_bytes(
+                Bucket=self.bucket_name,
+                Key=self.key_without_query,
+                Range=f"bytes={start}-{end - 1}",
+                RequestPayer="requester",
+            )
+        except ClientError as e:
+            # 起始位置超出文件大小
+            if e.response["Error"]["Code"] == "InvalidRange":
+                return {}, b""
+            raise
 
-        # 创建一个包装函数来处理关键字参数
-        def wrapper():
-            return func(*args, **kwargs)
+    async def _fetch_blocks(self, first: int, last: int) -> tuple[str | None, dict[int, bytes]]:
+        block_size = block_cache.block_size
+        response, content = await self._get_range_bytes(
+            first * block_size, (last + 1) * block_size
+        )
+        blocks = {
+            first + offset // block_size: content[offset : offset + block_size]
+            for offset in range(0, len(content), block_size)
+        }
+        return self._extract_version_marker(response), blocks
 
-        return await loop.run_in_executor(None, wrapper)
+    def prefetch(self, start: int, length: int | None = None) -> asyncio.Task | None:
+        """
+        投机读取 [start, start + length) 到块缓存，不等待结果。
 
-    def _get_range_header(self, start: int, length: int | None = None):
+        与之重叠的 read_range 会先等待该读取完成再命中缓存，避免重复请求；
+        结果不再需要时调用 cancel_prefetch 取消。块缓存关闭时不做任何事。
         """
-        生成 S3 Range header
-        
-        Args:
-            start: 起始字节位置
-            length: 读取长度，如果为 None 则读取从 start 开始的 1MB 数据
-            
-        Returns:
-            str: Range header 字符串
+        length = settings.S3_OPEN_PREFETCH_SIZE if length is None else length
+        if length <= 0 or not block_cache.enabled:
+            return None
+
+        self.cancel_prefetch()
+        task = asyncio.ensure_future(self._read_range(start, start + length))
+        self._prefetch = (start, start + length, task)
+        return task
+
+    def cancel_prefetch(self):
+        if self._prefetch is None:
+            return
+        _, _, task = self._prefetch
+        self._prefetch = None
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # 投机读取的错误由后续的正式读取处理
+            task.exception()
+
+    async def read_range(self, start: int, end: int) -> bytes:
         """
-        if length is None or length == 0:
-            # 如果 length 为空，读取从 start 开始的 1MB 数据
-            end = start + MAX_END - 1  # Range header 的 end 是包含的
-            range_header = f"bytes={start}-{end}"
-        else:
-            # 如果指定了 length，读取指定长度的数据
-            end = start + length - 1  # Range header 的 end 是包含的
-            range_header = f"bytes={start}-{end}"
+        读取 [start, end) 区间的字节。
+
+        数据经过进程级块缓存：命中的块直接返回，缺失的连续块合并成一次 GET 读取，
+        读取到的 ETag 与已知版本不一致时会丢弃旧缓存并重新读取。
+        """
+        if self._prefetch is not None:
+            prefetch_start, prefetch_end, task = self._prefetch
+            if not task.done() and start < prefetch_end and prefetch_start < end:
+                # 不论投机读取成功与否都继续，失败时由本次读取重新请求
+                await asyncio.wait({task})
+
+        return await self._read_range(start, end)
+
+    async def _read_range(self, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+
+        if not block_cache.enabled:
+            _, content = await self._get_range_bytes(start, end)
+            return content
+
+        block_size = block_cache.block_size
+        first, last = start // block_size, (end - 1) // block_size
+        blocks: dict[int, bytes] = {}
+
+        for _ in range(2):
+            obj = self._object_cache_key()
+            blocks = {}
+            if obj:
+                for index in range(first, last + 1):
+                    block = block_cache.get(obj, index)
+                    if block is not None:
+                        blocks[index] = block
+                        if len(block) < block_size:
+                            # 不满一块说明已到文件末尾，后面的块无需读取
+                            break
+
+            end_index = max(blocks) if blocks and len(blocks[max(blocks)]) < block_size else last
+            runs: list[tuple[int, int]] = []
+            for index in range(first, end_index + 1):
+                if index in blocks:
+                    continue
+                if runs and runs[-1][1] == index - 1:
+                    runs[-1] = (runs[-1][0], index)
+                else:
+                    runs.append((index, index))
+
+            if not runs:
+                break
+
+            results = await asyncio.gather(*(self._fetch_blocks(a, b) for a, b in runs))
+            markers = {marker for marker, _ in results if marker}
+
+            if len(markers) > 1:
+                # 读取期间对象发生变化，不写缓存
+                for _, fetched in results:
+                    blocks.update(fetched)
+                continue
+
+            marker = markers.pop() if markers else None
+            if obj and marker and marker != obj.version:
+                # 对象已更新，旧版本的块失效，重新读取
+                self._on_version_changed(marker)
+                continue
+
+            if marker and not obj:
+                self._object_version_marker = marker
+                obj = self._object_cache_key()
+
+            for _, fetched in results:
+                for index, block in fetched.items():
+                    blocks[index] = block
+                    if obj:
+                        block_cache.put(obj, index, block)
+            break
+
+        parts = []
+        for index in range(first, last + 1):
+            block = blocks.get(index)
+            if block is None:
+                break
+            parts.append(block)
+            if len(block) < block_size:
+                break
+
+        offset = start - first * block_size
+        return b"".join(parts)[offset : offset + end - start]
+
+    def _on_version_changed(self, marker: str):
+        self._header_info = None
+        self._clear_parquet_caches()
+        self._object_version_marker = marker
+        object_meta_cache.invalidate(
+            endpoint=self.endpoint_url,
+            bucket=self.bucket_name,
+            key=self.key_without_query,
+        )
+
+    @property
+    def _object_path(self) -> ObjectPath:
+        return ObjectPath(self.endpoint_url, self.bucket_name, self.key_without_query)
 
-        return range_header
-    
     @staticmethod
     def get_client(ak: str, sk: str, endpoint: str, region_name: str):
         try:
-            return boto3.client(
-                "s3",
-                aws_access_key_id=ak,
-                aws_secret_access_key=sk,
-                region_name=region_name,
-                endpoint_url=endpoint,
-                config=Config(s3={"addressing_style": "virtual"}, signature_version='s3v4')
-            )
+            return s3_client_pool.get(ak, sk, endpoint, region_name, addressing_style="virtual")
         except Exception:
             # TODO: 错误类型
-            return boto3.client(
-                "s3",
-                aws_access_key_id=ak,
-                aws_secret_access_key=sk,
-                endpoint_url=endpoint,
-                config=Config(s3={"addressing_style": "path"}, retries={"max_attempts": 8}, signature_version='s3v4'),
-            )
+            return s3_client_pool.get(ak, sk, endpoint, None, addressing_style="path")
 
     async def head_object(self):
         """
@@ -270,11 +452,13 @@ class S3Reader:
                         )
                     return self._header_info
 
-                header_info = await S3Reader._run_in_executor(
-                    self.client.head_object,
-                    Bucket=self.bucket_name,
-                    Key=self.key_without_query,
-                )
+                header_info = object_meta_cache.get(self._object_path, "header")
+                if header_info is None:
+                    header_info = await self.transport.head_object(
+                        Bucket=self.bucket_name,
+                        Key=self.key_without_query,
+                    )
+                    object_meta_cache.update(self._object_path, header=header_info)
 
                 self._header_info = header_info
                 new_marker = self._extract_version_marker(header_info)
@@ -319,35 +503,32 @@ class S3Reader:
         通过文件内容的签名来检测 MIME 类型
         """
         try:
-            # 获取文件的前32个字节用于类型检测
-            response = await S3Reader._run_in_executor(
-                self.client.get_object,
-                Bucket=self.bucket_name,
-                Key=self.key_without_query,
-                Range="bytes=0-31",
-            )
-            content = await S3Reader._run_in_executor(response["Body"].read)
-
-            # 检查文件签名
-            for signature, mime_type in self.FILE_SIGNATURES.items():
-                if content.startswith(signature):
-                    return mime_type
-
-            # 检查是否是文本文件
-            # 检查前32个字节是否都是可打印字符或常见控制字符
-            is_text = all(byte in b' \t\n\r' or 32 <= byte <= 126 for byte in content)
-            if is_text:
-                # 如果内容以 { [ " 开头，可能是 JSON
-                if content.lstrip().startswith(b'{') or content.lstrip().startswith(b'['):
-                    return 'application/json'
-                return 'text/plain'
-
-            return 'application/octet-stream'
+            # 获取文件的前32个字节用于类型检测，已经预读的首段数据直接复用
+            content = await self.read_range(0, 32)
+            return self._sniff_mime_type(content)
 
         except Exception as e:
             logger.error(f"Error detecting MIME type from content: {e}")
             return 'application/octet-stream'
 
+    @classmethod
+    def _sniff_mime_type(cls, content: bytes) -> str:
+        # 检查文件签名
+        for signature, mime_type in cls.FILE_SIGNATURES.items():
+            if content.startswith(signature):
+                return mime_type
+
+        # 检查是否是文本文件
+        # 检查前32个字节是否都是可打印字符或常见控制字符
+        is_text = all(byte in b' \t\n\r' or 32 <= byte <= 126 for byte in content)
+        if is_text:
+            # 如果内容以 { [ " 开头，可能是 JSON
+            if content.lstrip().startswith(b'{') or content.lstrip().startswith(b'['):
+                return 'application/json'
+            return 'text/plain'
+
+        return 'application/octet-stream'
+
     async def mime_type(self) -> str:
         """
         获取文件的 MIME 类型。优先使用文件扩展名，如果没有扩展名则通过内容检测。
@@ -355,17 +536,34 @@ class S3Reader:
         Returns:
             str: 文件的 MIME 类型
         """
-        try:
-            # 处理特殊情况：.warc.gz
-            if self.key_without_query.endswith('.warc.gz'):
-                return 'application/warc+gzip'
+        cached = object_meta_cache.get(self._object_path, "mimetype")
+        if cached:
+            return cached
+
+        mime_type = await self._resolve_mime_type()
+        object_meta_cache.update(self._object_path, mimetype=mime_type)
+        return mime_type
+
+    def mime_type_by_extension(self) -> str | None:
+        """
+        仅根据文件扩展名推断 MIME 类型，不发起请求；无法推断时返回 None。
+        """
+        # 处理特殊情况：.warc.gz
+        if self.key_without_query.endswith('.warc.gz'):
+            return 'application/warc+gzip'
+
+        if '.' in self.key_without_query:
+            file_ext = '.' + self.key_without_query.split('.')[-1].lower()
+            return self.MIME_TYPES.get(file_ext)
+
+        return None
 
+    async def _resolve_mime_type(self) -> str:
+        try:
             # 尝试从文件扩展名获取 MIME 类型
-            if '.' in self.key_without_query:
-                file_ext = '.' + self.key_without_query.split('.')[-1].lower()
-                mime_type = self.MIME_TYPES.get(file_ext)
-                if mime_type:
-                    return mime_type
+            mime_type = self.mime_type_by_extension()
+            if mime_type:
+                return mime_type
 
             # 如果没有扩展名或扩展名未知，通过内容检测
             return await self._detect_mime_by_content()
@@ -374,6 +572,142 @@ class S3Reader:
             logger.error(f"Error determining MIME type: {e}")
             return 'application/octet-stream'
 
+    def listing_key(self, page_size: int, recursive: bool) -> ListingKey:
+        return ListingKey(
+            self.endpoint_url,
+            self.bucket_name,
+            self.key_without_query,
+            "" if recursive else "/",
+            page_size,
+        )
+
+    async def fetch_listing_page(
+        self, listing: ListingKey, token: str | None, start_after: str | None = None
+    ) -> dict:
+        operation_parameters = {
+            "Bucket": listing.bucket,
+            "Prefix": listing.prefix,
+            "MaxKeys": listing.page_size,
+        }
+        if listing.delimiter:
+            operation_parameters["Delimiter"] = listing.delimiter
+        if token:
+            operation_parameters["ContinuationToken"] = token
+        elif start_after:
+            operation_parameters["StartAfter"] = start_after
+        if settings.S3_RESOLVE_OWNER:
+            operation_parameters["FetchOwner"] = True
+
+        try:
+            result = await self.transport.list_objects_v2(**operation_parameters)
+        except ClientError as e:
+            error_code = e.response["Error"]["Code"]
+            if error_code == "NoSuchBucket":
+                raise ValueError(f"Bucket {self.bucket_name} does not exist")
+            elif error_code == "AccessDenied":
+                raise PermissionError(f"Access denied to bucket {self.bucket_name}")
+            else:
+                raise
+
+        self._remember_owners(result.get("Contents", []))
+        return result
+
+    async def list_page(
+        self,
+        page_no: int = 1,
+        page_size: int = 100,
+        cursor: str | None = None,
+        recursive: bool = False,
+        start_after: str | None = None,
+    ) -> ListPage:
+        """
+        获取一页 S3 对象列表。
+
+        基于 ListObjectsV2 的 ContinuationToken 分页：传入 cursor 时直接读取对应页；
+        按页码访问时从缓存中最近的页边界开始向后翻页，并记录沿途的页边界，
+        因此第一次遍历之后跳到任意页只需要一次 LIST。
+        传入 start_after 时通过 StartAfter 直接从该 key 之后开始，同样只需要一次 LIST，此时页码未知，返回 0。
+
+        Args:
+            page_no: 页码，从 1 开始，传入 cursor 或 start_after 时忽略
+            page_size: 每页大小
+            cursor: 上一页返回的游标
+            recursive: 是否递归获取子目录
+            start_after: 完整的 key，从该 key 之后开始列出
+
+        Returns:
+            ListPage: (本页条目, 下一页游标, 页码)，条目为 (s3_url, 对象详情, 类型)
+        """
+        listing = self.listing_key(page_size, recursive)
+
+        token = None
+        if cursor:
+            page_no, token, start_after = decode_cursor(cursor, listing)
+
+        if start_after is not None:
+            start_after = resume_after(start_after, listing.delimiter)
+            try:
+                result = await self.fetch_listing_page(listing, token, start_after)
+            except ClientError:
+                if not token:
+                    raise
+                # token 已经失效，游标中记录的 key 仍然可以定位
+                result = await self.fetch_listing_page(listing, None, start_after)
+
+            next_token = result.get("NextContinuationToken")
+            next_cursor = None
+            if next_token:
+                last = max(
+                    [content["Key"] for content in result.get("Contents", [])]
+                    + [_prefix["Prefix"] for _prefix in result.get("CommonPrefixes", [])]
+                )
+                next_cursor = encode_cursor(listing, 0, next_token, start_after=last)
+            return ListPage(self._listing_entries(result), next_cursor, 0)
+
+        if not token:
+            # 没有游标，或者游标来自本地索引、只记录了页码
+            page_no = max(page_no, 1)
+            page, token = list_cursor_cache.nearest(listing, page_no)
+            while page < page_no:
+                try:
+                    result = await self.fetch_listing_page(listing, token)
+                except ClientError:
+                    if token is None:
+                        raise
+                    # 缓存的 token 已经失效，从第一页重新翻页
+                    list_cursor_cache.invalidate(listing=listing)
+                    page, token = 1, None
+                    continue
+
+                token = result.get("NextContinuationToken")
+                if not token:
+                    return ListPage([], None, page_no)
+                page += 1
+                list_cursor_cache.set(listing, page, token)
+
+        result = await self.fetch_listing_page(listing, token)
+        next_token = result.get("NextContinuationToken")
+        if next_token:
+            list_cursor_cache.set(listing, page_no + 1, next_token)
+
+        return ListPage(
+            self._listing_entries(result),
+            encode_cursor(listing, page_no + 1, next_token) if next_token else None,
+            page_no,
+        )
+
+    def _listing_entries(self, result: dict) -> list[tuple[str, dict, str]]:
+        entries = [
+            (f"s3://{self.bucket_name}/{content['Key']}", content, "file")
+            for content in result.get("Contents", [])
+            if not content["Key"].endswith("/")
+        ]
+        entries.extend(
+            (f"s3://{self.bucket_name}/{_prefix['Prefix']}", _prefix, "directory")
+            for _prefix in result.get("CommonPrefixes", [])
+        )
+        return entries
+
     async def list_objects(
         self,
         recursive=False,
@@ -393,68 +727,59 @@ class S3Reader:
         Yields:
             Tuple[str, dict, str]: (s3_url, 对象详情, 类型)
         """
-        marker = None
-        item_yielded = 0
-        current_page = 1
-
-        while True:
-            operation_parameters = {
-                "Bucket": self.bucket_name,
-                "Prefix": self.key_without_query,
-                "MaxKeys": page_size,
-                "Delimiter": "/" if not recursive else None,
-            }
-            if marker:
-                operation_parameters["Marker"] = marker
-
-            try:
-                result = await S3Reader._run_in_executor(
-                    self.client.list_objects, **operation_parameters
-                )
-            except ClientError as e:
-                error_code = e.response["Error"]["Code"]
-                if error_code == "NoSuchBucket":
-                    raise ValueError(f"Bucket {self.bucket_name} does not exist")
-                elif error_code == "AccessDenied":
-                    raise PermissionError(f"Access denied to bucket {self.bucket_name}")
-                else:
-                    raise
+        page = await self.list_page(
+            page_no=page_no, page_size=page_size, recursive=recursive
+        )
+        entries = page.entries[:limit] if limit > 0 else page.entries
+        for entry in entries:
+            yield entry
 
-            contents = result.get("Contents", [])
-            common_prefixes = result.get("CommonPrefixes", [])
-            next_marker = result.get("NextMarker")
-
-            if current_page == page_no:
-                for content in contents:
-                    if not content["Key"].endswith("/"):
-                        yield (
-                            f"s3://{self.bucket_name}/{content['Key']}",
-                            content,
-                            "file",
-                        )
-                        item_yielded += 1
-                        if limit > 0 and item_yielded >= limit:
-                            return
-                        if item_yielded == page_size:
-                            return
-
-                for _prefix in common_prefixes:
-                    yield (
-                        f"s3://{self.bucket_name}/{_prefix['Prefix']}",
-                        _prefix,
-                        "directory",
-                    )
-                    item_yielded += 1
-                    if limit > 0 and item_yielded >= limit:
-                        return
-                    if item_yielded == page_size:
-                        return
+    async def _warc_read_length(self, start: int) -> int:
+        """
+        读取一条 WARC 记录需要的压缩数据长度。
 
-            if not next_marker or item_yielded == page_size:
-                break
+        解析时会跳过 request 等非 response 记录，并读到下一条记录的开头，
+        有 member 索引时读取从 start 开始的 3 个 member（每条记录一个 member），否则读取 MAX_END。
+        """
+        etag = (self._header_info or {}).get("ETag")
+        members = await gzip_member_store.get(self, etag) if etag else None
+        i = members.find_compressed(start) if members is not None else None
+        if i is None:
+            return MAX_END
+        last = min(i + 3, members.count) - 1
+        return max(MAX_END, members.compressed_ends[last] - start)
+
+    async def locate_member(self, n: int) -> int:
+        """
+        返回第 n 个 gzip member（从 0 开始）的压缩位置，用于 WARC 文件按记录跳转；
+        member 索引建立完成前返回 BUCKET_30008_LINE_INDEX_BUILDING。
+        """
+        file_header_info = await self.head_object()
+        etag = file_header_info.get("ETag")
+        if not etag:
+            raise AppEx(
+                code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Record addressing requires an object ETag",
+            )
 
-            marker = next_marker
-            current_page += 1
+        members = await gzip_member_store.get(self, etag)
+        if members is None:
+            if n == 0:
+                return 0
+            job = gzip_member_store.schedule(self, etag)
+            raise AppEx(
+                code=ErrorCode.BUCKET_30008_LINE_INDEX_BUILDING,
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=job.id,
+            )
+        if n >= members.count:
+            raise AppEx(
+                code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Record {n} is out of range, the file has {members.count} gzip members",
+            )
+        return members.member(n).compressed
 
     async def read_warc_gz(
         self,
@@ -485,16 +810,9 @@ class S3Reader:
         try:
             from fastwarc.warc import ArchiveIterator, WarcRecordType
 
-            response = await S3Reader._run_in_executor(
-                self.client.get_object,
-                Bucket=self.bucket_name,
-                Key=self.key_without_query,
-                Range=self._get_range_header(start=start, length=length),
-                RequestPayer="requester",
+            content = await self.read_range(
+                start, start + (length or await self._warc_read_length(start))
             )
-            stream = response["Body"]
-            # 读取 StreamingBody 的内容
-            content = await stream.read()
             file_obj = io.BytesIO(content)
 
             def process_warc():
@@ -590,9 +908,8 @@ class S3Reader:
 
                 return result, next_start, record_length
 
-            # 在事件循环中执行处理（因为处理可能是CPU密集型的）
-            loop = asyncio.get_event_loop()
-            result, start, length = await loop.run_in_executor(None, process_warc)
+            # 在 CPU 线程池中执行处理（因为处理可能是CPU密集型的）
+            result, start, length = await run_cpu_bound(process_warc)
 
             return JsonRow(
                 value=json_dumps(result),
@@ -608,14 +925,21 @@ class S3Reader:
             )
 
     async def read_by_range(
-        self, start_byte: int, end_byte: int | None = None
+        self,
+        start_byte: int,
+        end_byte: int | None = None,
+        chunk_size: int | None = None,
     ) -> AsyncIterator[Tuple[Union[str, bytes, dict], int]]:
         """
         按字节范围读取文件内容，支持文本和压缩文件。
 
+        数据边读边返回，只有消费方取走当前块后才会从 S3 读取下一块，
+        压缩文件也是随压缩块到达增量解压，因此每个流占用的内存是常量。
+
         Args:
             start_byte: 起始字节位置
             end_byte: 结束字节位置，如果为 None 则读取到文件末尾
+            chunk_size: 每次读取的块大小，默认 S3_STREAM_CHUNK_SIZE
 
         Yields:
             Tuple[Union[str, bytes, dict], int]: (内容块, 偏移量)
@@ -624,77 +948,145 @@ class S3Reader:
             - 对于 JSONL 文件：返回 (解析后的 JSON 对象, 偏移量)
         """
 
-        # 创建包装函数正确处理get_object
-        def get_object():
-            return self.client.get_object(
-                Bucket=self.bucket_name,
-                Key=self.key_without_query,
-                Range=f"bytes={start_byte}-{end_byte}"
-                if end_byte
-                else f"bytes={start_byte}-",
-                RequestPayer="requester",
-            )
-
-        response = await S3Reader._run_in_executor(get_object)
-        stream = response["Body"]
+        chunk_size = chunk_size or settings.S3_STREAM_CHUNK_SIZE
+        request_params = dict(
+            Bucket=self.bucket_name,
+            Key=self.key_without_query,
+            Range=f"bytes={start_byte}-{end_byte}"
+            if end_byte
+            else f"bytes={start_byte}-",
+            RequestPayer="requester",
+        )
         current_byte = start_byte
 
-        if not self.is_compressed:
-            # 对于非压缩文件，直接获取内容并分块返回
-            def read_chunks():
-                return stream.read()
-
-            content = await S3Reader._run_in_executor(read_chunks)
-
-            # 按块返回内容
-            chunk_size = 8192  # 8KB 块大小
+        if (
+            not self.is_compressed
+            and end_byte
+            and end_byte - start_byte < settings.S3_BLOCK_CACHE_MAX_SPAN
+        ):
+            # 小范围读取经过块缓存
+            content = await self.read_range(start_byte, end_byte + 1)
             for i in range(0, len(content), chunk_size):
                 chunk = content[i : i + chunk_size]
                 yield chunk, current_byte
                 current_byte += len(chunk)
+        elif not self.is_compressed:
+            async for chunk in self.transport.iter_object(chunk_size, **request_params):
+                yield chunk, current_byte
+                current_byte += len(chunk)
         else:
-            # 对于压缩文件，先读取全部内容再解压处理
-            def read_and_decompress():
-                data = stream.read()
-                decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
-                decompressed_data = decompressor.decompress(data)
-                decompressed_data += decompressor.flush()
-                return decompressed_data
-
-            decompressed_content = await S3Reader._run_in_executor(read_and_decompress)
-
-            if self.key_without_query.endswith(".jsonl.gz"):
-                # 对于 JSONL 文件，解析每一行
-                lines = decompressed_content.splitlines()
-                for line in lines:
-                    if line:
-                        try:
-                            yield json.loads(line.decode("utf-8")), current_byte
-                        except json.JSONDecodeError:
-                            yield line, current_byte
+            # 对于压缩文件，随压缩块到达增量解压
+            async for block in self._iter_decompressed(chunk_size, request_params):
+                if self.uncompressed_key.endswith(".jsonl"):
+                    # 对于 JSONL 文件，解析每一行，跨块的半行由 LineSplitter 保留
+                    for line in block:
+                        if line:
+                            try:
+                                yield json.loads(line.decode("utf-8")), current_byte
+                            except (UnicodeDecodeError, json.JSONDecodeError):
+                                yield line, current_byte
                         current_byte += len(line) + 1  # +1 for newline
-            else:
-                # 按块返回解压后的内容
-                chunk_size = 8192
-                for i in range(0, len(decompressed_content), chunk_size):
-                    chunk = decompressed_content[i : i + chunk_size]
-                    yield chunk, current_byte
-                    current_byte += len(chunk)
+                else:
+                    yield block, current_byte
+                    current_byte += len(block)
+
+    async def _iter_decompressed(self, chunk_size: int, request_params: dict):
+        """
+        流式读取压缩对象并解压。JSONL 返回按行切分的列表，其他类型返回解压后的数据块。
+        """
+        decompressor = StreamDecompressor(self.codec, max_block_size=max(chunk_size, 1 << 20))
+        splitter = LineSplitter() if self.uncompressed_key.endswith(".jsonl") else None
+
+        async for chunk in self.transport.iter_object(chunk_size, **request_params):
+            block = await run_cpu_bound(decompressor.decompress, chunk)
+            while True:
+                if block:
+                    yield splitter.feed(block) if splitter else block
+                if decompressor.needs_input:
+                    break
+                block = await run_cpu_bound(decompressor.decompress)
+            if decompressor.finished:
+                break
+
+        if splitter:
+            rest = splitter.flush()
+            if rest:
+                yield rest
 
     async def get_object_owner(self):
+        """
+        获取对象的 owner。
+
+        依次查找对象级缓存、所在前缀的缓存（目录列表时写入），都未命中时才发起一次 LIST。
+        S3_RESOLVE_OWNER 关闭时直接返回 None。
+        """
+        if not settings.S3_RESOLVE_OWNER:
+            return None
+
+        cached = object_meta_cache.get(self._object_path, "owner", _UNKNOWN)
+        if cached is _UNKNOWN:
+            cached = object_meta_cache.get_prefix_owner(
+                ObjectPath(
+                    self.endpoint_url,
+                    self.bucket_name,
+                    parent_prefix(self.key_without_query),
+                ),
+                _UNKNOWN,
+            )
+        if cached is not _UNKNOWN:
+            return cached
+
         try:
+            owner = None
             async for _, details, _ in self.list_objects(limit=1):
                 owner = details.get("Owner")
 
-            return f"{owner.get('DisplayName')}/{owner.get('ID')}" if owner else None
+            result = format_owner(owner)
+            object_meta_cache.update(self._object_path, owner=result)
+            return result
 
         except Exception as e:
-            print(e)
+            logger.warning(f"Failed to get owner of {self.path}: {e}")
             return None
 
+    def _remember_owners(self, contents: list[dict]):
+        """
+        列表结果中已经带有 owner，写入缓存供之后打开文件时使用
+        """
+        for content in contents:
+            if "Owner" not in content:
+                continue
+            owner = format_owner(content["Owner"])
+            key = content["Key"]
+            object_meta_cache.update(
+                ObjectPath(self.endpoint_url, self.bucket_name, key), owner=owner
+            )
+            object_meta_cache.set_prefix_owner(
+                ObjectPath(self.endpoint_url, self.bucket_name, parent_prefix(key)),
+                owner,
+            )
+
     def _make_location(self, start: int, offset: Optional[int] = None):
         return f"s3://{self.bucket_name}/{self.key_without_query}?bytes={start},{offset}"
 
+    def _make_ulocation(self, start: int, length: int):
+        """压缩文件中按解压后位置表示的范围"""
+        return f"s3://{self.bucket_name}/{self.key_without_query}?ubytes={start},{length}"
+
+    @staticmethod
+    def parse_location(location: str) -> tuple[int, int, bool]:
+        """
+        解析 _make_location / _make_ulocation 生成的位置
+
+        Returns:
+            (起始位置, 长度, 是否为解压后的位置)
+        """
+        if "?ubytes=" in location:
+            _, start, length = extract_ubytes_range(location)
+            return start, length, True
+        _, start, length = extract_bytes_range(location)
+        return start, length, False
+
     def _get_arrow_filesystem(self, fs_module):
         if self._arrow_fs is not None:
             return self._arrow_fs
@@ -915,7 +1307,7 @@ class S3Reader:
             return rows, schema_fields, total_rows
 
         try:
-            rows, schema_fields, total_rows = await self._run_in_executor(
+            rows, schema_fields, total_rows = await run_cpu_bound(
                 _load_parquet_preview
             )
         except Exception as exc:
@@ -950,53 +1342,88 @@ class S3Reader:
         )
 
 
-    async def read_s3_row_with_cache(self, start: int, length: int | None = None):
+    async def _row_cache_key(
+        self, start: int, length: int | None, uncompressed: bool = False
+    ) -> str | None:
+        """
+        行缓存的 key，包含对象的 ETag，对象更新后旧的缓存自然失效
+        """
+        await self.head_object()
+        if not self._object_version_marker:
+            return None
+        return (
+            f"s3_svc:row:{self.endpoint_url or ''}|{self.bucket_name}/{self.key_without_query}"
+            f"@{self._object_version_marker}?{'ubytes' if uncompressed else 'bytes'}={start},{length or 0}"
+        )
+
+    async def read_s3_row_with_cache(
+        self, start: int, length: int | None = None, uncompressed: bool = False
+    ):
         """
-        读取S3行，并缓存结果，Need redis support
+        读取S3行，并缓存结果，后端由 CACHE_BACKEND 决定
         """
-        row = None
-        cache_key = f"s3_svc:s3://{self.bucket_name}/{self.key}"
-        cached_result = redis_client.get(cache_key)
+        if cache_backend is None:
+            row = await self.read_row(start=start, length=length, uncompressed=uncompressed)
+            self._read_ahead(start, row)
+            return row
+
+        cache_key = await self._row_cache_key(start, length, uncompressed)
+        cached_result = await cache_backend.get(cache_key) if cache_key else None
 
         if cached_result:
-            cached_row = json.loads(cached_result)
-            row = JsonRow(value=cached_row.get("row"), loc=cached_row.get("path"), next=cached_row.get("next"))
+            row = JsonRow.model_validate_json(cached_result)
         else:
-            row = await self.read_row(start=start, length=length)
-            redis_client.set(
-                cache_key, json.dumps({"row": row.value, "path": row.loc, "next": row.next}), ex=120
-            )
+            row = await self.read_row(start=start, length=length, uncompressed=uncompressed)
+            if cache_key:
+                await cache_backend.set(
+                    cache_key, row.model_dump_json(), ex=settings.ROW_CACHE_TTL
+                )
+
+        self._read_ahead(start, row)
 
         # cache next row
-        asyncio.create_task(self.cache_s3_next_row(path=row.loc))
+        if row.next:
+            task = asyncio.create_task(self.cache_s3_next_row(path=row.next))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
 
         return row
 
-    async def cache_s3_next_row(self, path: str):
-        path, offset, length = extract_bytes_range(path)
-        next_offset = offset + length
-
-        next_row_cache_key = f"s3_svc:{path}?bytes={next_offset},0"
-
-        cached_result = redis_client.get(next_row_cache_key)
-
-        if cached_result:
+    def _read_ahead(self, start: int, row: JsonRow):
+        """
+        翻页时按 next 位置在后台预读后续数据到块缓存
+        """
+        if not row.next:
             return
+        next_offset, _, uncompressed = self.parse_location(row.next)
+        if uncompressed:
+            # 解压后的位置无法对应到压缩数据的范围
+            return
+        size = self._header_info.get("ContentLength") if self._header_info else None
+        readahead.on_read(self, start, next_offset, size=size)
+
+    async def cache_s3_next_row(self, path: str):
+        try:
+            next_offset, _, uncompressed = self.parse_location(path)
+            next_row_cache_key = await self._row_cache_key(next_offset, None, uncompressed)
 
-        # 如果是jsonl，最大获取2mb
-        length = 2 << 20 if self.key_without_query.endswith(".jsonl") else None
+            if not next_row_cache_key or await cache_backend.get(next_row_cache_key):
+                return
 
-        next_row = await self.read_row(start=next_offset, length=length)
-        redis_client.set(
-            next_row_cache_key,
-            json.dumps({"row": next_row.value, "path": next_row.loc}),
-            ex=120,
-        )
+            next_row = await self.read_row(start=next_offset, uncompressed=uncompressed)
+            await cache_backend.set(
+                next_row_cache_key,
+                next_row.model_dump_json(),
+                ex=settings.ROW_CACHE_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache next row {path}: {e}")
 
     async def read_row(
         self,
         start: int,
         length: int | None = None,
+        uncompressed: bool = False,
     ) -> JsonRow:
         """
         根据字节范围读取一行内容。
@@ -1004,12 +1431,13 @@ class S3Reader:
         Args:
             start: 起始字节位置
             length: 读取长度，如果为 None 则读取从 start 开始的完整一行
+            uncompressed: 压缩文件中 start 是否为解压后的位置
 
         Returns:
             JsonRow: (行内容, 偏移量, 行号)
         """
         if self.is_compressed:
-            return await self.read_gz_row(start=start, length=length)
+            return await self.read_gz_row(start=start, length=length, uncompressed=uncompressed)
 
         try:
             # 获取文件头部信息
@@ -1034,21 +1462,8 @@ class S3Reader:
                 read_size = min(NEXT_READ_SIZE, remaining_size)
 
                 try:
-                    range_header = f"bytes={current_start}-{current_start + read_size - 1}"
-                    
-                    def get_object_sync():
-                        return self.client.get_object(
-                            Bucket=self.bucket_name,
-                            Key=self.key_without_query,
-                            Range=range_header,
-                            RequestPayer="requester",
-                        )
-
-                    response = await self._run_in_executor(get_object_sync)
-                    stream = response["Body"]
-
                     # 读取数据
-                    chunk = await self._run_in_executor(stream.read)
+                    chunk = await self.read_range(current_start, current_start + read_size)
                     if not chunk:
                         break
 
@@ -1150,13 +1565,387 @@ class S3Reader:
                 detail=f"Unexpected error: {str(e)}",
             )
 
-    async def read_gz_row(self, start: int, length: int | None = None) -> JsonRow:
+    @staticmethod
+    def _decode_line(line: bytes) -> str:
+        try:
+            return line.decode("utf-8")
+        except UnicodeDecodeError:
+            return line.decode("latin1")
+
+    async def read_rows(
+        self, start: int, count: int, max_bytes: int, uncompressed: bool = False
+    ) -> tuple[list[JsonRow], str | None]:
+        """
+        从 start 开始连续读取最多 count 行，总字节数不超过 max_bytes（至少返回一行）。
+
+        未压缩文件只读取一次范围数据并一次性切分；压缩文件以解压后的位置表示时一次解压取出连续的多行，
+        每行一个 member 的文件逐个 member 解压，读取的数据同样经过块缓存。
+
+        Returns:
+            (行列表, 最后一行之后的位置)
+        """
+        if self.is_compressed:
+            rows: list[JsonRow] = []
+            total = 0
+            row_start = start
+            while len(rows) < count and total < max_bytes:
+                if uncompressed and not self.key_without_query.endswith(".warc.gz"):
+                    # 解压后的位置上的连续多行在一次解压中取出
+                    line = await self._read_gz_line(
+                        offset=row_start, lines=count - len(rows), max_bytes=max_bytes - total
+                    )
+                    rows.extend(self._gz_rows(line))
+                    break
+                # 每行一个 member 的文件逐个 member 读取
+                row = await self.read_row(start=row_start)
+                if not row.value and not row.next:
+                    break
+                rows.append(row)
+                total += len(row.value.encode("utf-8"))
+                if not row.next:
+                    break
+                row_start, _, uncompressed = self.parse_location(row.next)
+            if rows:
+                self._read_ahead(start, rows[-1])
+            return rows, rows[-1].next if rows else None
+
+        file_header_info = await self.head_object()
+        content_length = file_header_info.get("ContentLength", 0)
+        end = min(content_length, start + max_bytes)
+        chunk = await self.read_range(start, end) if end > start else b""
+
+        rows = []
+        pos = 0
+        while len(rows) < count and pos < len(chunk):
+            newline = chunk.find(b"\n", pos)
+            if newline == -1:
+                if start + len(chunk) < content_length:
+                    # 超出字节预算的半行留给下一次读取
+                    break
+                newline = len(chunk)
+            row_start = start + pos
+            # 最后一行没有换行符时 newline == len(chunk)，行尾不能越过文件末尾
+            row_end = start + min(newline + 1, len(chunk))
+            rows.append(
+                JsonRow(
+                    value=self._decode_line(chunk[pos:newline]),
+                    loc=self._make_location(row_start, row_end - row_start),
+                    next=self._make_location(row_end, 0)
+                    if row_end < content_length
+                    else None,
+                )
+            )
+            pos = newline + 1
+
+        if not rows:
+            # 第一行就超过了字节预算，按单行读取
+            rows = [await self.read_row(start=start)]
+
+        self._read_ahead(start, rows[-1])
+        return rows, rows[-1].next
+
+    async def locate_row(self, row: int) -> int:
+        """
+        返回第 row 行（从 0 开始）起始的字节位置，压缩文件为解压后的位置。
+
+        对象的行索引已经建立时，从最近的检查点开始读取一小段即可定位；
+        没有索引时前 LINE_INDEX_STRIDE 行直接从文件开头定位，更靠后的行在后台建立索引，
+        建立完成前返回 BUCKET_30008_LINE_INDEX_BUILDING。
         """
-        根据字节范围读取压缩文件中的一行内容。
+        if self.is_compressed:
+            self._located_line = await self._read_gz_line(row=row)
+            return self._located_line.offset
+
+        file_header_info = await self.head_object()
+        content_length = file_header_info.get("ContentLength", 0)
+        etag = file_header_info.get("ETag")
+
+        index = await line_index_store.get(self, etag) if etag else None
+        if index is not None:
+            if row >= index.lines:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Row {row} is out of range, the file has {index.lines} rows",
+                )
+            offset, skip = index.locate(row)
+        elif row < line_index_store.stride:
+            offset, skip = 0, row
+        elif etag:
+            job = line_index_store.schedule(self, etag)
+            raise AppEx(
+                code=ErrorCode.BUCKET_30008_LINE_INDEX_BUILDING,
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=job.id,
+            )
+        else:
+            raise AppEx(
+                code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Row addressing requires an object ETag",
+            )
+
+        # 从检查点向后跳过 skip 行
+        read_size = settings.S3_BLOCK_SIZE
+        while skip:
+            if offset >= content_length:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Row {row} is out of range",
+                )
+            chunk = await self.read_range(offset, min(offset + read_size, content_length))
+            if not chunk:
+                break
+            pos = 0
+            while skip:
+                newline = chunk.find(b"\n", pos)
+                if newline == -1:
+                    break
+                pos = newline + 1
+                skip -= 1
+            offset += pos if not skip else len(chunk)
+
+        if offset >= content_length:
+            raise AppEx(
+                code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Row {row} is out of range",
+            )
+        return offset
+
+    async def _read_gz_line_by_members(
+        self,
+        members,
+        content_length: int,
+        offset: int,
+        row: int | None,
+        lines: int = 1,
+        max_bytes: int = 0,
+    ) -> GzipLine | None:
+        """多 member 文件从目标行所在 member 的开头解压"""
+        if row is not None:
+            if row >= members.lines:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Row {row} is out of range, the file has {members.lines} rows",
+                )
+            i, skip_lines = members.locate_row(row)
+            member = members.member(i)
+            return await inflate_line(
+                self.read_range,
+                content_length,
+                member.compressed,
+                base=member.uncompressed,
+                skip_lines=skip_lines,
+                codec=self.codec,
+                lines=lines,
+                max_bytes=max_bytes,
+            )
+
+        member = members.member(members.find_uncompressed(offset))
+        return await inflate_line(
+            self.read_range,
+            content_length,
+            member.compressed,
+            base=member.uncompressed,
+            skip_bytes=offset - member.uncompressed,
+            codec=self.codec,
+            lines=lines,
+            max_bytes=max_bytes,
+        )
+
+    async def _read_frame_line(
+        self,
+        etag: str | None,
+        content_length: int,
+        offset: int,
+        row: int | None,
+        lines: int = 1,
+        max_bytes: int = 0,
+    ) -> GzipLine:
+        """
+        没有 member 索引时读取 zstd / xz / bz2 / lz4 文件中的一行。
+
+        这些格式的解压器不能保存快照：seekable zstd 文件从 seek table 中包含 offset 的 frame 开头解压，
+        其他文件从头解压。前 LINE_INDEX_STRIDE 行之后的行号、多 frame 文件中 GZIP_INDEX_SPACING 之后的位置
+        需要先在后台建立 member 索引，建立完成前返回 BUCKET_30008_LINE_INDEX_BUILDING。
+        """
+        start = base = skip_lines = 0
+        table = (
+            await gzip_member_store.seek_table(self, etag, content_length) if etag else None
+        )
+        if row is not None:
+            offset, skip_lines = 0, row
+        elif table is not None:
+            start, base = table.find_uncompressed(offset)
+
+        if (row is not None and row >= gzip_index_store.stride) or (
+            table is None and offset > gzip_index_store.spacing
+        ):
+            if not etag:
+                raise AppEx(
+                    code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Seeking in a compressed file requires an object ETag",
+                )
+            # 单个流的文件建立索引也只能从头解压，直接读取
+            if row is not None or await gzip_member_store.is_multi_member(
+                self, etag, content_length
+            ):
+                job = gzip_member_store.schedule(self, etag)
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30008_LINE_INDEX_BUILDING,
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=job.id,
+                )
+
+        line = await inflate_line(
+            self.read_range,
+            content_length,
+            start,
+            base=base,
+            skip_bytes=offset - base,
+            skip_lines=skip_lines,
+            codec=self.codec,
+            lines=lines,
+            max_bytes=max_bytes,
+        )
+        if line is None:
+            raise AppEx(
+                code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Row {row} is out of range" if row is not None else f"Offset {offset} is out of range",
+            )
+        return line
+
+    async def _read_gz_line(
+        self, offset: int = 0, row: int | None = None, lines: int = 1, max_bytes: int = 0
+    ) -> GzipLine:
+        """
+        读取压缩文件中解压后位置 offset 处（或第 row 行）的一行；lines 大于 1 时连续读取多行，见 inflate_line。
+
+        多 member 文件有 member 索引时从所在 member 的开头解压；单个 gzip 流有检查点索引时从最近的检查点解压，
+        其他格式见 _read_frame_line。
+        没有索引时只从头解压 GZIP_INDEX_SPACING 字节以内的位置（或前 LINE_INDEX_STRIDE 行），
+        更靠后的位置在后台建立索引（多 member 文件建立 member 索引，否则建立检查点索引），
+        建立完成前返回 BUCKET_30008_LINE_INDEX_BUILDING。
+        """
+        located = self._located_line
+        if located is not None and row is None and lines == 1 and located.offset == offset:
+            return located
+
+        file_header_info = await self.head_object()
+        content_length = file_header_info.get("ContentLength", 0)
+        etag = file_header_info.get("ETag")
+
+        members = await gzip_member_store.get(self, etag) if etag else None
+        if members is not None and (members.count > 1 or self.codec is not GZIP):
+            line = await self._read_gz_line_by_members(
+                members, content_length, offset, row, lines, max_bytes
+            )
+            if line is None:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Offset {offset} is out of range",
+                )
+            return line
+
+        if self.codec is not GZIP:
+            return await self._read_frame_line(
+                etag, content_length, offset, row, lines, max_bytes
+            )
+
+        index = await gzip_index_store.get(self, etag) if etag else None
+        skip_lines = 0
+        if row is not None:
+            if index is not None:
+                if row >= index.lines.lines:
+                    raise AppEx(
+                        code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Row {row} is out of range, the file has {index.lines.lines} rows",
+                    )
+                offset, skip_lines = index.lines.locate(row)
+            elif row < gzip_index_store.stride:
+                offset, skip_lines = 0, row
+            else:
+                offset = None
+
+        if offset is None or (
+            offset > gzip_index_store.spacing and not (index is not None and index.seekable)
+        ):
+            if not etag:
+                raise AppEx(
+                    code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Seeking in a compressed file requires an object ETag",
+                )
+            if members is None and await gzip_member_store.is_multi_member(
+                self, etag, content_length
+            ):
+                job = gzip_member_store.schedule(self, etag)
+            else:
+                job = gzip_index_store.schedule(self, etag)
+            raise AppEx(
+                code=ErrorCode.BUCKET_30008_LINE_INDEX_BUILDING,
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=job.id,
+            )
+
+        line = await gzip_index_store.read_line(
+            self, etag, index, content_length, offset, skip_lines, lines=lines, max_bytes=max_bytes
+        )
+        if line is None:
+            raise AppEx(
+                code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Row {row} is out of range" if row is not None else f"Offset {offset} is out of range",
+            )
+        return line
+
+    def _gz_rows(self, line: GzipLine) -> list[JsonRow]:
+        """把连续读取的多行（见 inflate_line）拆分为各行，位置用解压后的位置表示"""
+        rows = []
+        parts = line.data.split(b"\n")
+        position = line.offset
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            end = line.end if last else position + len(part) + 1
+            rows.append(
+                JsonRow(
+                    value=self._decode_line(part.rstrip(b"\r")),
+                    loc=self._make_ulocation(position, end - position),
+                    next=self._make_ulocation(end, 0) if not last or line.has_more else None,
+                )
+            )
+            position = end
+        return rows
+
+    def _gz_row(self, line: GzipLine) -> JsonRow:
+        """以解压后的位置表示压缩文件中的一行"""
+        return JsonRow(
+            value=self._decode_line(line.data.rstrip(b"\r")),
+            loc=self._make_ulocation(line.offset, line.end - line.offset),
+            next=self._make_ulocation(line.end, 0) if line.has_more else None,
+        )
+
+    async def read_gz_row(
+        self, start: int, length: int | None = None, uncompressed: bool = False
+    ) -> JsonRow:
+        """
+        读取压缩文件中的一行内容。
+
+        从 gzip member 开头读取的行恰好在该 member 结束时结束（每行一个 member 的文件），
+        位置用压缩后的字节范围（?bytes=）表示；否则（单个 gzip 流）用解压后的位置（?ubytes=）表示，
+        跳转时从最近的检查点继续解压。
 
         Args:
-            start: 起始字节位置
+            start: 起始字节位置，uncompressed 为 True 时为解压后的位置
             length: 结束字节位置，如果为 None 则读取从 start 开始的完整一行
+            uncompressed: start 是否为解压后的位置
 
         Returns:
             JsonRow: (行内容, 偏移量, 行号)
@@ -1164,63 +1953,45 @@ class S3Reader:
         if self.key_without_query.endswith(".warc.gz"):
             return await self.read_warc_gz(start=start, length=length)
 
-        try:
-            # 从文件开头读取数据
-            response = await S3Reader._run_in_executor(
-                self.client.get_object,
-                Bucket=self.bucket_name,
-                Key=self.key_without_query,
-                Range=self._get_range_header(start, length),
-            )
-            stream = response["Body"]
+        if uncompressed:
+            return self._gz_row(await self._read_gz_line(offset=start))
 
-            # 使用warcio的BufferedReader来处理gz文件
-            from warcio.bufferedreaders import BufferedReader
+        try:
+            file_header_info = await self.head_object()
+            content_length = file_header_info.get("ContentLength", 0)
 
-            # 创建一个字节流对象
-            buff_reader = BufferedReader(stream, decomp_type="gzip")
+            line = await inflate_line(self.read_range, content_length, start, codec=self.codec)
+            if line is None:
+                return JsonRow(value="", loc=self._make_location(start, 0), next=None)
 
-            # 读取解压后的内容
-            line = None
-            original_length = 0
+            if line.member_end is not None:
+                return JsonRow(
+                    value=self._decode_line(line.data.rstrip(b"\r")),
+                    loc=self._make_location(start, line.member_end - start),
+                    next=self._make_location(line.member_end, 0) if line.has_more else None,
+                )
 
-            while True:
-                line = buff_reader.readline()
+            if start == 0:
+                return self._gz_row(line)
 
-                if line:
-                    original_length = stream.tell() - buff_reader.rem_length()
-                    break
-                elif buff_reader.read_next_member():
-                    continue
-                else:
-                    break
-
-            try:
-                # 尝试解析为JSON
-                decoded_line = line.decode("utf-8").rstrip("\r\n")
-                # 验证是否为有效的JSON
-                json.loads(decoded_line)
-            except (UnicodeDecodeError, json.JSONDecodeError):
-                try:
-                    decoded_line = line.decode("latin1")
-                except Exception:
-                    decoded_line = str(line)
-                    
-            next_loc = None
-            
-            if (start + original_length) < response["ContentLength"]:
-                next_loc = self._make_location(start + original_length, 0)
+            # 一个 member 中有多行（例如 BGZF），通过 member 索引得到 start 对应的解压后位置
+            etag = file_header_info.get("ETag")
+            members = await gzip_member_store.get(self, etag) if etag else None
+            i = members.find_compressed(start) if members is not None else None
+            if i is not None:
+                base = members.member(i).uncompressed
+                return self._gz_row(line._replace(offset=line.offset + base, end=line.end + base))
 
+            # 不知道 start 对应的解压后位置，无法给出下一行的位置
             return JsonRow(
-                value=decoded_line,
-                loc=self._make_location(start, original_length),
-                next=next_loc,
-                offset=original_length,
+                value=self._decode_line(line.data.rstrip(b"\r")),
+                loc=self._make_location(start, 0),
+                next=None,
             )
 
         except Exception as e:
             logger.error(f"Error reading gz file: {e}")
-            return JsonRow(value="", loc=self._make_location(start, 0), offset=0)
+            return JsonRow(value="", loc=self._make_location(start, 0), next=None)
 
     async def get_s3_presigned_url(self, as_attachment=True) -> str:
         params = {"Bucket": self.bucket_name, "Key": self.key_without_query}
@@ -1228,11 +1999,7 @@ class S3Reader:
             filename = self.key_without_query.split("/")[-1]
             params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
 
-        # 创建包装函数正确处理所有参数
-        def generate_url():
-            return self.client.generate_presigned_url("get_object", Params=params)
-
-        return await S3Reader._run_in_executor(generate_url)
+        return await self.transport.generate_presigned_url("get_object", params)
 
     async def download(self, as_attachment=True) -> StreamingResponse:
         try:
@@ -0,0 +1,293 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+from botocore.client import Config
+from loguru import logger
+
+from vis3.internal.client.executor import endpoint_limiter, s3_io_executor
+from vis3.internal.client.pool import ClientKey, _digest, s3_client_pool
+from vis3.internal.client.singleflight import s3_single_flight
+from vis3.internal.config import settings
+
+
+async def run_in_executor(func, *args, **kwargs):
+    return await s3_io_executor.run(func, *args, **kwargs)
+
+
+class S3Transport:
+    """
+    S3Reader 使用的最小 S3 操作集合。
+
+    ThreadedS3Transport 将阻塞的 boto3 调用放到线程池中执行，
+    AioS3Transport 则直接在事件循环中使用 aiobotocore 发起请求。
+
+    HEAD、LIST 与范围 GET 会经过 single-flight：参数完全相同的并发请求只发起一次。
+    """
+
+    # 区分不同凭证 / endpoint 的标识，作为 single-flight key 的一部分
+    identity: Any = None
+
+    async def _single_flight(self, operation: str, kwargs: dict, fn):
+        if not settings.S3_SINGLE_FLIGHT:
+            return await fn(**kwargs)
+
+        key = (self.identity, operation, tuple(sorted(kwargs.items())))
+        return await s3_single_flight.do(key, lambda: fn(**kwargs))
+
+    async def head_object(self, **kwargs) -> dict:
+        return await self._single_flight("head_object", kwargs, self._head_object)
+
+    async def list_objects_v2(self, **kwargs) -> dict:
+        return await self._single_flight(
+            "list_objects_v2", kwargs, self._list_objects_v2
+        )
+
+    async def get_object_bytes(self, **kwargs) -> tuple[dict, bytes]:
+        """
+        发起 GET 请求并读取完整 body，返回 (去掉 Body 的响应, 内容)
+        """
+        return await self._single_flight("get_object", kwargs, self._get_object_bytes)
+
+    async def _head_object(self, **kwargs) -> dict:
+        raise NotImplementedError
+
+    async def _list_objects_v2(self, **kwargs) -> dict:
+        raise NotImplementedError
+
+    async def _get_object_bytes(self, **kwargs) -> tuple[dict, bytes]:
+        raise NotImplementedError
+
+    def iter_object(self, chunk_size: int, **kwargs) -> AsyncIterator[bytes]:
+        """
+        发起 GET 请求并按块读取 body，消费方取走一块后才会读取下一块
+        """
+        raise NotImplementedError
+
+    async def generate_presigned_url(self, client_method: str, params: dict) -> str:
+        raise NotImplementedError
+
+
+class ThreadedS3Transport(S3Transport):
+    def __init__(self, client, endpoint: str | None = None):
+        self.client = client
+        self.endpoint = endpoint
+        # client 按凭证和 endpoint 池化，同一个 client 即同一身份
+        self.identity = id(client)
+
+    async def _call(self, func, *args, **kwargs):
+        async with endpoint_limiter.acquire(self.endpoint):
+            return await run_in_executor(func, *args, **kwargs)
+
+    async def _head_object(self, **kwargs) -> dict:
+        return await self._call(self.client.head_object, **kwargs)
+
+    async def _list_objects_v2(self, **kwargs) -> dict:
+        return await self._call(self.client.list_objects_v2, **kwargs)
+
+    async def _get_object_bytes(self, **kwargs) -> tuple[dict, bytes]:
+        def get_and_read():
+            response = self.client.get_object(**kwargs)
+            body = response.pop("Body")
+            try:
+                return response, body.read()
+            finally:
+                body.close()
+
+        return await self._call(get_and_read)
+
+    async def iter_object(self, chunk_size: int, **kwargs) -> AsyncIterator[bytes]:
+        response = await self._call(self.client.get_object, **kwargs)
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await self._call(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def generate_presigned_url(self, client_method: str, params: dict) -> str:
+        # 预签名只在本地计算签名，不占用 endpoint 并发配额
+        return await run_in_executor(
+            self.client.generate_presigned_url, client_method, Params=params
+        )
+
+
+class AioS3ClientPool:
+    """
+    aiobotocore client 注册表，与 S3ClientPool 使用相同的 key。
+
+    aiobotocore client 绑定创建它的事件循环，因此按事件循环分别缓存。
+    """
+
+    def __init__(self, max_pool_connections: int = 50):
+        self.max_pool_connections = max_pool_connections
+        self._clients: dict[tuple[int, ClientKey], tuple[Any, str]] = {}
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            from aiobotocore.session import get_session
+
+            self._session = get_session()
+        return self._session
+
+    async def get(
+        self,
+        ak: str,
+        sk: str,
+        endpoint: str | None,
+        region_name: str | None,
+        addressing_style: str = "virtual",
+    ):
+        loop_id = id(asyncio.get_running_loop())
+        key = ClientKey(ak, endpoint, region_name, addressing_style)
+        secret_digest = _digest(sk or "")
+
+        entry = self._clients.get((loop_id, key))
+        if entry is not None and entry[1] == secret_digest:
+            return entry[0]
+
+        if entry is not None:
+            await self._close(entry[0])
+
+        client = await self._get_session().create_client(
+            "s3",
+            aws_access_key_id=ak,
+            aws_secret_access_key=sk,
+            region_name=region_name,
+            endpoint_url=endpoint,
+            config=Config(
+                s3={"addressing_style": addressing_style},
+                signature_version="s3v4",
+                max_pool_connections=self.max_pool_connections,
+            ),
+        ).__aenter__()
+
+        # 并发创建时保留先写入的 client
+        existing = self._clients.get((loop_id, key))
+        if existing is not None and existing[1] == secret_digest:
+            await self._close(client)
+            return existing[0]
+
+        self._clients[(loop_id, key)] = (client, secret_digest)
+        return client
+
+    def invalidate(self, access_key_id: str | None = None, endpoint: str | None = None):
+        for loop_key in list(self._clients.keys()):
+            _, key = loop_key
+            if access_key_id is not None and key.access_key_id != access_key_id:
+                continue
+            if endpoint is not None and key.endpoint != endpoint:
+                continue
+            client, _ = self._clients.pop(loop_key)
+            try:
+                asyncio.get_running_loop().create_task(self._close(client))
+            except RuntimeError:
+                # 没有运行中的事件循环，交给 GC 回收
+                pass
+
+    @staticmethod
+    async def _close(client):
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Failed to close async s3 client: {e}")
+
+
+class AioS3Transport(S3Transport):
+    def __init__(
+        self,
+        ak: str,
+        sk: str,
+        endpoint: str | None,
+        region_name: str | None,
+    ):
+        self.ak = ak
+        self.sk = sk
+        self.endpoint = endpoint
+        self.region_name = region_name
+        self.identity = (ak, _digest(sk or ""), endpoint, region_name)
+
+    async def _client(self):
+        return await aio_s3_client_pool.get(
+            self.ak, self.sk, self.endpoint, self.region_name
+        )
+
+    async def _head_object(self, **kwargs) -> dict:
+        client = await self._client()
+        async with endpoint_limiter.acquire(self.endpoint):
+            return await client.head_object(**kwargs)
+
+    async def _list_objects_v2(self, **kwargs) -> dict:
+        client = await self._client()
+        async with endpoint_limiter.acquire(self.endpoint):
+            return await client.list_objects_v2(**kwargs)
+
+    async def _get_object_bytes(self, **kwargs) -> tuple[dict, bytes]:
+        client = await self._client()
+        async with endpoint_limiter.acquire(self.endpoint):
+            response = await client.get_object(**kwargs)
+            body = response.pop("Body")
+            try:
+                return response, await body.read()
+            finally:
+                body.close()
+
+    async def iter_object(self, chunk_size: int, **kwargs) -> AsyncIterator[bytes]:
+        client = await self._client()
+        async with endpoint_limiter.acquire(self.endpoint):
+            response = await client.get_object(**kwargs)
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await body.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def generate_presigned_url(self, client_method: str, params: dict) -> str:
+        client = await self._client()
+        return await client.generate_presigned_url(client_method, Params=params)
+
+
+aio_s3_client_pool = AioS3ClientPool(
+    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+)
+
+_aio_backend_available: bool | None = None
+
+
+def invalidate_s3_clients(access_key_id: str | None = None, endpoint: str | None = None):
+    """
+    同时清理同步与异步 client 注册表中匹配的 client
+    """
+    s3_client_pool.invalidate(access_key_id=access_key_id, endpoint=endpoint)
+    aio_s3_client_pool.invalidate(access_key_id=access_key_id, endpoint=endpoint)
+
+
+def is_async_backend_enabled() -> bool:
+    """
+    S3_ASYNC_BACKEND 开启且安装了 aiobotocore 时使用原生 asyncio 传输层
+    """
+    global _aio_backend_available
+
+    if not settings.S3_ASYNC_BACKEND:
+        return False
+
+    if _aio_backend_available is None:
+        try:
+            import aiobotocore  # noqa: F401
+
+            _aio_backend_available = True
+        except ModuleNotFoundError:
+            logger.warning(
+                "S3_ASYNC_BACKEND is enabled but aiobotocore is not installed "
+                "(pip install vis3[async]), falling back to the threaded boto3 transport"
+            )
+            _aio_backend_available = False
+
+    return _aio_backend_available
@@ -53,6 +53,7 @@ class ErrorCode(Enum):
     BUCKET_30005_DATA_IS_EMPTY = (BUCKET + 5, "Data is Empty")
     BUCKET_30006_CONFIG_FILE_NOT_FOUND = (BUCKET + 6, "S3 Config File Not Found")
     BUCKET_30007_DUPLICATED_BUCKETS = (BUCKET + 7, "Duplicate Bucket Names Found")
+    BUCKET_30008_LINE_INDEX_BUILDING = (BUCKET + 8, "Line Index Is Being Built, Please Retry Later")
     KEYCHAIN_20001_KEYCHAIN_NOT_FOUND = (KEYCHAIN + 1, "Keychain Not Found")
     KEYCHAIN_20002_KEYCHAIN_ALREADY_EXISTS = (KEYCHAIN + 2, "Keychain Already Exists")
     KEYCHAIN_20003_KEYCHAIN_NOT_OWNER = (KEYCHAIN + 3, "No Permission to Access This Keychain")
@@ -0,0 +1,192 @@
+import asyncio
+import time
+import uuid
+from enum import StrEnum
+from typing import Any, Awaitable, Callable, Hashable
+
+from loguru import logger
+
+from vis3.internal.config import settings
+
+
+class JobState(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job:
+    """
+    后台任务。progress 由任务函数在执行过程中更新，result 为任务函数的返回值。
+    """
+
+    def __init__(self, kind: str, key: Hashable):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.state = JobState.PENDING
+        self.progress: dict[str, Any] = {}
+        self.result: Any = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in (JobState.PENDING, JobState.RUNNING)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueueFull(Exception):
+    """独立队列中等待执行的任务已达上限"""
+
+
+class JobRegistry:
+    """
+    进程内的后台任务注册表。
+
+    同一 (kind, key) 同时只有一个任务在执行，重复提交返回已有任务；
+    同时执行的任务数受 max_concurrency 限制，结束的任务保留 ttl 秒以便查询结果。
+    通过 add_queue 为某类任务设置独立的并发配额，这类任务不占用共享配额。
+    """
+
+    def __init__(self, max_concurrency: int, ttl: float):
+        self.max_concurrency = max_concurrency
+        self.ttl = ttl
+        self._semaphore: asyncio.Semaphore | None = None
+        self._jobs: dict[str, Job] = {}
+        self._active: dict[tuple[str, Hashable], Job] = {}
+        # kind -> (并发数, 最多等待的任务数)
+        self._queues: dict[str, tuple[int, int]] = {}
+        self._queue_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def add_queue(self, kind: str, max_concurrency: int, max_pending: int):
+        """
+        kind 类任务使用独立的并发配额（不与其他任务争用），
+        等待执行的任务达到 max_pending 时拒绝新的提交（JobQueueFull）
+        """
+        self._queues[kind] = (max(max_concurrency, 1), max_pending)
+
+    def _pending(self, kind: str) -> int:
+        return sum(
+            1
+            for (job_kind, _), job in self._active.items()
+            if job_kind == kind and job.state == JobState.PENDING
+        )
+
+    def _semaphore_for(self, kind: str) -> asyncio.Semaphore:
+        queue = self._queues.get(kind)
+        if queue is not None:
+            semaphore = self._queue_semaphores.get(kind)
+            if semaphore is None:
+                semaphore = self._queue_semaphores[kind] = asyncio.Semaphore(queue[0])
+            return semaphore
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(self.max_concurrency, 1))
+        return self._semaphore
+
+    def submit(
+        self,
+        kind: str,
+        key: Hashable,
+        fn: Callable[[Job], Awaitable[Any]],
+    ) -> Job:
+        self._purge()
+
+        job = self._active.get((kind, key))
+        if job is not None and job.active:
+            return job
+
+        queue = self._queues.get(kind)
+        if queue is not None and self._pending(kind) >= queue[1]:
+            raise JobQueueFull(kind)
+
+        job = Job(kind, key)
+        self._jobs[job.id] = job
+        self._active[(kind, key)] = job
+        job.task = asyncio.ensure_future(self._run(job, fn))
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[Job], Awaitable[Any]]):
+        try:
+            async with self._semaphore_for(job.kind):
+                job.state = JobState.RUNNING
+                job.started_at = time.time()
+                job.result = await fn(job)
+                job.state = JobState.DONE
+        except asyncio.CancelledError:
+            job.state = JobState.CANCELLED
+        except Exception as e:
+            logger.exception(f"{job.kind} job {job.id} failed: {e}")
+            job.state = JobState.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if self._active.get((job.kind, job.key)) is job:
+                del self._active[(job.kind, job.key)]
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def find(self, kind: str, key: Hashable) -> Job | None:
+        """返回 (kind, key) 正在执行的任务"""
+        return self._active.get((kind, key))
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not job.active or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def list(self, kind: str | None = None) -> list[Job]:
+        self._purge()
+        return [job for job in self._jobs.values() if kind is None or job.kind == kind]
+
+    def _purge(self):
+        deadline = time.time() - self.ttl
+        for job_id in [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < deadline
+        ]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {
+            "max_concurrency": self.max_concurrency,
+            "jobs": counts,
+            "queues": {
+                kind: {
+                    "max_concurrency": concurrency,
+                    "max_pending": max_pending,
+                    "pending": self._pending(kind),
+                }
+                for kind, (concurrency, max_pending) in self._queues.items()
+            },
+        }
+
+
+job_registry = JobRegistry(
+    max_concurrency=settings.BACKGROUND_JOB_CONCURRENCY,
+    ttl=settings.BACKGROUND_JOB_TTL,
+)
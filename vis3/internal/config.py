@@ -1,3 +1,4 @@
+import os
 from typing import Any
 
 from loguru import logger
@@ -32,6 +33,133 @@ class Settings(BaseSettings):
     TOKEN_ACCESS_EXPIRE_MINUTES: int = 43200  # 30天 (30*24*60=43200分钟)
     TOKEN_TYPE: str = "Bearer"
 
+    # S3 client pool
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_TCP_KEEPALIVE: bool = True
+    S3_CLIENT_IDLE_TIMEOUT: int = 600  # 秒，空闲超过该时间的 client 会被回收
+    # 使用 aiobotocore 原生异步传输层（需要安装 aiobotocore：pip install vis3[async]）
+    S3_ASYNC_BACKEND: bool = False
+
+    # Executors
+    S3_IO_MAX_WORKERS: int = 64
+    CPU_MAX_WORKERS: int = os.cpu_count() or 4
+    # 单个 endpoint 同时进行的 S3 请求上限，0 表示不限制
+    S3_ENDPOINT_CONCURRENCY: int = 32
+
+    # 合并参数相同的并发 HEAD / LIST / 范围 GET 请求
+    S3_SINGLE_FLIGHT: bool = True
+
+    # 流式读取时每次从 S3 读取的块大小
+    S3_STREAM_CHUNK_SIZE: int = 64 << 10
+
+    # 字节块缓存，S3_BLOCK_CACHE_MAX_BYTES 为 0 时关闭
+    S3_BLOCK_SIZE: int = 256 << 10
+    S3_BLOCK_CACHE_MAX_BYTES: int = 256 << 20
+    # 超过该长度的范围读取直接流式读取，不经过块缓存
+    S3_BLOCK_CACHE_MAX_SPAN: int = 4 << 20
+    # 打开文件时与 HEAD 并行预读的首段数据大小，0 表示关闭
+    S3_OPEN_PREFETCH_SIZE: int = 1 << 20
+    # 顺序翻页时的后台预读窗口，连续翻页时从最小值逐步翻倍，S3_READAHEAD_MAX_WINDOW 为 0 时关闭
+    S3_READAHEAD_MIN_WINDOW: int = 256 << 10
+    S3_READAHEAD_MAX_WINDOW: int = 8 << 20
+    # 所有预读同时在途的字节上限
+    S3_READAHEAD_MAX_IN_FLIGHT: int = 64 << 20
+
+    # 对象元数据缓存（HEAD 结果、mimetype、owner），TTL 即允许的陈旧时间窗口（秒）
+    S3_META_CACHE_SIZE: int = 10000
+    S3_META_CACHE_TTL: int = 30
+    # 文件详情是否返回 owner（需要额外的 LIST 请求，结果按对象和前缀缓存）
+    S3_RESOLVE_OWNER: bool = True
+    S3_OWNER_CACHE_TTL: int = 600
+
+    # 目录分页的页边界（ContinuationToken）缓存
+    S3_LIST_CURSOR_CACHE_SIZE: int = 1000
+    S3_LIST_CURSOR_TTL: int = 600
+    # 每个目录最多记录的页边界数
+    S3_LIST_CURSOR_MAX_PAGES: int = 100000
+
+    # 目录列表本地索引（SQLite），开启后多页的目录在后台完整列出并写入索引，支持排序
+    LISTING_INDEX_ENABLED: bool = False
+    # 索引文件路径，默认 BASE_DATA_DIR/vis3.listing.sqlite
+    LISTING_INDEX_PATH: str | None = None
+    # 索引超过该时间（秒）后在后台刷新
+    LISTING_INDEX_REFRESH_AFTER: int = 300
+    # 索引超过该时间（秒）后不再使用，直接列出 S3
+    LISTING_INDEX_MAX_AGE: int = 86400
+
+    # 目录子项计数结果的缓存时间（秒）
+    S3_PREFIX_STATS_TTL: int = 600
+    # 单个计数 / 统计任务同时发出的 LIST 请求数
+    S3_PREFIX_STATS_CONCURRENCY: int = 8
+    # 递归统计大小时缓存的目录数
+    S3_PREFIX_SIZE_CACHE_SIZE: int = 100000
+    # 目录统计结果的缓存时间（秒）
+    S3_PREFIX_SIZE_TTL: int = 86400
+    # 再次统计时，超过该时间（秒）的目录会重新列出，其余直接使用缓存
+    S3_PREFIX_SIZE_REFRESH_AFTER: int = 600
+    # 搜索 key 时单次最多返回的结果数
+    S3_SEARCH_MAX_RESULTS: int = 10000
+
+    # 本地保存的行索引、gzip 索引与文件概况，每类文件的总大小上限（字节）与未被使用的保留时间（秒），0 表示不限制；
+    # 超过时从最久未使用的文件开始删除
+    LOCAL_STORE_MAX_BYTES: int = 10 << 30
+    LOCAL_STORE_MAX_AGE: int = 30 * 86400
+
+    # 文本文件的稀疏行索引，每 LINE_INDEX_STRIDE 行记录一次字节位置，用于按行号跳转
+    LINE_INDEX_STRIDE: int = 1000
+    # 索引文件目录，默认 BASE_DATA_DIR/line_index
+    LINE_INDEX_DIR: str | None = None
+    # 建立索引时每次从 S3 读取的块大小
+    LINE_INDEX_CHUNK_SIZE: int = 8 << 20
+    # 内存中保留的索引数
+    LINE_INDEX_MAX_LOADED: int = 64
+
+    # .gz 文件的解压检查点索引，每 GZIP_INDEX_SPACING 字节压缩数据记录一个检查点，用于跳到单个 gzip 流中的任意位置
+    GZIP_INDEX_SPACING: int = 4 << 20
+    # 索引文件目录，默认 BASE_DATA_DIR/gzip_index
+    GZIP_INDEX_DIR: str | None = None
+    # 内存中保留索引的对象数（未安装 indexed_gzip 时检查点只保存在内存中，约每个检查点 40KB；pip install vis3[indexed-gzip]）
+    GZIP_INDEX_MAX_LOADED: int = 16
+    # indexed_gzip 解压使用的独立线程数，其读取经由 S3 I/O 线程池完成，不能占用同一个线程池
+    GZIP_INDEX_MAX_WORKERS: int = 4
+
+    # 批量读取行（lines=K）时单次最多返回的行数与字节数
+    ROW_BATCH_MAX_LINES: int = 1000
+    ROW_BATCH_MAX_BYTES: int = 4 << 20
+
+    # 按行过滤（/bucket/scan）的子进程数，0 表示在线程池中过滤
+    SCAN_WORKERS: int = min(4, os.cpu_count() or 1)
+    # 每次交给子进程过滤的数据块大小
+    SCAN_BLOCK_SIZE: int = 4 << 20
+    # 单次过滤最多返回的匹配行数
+    SCAN_MAX_MATCHES: int = 10000
+
+    # JSONL 文件概况（行数、行长度分布、顶层字段的类型与空值率），请求文件时带 profile=1 才在后台统计，按 ETag 缓存
+    PROFILE_ENABLED: bool = True
+    # 每个文件最多读取的字节数（压缩文件为压缩后的字节数），超过时只统计开头的部分并估算总行数，0 表示读取整个文件
+    PROFILE_MAX_BYTES: int = 64 << 20
+    # 概况统计使用独立的任务队列，不占用行索引等任务的 BACKGROUND_JOB_CONCURRENCY
+    PROFILE_JOB_CONCURRENCY: int = 1
+    # 等待统计的文件数上限，超过时新的请求不再排队
+    PROFILE_MAX_PENDING: int = 8
+    # 最多统计的顶层字段数
+    PROFILE_MAX_FIELDS: int = 200
+    # 结果目录，默认 BASE_DATA_DIR/profile
+    PROFILE_DIR: str | None = None
+
+    # 后台任务（索引刷新、统计等）
+    BACKGROUND_JOB_CONCURRENCY: int = 4
+    # 结束的任务保留时间（秒）
+    BACKGROUND_JOB_TTL: int = 3600
+
+    # 行缓存后端：memory（进程内）、disk（SQLite，重启后保留，同机多个 worker 共享）、redis（需要安装 redis：pip install vis3[redis]）、none
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_ENTRIES: int = 10000
+    # disk 后端的文件路径，默认 BASE_DATA_DIR/vis3.cache.sqlite
+    CACHE_DISK_PATH: str | None = None
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    ROW_CACHE_TTL: int = 120
+
     def model_post_init(self, __context: Any) -> None:
         db_name = "vis3.public.sqlite"
 
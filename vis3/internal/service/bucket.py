@@ -1,4 +1,9 @@
-from typing import Tuple
+import asyncio
+import os
+import re
+import time
+from contextlib import aclosing
+from typing import NamedTuple, Tuple
 from urllib.parse import parse_qsl, quote, urlparse
 
 import httpx
@@ -8,14 +13,32 @@ from loguru import logger
 from sqlalchemy.orm import Session
 
 from vis3.internal.api.v1.schema.response import ItemResponse, ListResponse
-from vis3.internal.api.v1.schema.response.bucket import (BucketResponse,
-                                                         PathType)
+from vis3.internal.api.v1.schema.response.bucket import (BucketListResponse,
+                                                         BucketResponse,
+                                                         PathType,
+                                                         RowResponse)
+from vis3.internal.client.block_cache import block_cache
+from vis3.internal.client.cache_backend import cache_backend
+from vis3.internal.client.gzip_members import gzip_member_store
+from vis3.internal.client.key_search import compile_matcher, search_keys
+from vis3.internal.client.line_index import LINE_INDEX_EXTENSIONS
+from vis3.internal.client.list_cursor import (decode_cursor, encode_cursor,
+                                             list_cursor_cache, resume_after)
+from vis3.internal.client.listing_index import SORT_COLUMNS, listing_index
+from vis3.internal.client.meta_cache import object_meta_cache
+from vis3.internal.client.prefix_stats import prefix_counter, prefix_sizer
+from vis3.internal.client.row_profile import profile_store
+from vis3.internal.client.row_scan import row_scanner
 from vis3.internal.client.s3_reader import S3Reader
+from vis3.internal.client.scan_worker import FIELD_OPS, ScanSpec, compile_spec
+from vis3.internal.client.transport import invalidate_s3_clients
 from vis3.internal.common.exceptions import AppEx, ErrorCode
+from vis3.internal.common.jobs import JobQueueFull, JobState
+from vis3.internal.config import settings
 from vis3.internal.crud.bucket import bucket_crud
 from vis3.internal.models.bucket import Bucket
 from vis3.internal.utils import (convert_epub_stream_to_html,
-                                 convert_mobi_stream_to_html,
+                                 convert_mobi_stream_to_html, json_dumps,
                                  should_not_read_as_raw, timer)
 from vis3.internal.utils.path import split_s3_path
 
@@ -139,6 +162,30 @@ async def _proxy_media_stream(
     )
 
 
+async def invalidate_bucket_caches(bucket: Bucket | None):
+    """bucket 配置更新或删除后，清理与之关联的共享资源"""
+    if bucket is None:
+        return
+
+    access_key_id = bucket.keychain.access_key_id if bucket.keychain else None
+    invalidate_s3_clients(access_key_id=access_key_id, endpoint=bucket.endpoint)
+
+    bucket_name, _ = split_s3_path(bucket.path)
+    block_cache.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    object_meta_cache.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    list_cursor_cache.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    prefix_counter.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    prefix_sizer.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    if listing_index is not None:
+        await listing_index.invalidate(endpoint=bucket.endpoint, bucket=bucket_name or None)
+    if cache_backend is not None:
+        await cache_backend.delete_prefix(
+            f"s3_svc:row:{bucket.endpoint or ''}|{bucket_name}/"
+            if bucket_name
+            else f"s3_svc:row:{bucket.endpoint or ''}|"
+        )
+
+
 async def get_bucket(path: str, db: Session, id: int | None = None) -> Tuple[Bucket, S3Reader]:
     bucket_name, key = split_s3_path(path)
     
@@ -173,53 +220,319 @@ async def get_bucket(path: str, db: Session, id: int | None = None) -> Tuple[Buc
     return bucket, s3_reader
 
 
+class DirectoryPage(NamedTuple):
+    items: list[BucketResponse]
+    cursor: str | None
+    # index：来自本地列表索引；live：直接列出 S3
+    source: str
+    total: int | None = None
+    # exact：total 为目录子项总数；estimating：后台计数中，total 为目前已知的下限
+    total_state: str = "exact"
+    # 后台计数任务，可通过 /system/jobs/{id} 查询进度
+    total_job_id: str | None = None
+
+
+def _parse_sort(sort: str | None) -> Tuple[str, bool]:
+    if not sort:
+        return "key", False
+
+    descending = sort.startswith("-")
+    column = sort.lstrip("-")
+    if column not in SORT_COLUMNS:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sort field: {column}",
+        )
+    return column, descending
+
+
+async def _list_from_index(
+    s3_reader: S3Reader,
+    page_no: int,
+    page_size: int,
+    cursor: str | None,
+    sort: str | None,
+    start_after: str | None = None,
+) -> DirectoryPage | None:
+    """
+    本地索引可用时从索引读取一页，不可用时返回 None 并按需在后台刷新索引
+    """
+    column, descending = _parse_sort(sort)
+    state = await listing_index.state(s3_reader)
+    if listing_index.needs_refresh(state) and (state is not None or sort):
+        listing_index.schedule_crawl(s3_reader)
+    if not listing_index.is_usable(state):
+        return None
+
+    listing = s3_reader.listing_key(page_size, recursive=False)
+    if cursor:
+        page_no, _, start_after = decode_cursor(cursor, listing)
+
+    if start_after is not None:
+        # 按 key 从 start_after 之后读取，多读一条判断是否还有下一页
+        entries = await listing_index.query(
+            s3_reader,
+            offset=0,
+            limit=page_size + 1,
+            start_after=resume_after(start_after, listing.delimiter),
+        )
+        next_cursor = None
+        if len(entries) > page_size:
+            entries = entries[:page_size]
+            last = entries[-1][1].get("Key") or entries[-1][1]["Prefix"]
+            next_cursor = encode_cursor(listing, 0, "", start_after=last)
+        return DirectoryPage(
+            items=[_to_bucket_response(s3_reader, entry) for entry in entries],
+            cursor=next_cursor,
+            source="index",
+            total=state.entries,
+        )
+
+    page_no = max(page_no, 1)
+
+    entries = await listing_index.query(
+        s3_reader,
+        offset=(page_no - 1) * page_size,
+        limit=page_size,
+        sort=column,
+        descending=descending,
+    )
+
+    next_cursor = None
+    if page_no * page_size < state.entries:
+        # 按 key 正序时附带 S3 的页边界，索引失效后游标仍然可以直接用于 S3
+        token = None
+        if column == "key" and not descending:
+            _, token = list_cursor_cache.nearest(listing, page_no + 1)
+        next_cursor = encode_cursor(listing, page_no + 1, token or "")
+
+    return DirectoryPage(
+        items=[_to_bucket_response(s3_reader, entry) for entry in entries],
+        cursor=next_cursor,
+        source="index",
+        total=state.entries,
+    )
+
+
 async def get_s3_directories(
-    s3_reader: S3Reader, page_no, page_size
-):
-    list_of_gn = s3_reader.list_objects(
-        recursive=False,
+    s3_reader: S3Reader,
+    page_no,
+    page_size,
+    cursor: str | None = None,
+    sort: str | None = None,
+    start_after: str | None = None,
+) -> DirectoryPage:
+    if start_after is not None:
+        if _parse_sort(sort) != ("key", False):
+            raise AppEx(
+                code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_after can only be used with key order",
+            )
+        # 相对于当前目录的名称补全为完整的 key
+        prefix = s3_reader.key_without_query
+        if not start_after.startswith(prefix):
+            start_after = prefix + start_after
+
+    if listing_index is not None:
+        page = await _list_from_index(
+            s3_reader, page_no, page_size, cursor, sort, start_after
+        )
+        if page is not None:
+            return page
+    else:
+        # 没有索引时只能按 key 排序
+        _parse_sort(sort)
+
+    page = await s3_reader.list_page(
         page_no=page_no,
         page_size=page_size,
+        cursor=cursor,
+        recursive=False,
+        start_after=start_after,
     )
 
-    result = []
+    items = [_to_bucket_response(s3_reader, entry) for entry in page.entries]
+    if not page.cursor and page.page_no == 1:
+        # 只有一页的目录，总数就是本页的条目数
+        return DirectoryPage(items=items, cursor=None, source="live", total=len(items))
 
-    async for gn in list_of_gn:
-        _path = gn[0] if isinstance(gn, tuple) else gn
-        details = gn[1] if isinstance(gn, tuple) else {}
+    if listing_index is not None:
+        # 多页的目录在后台建立索引，之后的访问直接读取索引
+        listing_index.schedule_crawl(s3_reader)
 
-        target_type = PathType.Directory if _path.endswith("/") else PathType.File
-        # 基础信息
-        owner = details.get("Owner")
-        display_name = owner.get("DisplayName") if owner else ""
-        owner_id = owner.get("ID") if owner else ""
-        last_modified = details.get("LastModified")
-        size = details.get("Size") or details.get("ContentLength")
-
-        result.append(
-            BucketResponse(
-                type=target_type,
-                path=_path,
-                owner=f"{display_name}/{owner_id}" if owner else None,
-                last_modified=last_modified,
-                size=size,
-                id=s3_reader.bucket.id,
-            )
+    counted = prefix_counter.get(s3_reader)
+    if counted is not None:
+        return DirectoryPage(
+            items=items, cursor=page.cursor, source="live", total=counted.total
         )
 
-    return result
+    # 总数未知时在后台计数，不阻塞本次列表
+    job = prefix_counter.find_job(s3_reader) or prefix_counter.schedule(s3_reader)
+    seen = (max(page.page_no, 1) - 1) * page_size + len(items)
+    counting = job.progress.get("objects", 0) + job.progress.get("directories", 0)
+    return DirectoryPage(
+        items=items,
+        cursor=page.cursor,
+        source="live",
+        total=max(seen, counting),
+        total_state="estimating",
+        total_job_id=job.id,
+    )
+
+
+def _to_bucket_response(s3_reader: S3Reader, gn: tuple) -> BucketResponse:
+    _path = gn[0] if isinstance(gn, tuple) else gn
+    details = gn[1] if isinstance(gn, tuple) else {}
+
+    target_type = PathType.Directory if _path.endswith("/") else PathType.File
+    # 基础信息
+    owner = details.get("Owner")
+    display_name = owner.get("DisplayName") if owner else ""
+    owner_id = owner.get("ID") if owner else ""
+    last_modified = details.get("LastModified")
+    size = details.get("Size") or details.get("ContentLength")
+
+    return BucketResponse(
+        type=target_type,
+        path=_path,
+        owner=f"{display_name}/{owner_id}" if owner else None,
+        last_modified=last_modified,
+        size=size,
+        id=s3_reader.bucket.id,
+    )
+
+
+async def _get_file_profile(
+    s3_reader: S3Reader, etag: str | None, schedule: bool
+) -> dict | None:
+    """
+    JSONL 文件的概况。没有结果时，只有 schedule 为 true（profile=1）才在后台统计，返回任务的 state、job_id 与进度
+    """
+    if not settings.PROFILE_ENABLED or not etag:
+        return None
+
+    profile = await profile_store.get(s3_reader, etag)
+    if profile is not None:
+        return {"state": JobState.DONE, **profile}
+
+    error = profile_store.failure(s3_reader, etag)
+    if error is not None:
+        return {"state": JobState.FAILED, "error": error}
+
+    job = profile_store.find_job(s3_reader, etag)
+    if job is None:
+        if not schedule:
+            return None
+        try:
+            job = profile_store.schedule(s3_reader, etag)
+        except JobQueueFull:
+            return {
+                "state": JobState.FAILED,
+                "error": "Too many files are waiting to be profiled, please retry later",
+            }
+    return {"state": job.state, "job_id": job.id, "progress": job.progress}
 
 
 async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
+    # owner 与其他读取并行获取，各分支共用同一个结果
+    owner_task = asyncio.ensure_future(s3_reader.get_object_owner())
+    try:
+        return await _get_file(parsed_path, query_dict, s3_reader, owner_task)
+    finally:
+        if not owner_task.done():
+            owner_task.cancel()
+        # 没有用上的投机读取
+        s3_reader.cancel_prefetch()
+
+
+async def _get_file(
+    parsed_path: str,
+    query_dict: dict,
+    s3_reader: S3Reader,
+    owner_task: asyncio.Future,
+):
     with timer("get_file"):
-        file_header_info = await s3_reader.head_object()
+        s3_reader.ensure_codec()
+        request_byte_start = query_dict.get("bytes", "").split(",")[0]
+        request_byte_start = (
+            int(request_byte_start)
+            if request_byte_start or request_byte_start != ""
+            else 0
+        )
+        # 压缩文件中按解压后的位置访问（ubytes=offset,length）
+        request_uncompressed = False
+        seekable_text = (
+            s3_reader.uncompressed_key.endswith(".jsonl")
+            if s3_reader.is_compressed
+            else parsed_path.endswith(LINE_INDEX_EXTENSIONS)
+        )
+        if "ubytes" in query_dict and s3_reader.is_compressed:
+            if not seekable_text:
+                raise AppEx(
+                    code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="ubytes is only supported for compressed .jsonl files",
+                )
+            try:
+                request_byte_start = int(query_dict["ubytes"].split(",")[0] or 0)
+            except ValueError as exc:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid ubytes query parameter",
+                ) from exc
+            request_uncompressed = True
+
+        # 按行号访问（row=N，从 0 开始），先通过行索引换算成字节位置（压缩文件为解压后的位置）；
+        # WARC 文件为第 N 个 gzip member（记录）
+        request_row = query_dict.get("row")
+        if request_row is not None:
+            if not (seekable_text or parsed_path.endswith(".warc.gz")):
+                raise AppEx(
+                    code=ErrorCode.CODE_00003_CLIENT_ERROR,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Row addressing is only supported for text files",
+                )
+            try:
+                request_row = int(request_row)
+                if request_row < 0:
+                    raise ValueError(request_row)
+            except ValueError as exc:
+                raise AppEx(
+                    code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid row query parameter",
+                ) from exc
+            if parsed_path.endswith(".warc.gz"):
+                request_byte_start = await s3_reader.locate_member(request_row)
+            else:
+                request_byte_start = await s3_reader.locate_row(request_row)
+                request_uncompressed = s3_reader.is_compressed
+
+        # HEAD、mimetype 与首段数据并行获取；按扩展名即可确定不读内容的文件（代理播放的媒体、parquet）不做预读
+        guessed_mimetype = s3_reader.mime_type_by_extension()
+        if not (
+            (guessed_mimetype and should_not_read_as_raw(guessed_mimetype))
+            or parsed_path.endswith((".parquet", ".parq"))
+        ):
+            s3_reader.prefetch(0 if request_uncompressed else request_byte_start)
+
+        mimetype_task = asyncio.ensure_future(s3_reader.mime_type())
+        try:
+            file_header_info = await s3_reader.head_object()
+        except BaseException:
+            mimetype_task.cancel()
+            raise
         size = file_header_info.get("ContentLength", 0) if file_header_info else 0
 
         if size == 0:
+            mimetype_task.cancel()
             return BucketResponse(
                 type=PathType.File,
                 id=s3_reader.bucket.id,
-                owner=await s3_reader.get_object_owner(),
+                owner=await owner_task,
                 size=size,
                 path=s3_reader.path,
                 last_modified=file_header_info.get("LastModified")
@@ -227,13 +540,13 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
                 else None,
             )
 
-        mimetype = await s3_reader.mime_type()
+        mimetype = await mimetype_task
 
         if mimetype and should_not_read_as_raw(mimetype):
             return BucketResponse(
                 type=PathType.File,
                 id=s3_reader.bucket.id,
-                owner=await s3_reader.get_object_owner(),
+                owner=await owner_task,
                 size=size,
                 mimetype=mimetype,
                 path=s3_reader.path,
@@ -246,14 +559,13 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
                 status_code=status.HTTP_404_NOT_FOUND,
             )
 
-        owner = await s3_reader.get_object_owner()
         chunk_size = min(size, 1 << 20)
 
         if not chunk_size:
             return BucketResponse(
                 type=PathType.File,
                 id=s3_reader.bucket.id,
-                owner=owner,
+                owner=await owner_task,
                 size=size,
                 mimetype=mimetype,
                 content="",
@@ -261,14 +573,7 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
                 last_modified=file_header_info.get("LastModified"),
             )
 
-        request_byte_start = query_dict.get("bytes", "").split(",")[0]
-        request_byte_start = (
-            int(request_byte_start)
-            if request_byte_start or request_byte_start != ""
-            else 0
-        )
-
-        if request_byte_start and request_byte_start >= size:
+        if not request_uncompressed and request_byte_start and request_byte_start >= size:
             raise AppEx(
                 code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -292,19 +597,76 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
                 ) from exc
 
         # 文件
-        if parsed_path.endswith(".jsonl") or parsed_path.endswith(".jsonl.gz") or parsed_path.endswith(".warc.gz"):
-            row = await s3_reader.read_row(start=request_byte_start)
+        if s3_reader.uncompressed_key.endswith(".jsonl") or parsed_path.endswith(".warc.gz"):
+            profile = (
+                await _get_file_profile(
+                    s3_reader,
+                    file_header_info.get("ETag"),
+                    query_dict.get("profile") in ("1", "true"),
+                )
+                if s3_reader.uncompressed_key.endswith(".jsonl")
+                else None
+            )
+            lines_param = query_dict.get("lines")
+            if lines_param:
+                try:
+                    line_count = min(max(int(lines_param), 1), settings.ROW_BATCH_MAX_LINES)
+                except ValueError as exc:
+                    raise AppEx(
+                        code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Invalid lines query parameter",
+                    ) from exc
+
+                # 一次返回连续的多行，next 指向最后一行之后
+                rows, next_loc = await s3_reader.read_rows(
+                    start=request_byte_start,
+                    count=line_count,
+                    max_bytes=settings.ROW_BATCH_MAX_BYTES,
+                    uncompressed=request_uncompressed,
+                )
+                if not rows:
+                    raise AppEx(
+                        code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Offset {request_byte_start} is out of range",
+                    )
+                last_start, last_length, last_uncompressed = s3_reader.parse_location(rows[-1].loc)
+                make_location = (
+                    s3_reader._make_ulocation if last_uncompressed else s3_reader._make_location
+                )
+                return BucketResponse(
+                    type=PathType.File,
+                    id=s3_reader.bucket.id,
+                    owner=await owner_task,
+                    size=size,
+                    mimetype=mimetype,
+                    last_modified=file_header_info.get("LastModified"),
+                    content=rows[0].value,
+                    path=make_location(
+                        request_byte_start,
+                        last_start + (last_length or 0) - request_byte_start,
+                    ),
+                    next=next_loc,
+                    rows=[RowResponse(content=row.value, path=row.loc) for row in rows],
+                    profile=profile,
+                )
+
+            row = await s3_reader.read_s3_row_with_cache(
+                start=request_byte_start, uncompressed=request_uncompressed
+            )
 
             return BucketResponse(
                 type=PathType.File,
                 id=s3_reader.bucket.id,
-                owner=owner,
+                owner=await owner_task,
                 size=size,
                 mimetype=mimetype,
                 last_modified=file_header_info.get("LastModified"),
                 content=row.value,
                 path=row.loc,
                 next=row.next,
+                profile=profile,
             )
 
         if parsed_path.endswith((".parquet", ".parq")):
@@ -316,7 +678,7 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
             return BucketResponse(
                 id=s3_reader.bucket.id,
                 type=PathType.File,
-                owner=owner,
+                owner=await owner_task,
                 size=size,
                 mimetype=mimetype,
                 last_modified=file_header_info.get("LastModified"),
@@ -342,7 +704,7 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
 
         async for chunk, _ in s3_reader.read_by_range(
             start_byte=request_byte_start,
-            end_byte=request_byte_start + read_size,
+            end_byte=request_byte_start + read_size - 1,
         ):
             content += chunk.decode("utf-8", errors="ignore")
 
@@ -354,7 +716,7 @@ async def get_file(parsed_path: str, query_dict: dict, s3_reader: S3Reader):
         return BucketResponse(
             type=PathType.File,
             id=s3_reader.bucket.id,
-            owner=owner,
+            owner=await owner_task,
             size=size,
             mimetype=mimetype,
             last_modified=file_header_info.get("LastModified"),
@@ -371,8 +733,12 @@ async def get_buckets_or_objects(
     db: Session,
     id: int | None = None,
     user_id: int | None = None,
+    cursor: str | None = None,
+    sort: str | None = None,
+    start_after: str | None = None,
+    session: str | None = None,
 ):
-    """获取bucket或目录或文件
+    """获取bucket或目录或文件，session 标识发起请求的用户或客户端
     """
     result = None
     # 获取所有bucket列表
@@ -398,6 +764,7 @@ async def get_buckets_or_objects(
         return ListResponse[BucketResponse](data=result, total=total)
     
     _, s3_reader = await get_bucket(path, db, id)
+    s3_reader.session = session
     path_without_query, _, query = path.partition("?")
     s3_path = quote(path_without_query, safe=":/")
     parsed_url = urlparse(s3_path)
@@ -406,12 +773,22 @@ async def get_buckets_or_objects(
     # 目录
     if parsed_path.endswith("/") or s3_reader.key == "":
         with timer("get s3 dirs"):
-            result = await get_s3_directories(
+            page = await get_s3_directories(
                 s3_reader=s3_reader,
                 page_no=page_no,
                 page_size=page_size,
+                cursor=cursor,
+                sort=sort,
+                start_after=start_after,
             )
-        return ListResponse[BucketResponse](data=result, total=len(result))
+        return BucketListResponse(
+            data=page.items,
+            total=page.total if page.total is not None else len(page.items),
+            cursor=page.cursor,
+            source=page.source,
+            total_state=page.total_state,
+            total_job_id=page.total_job_id,
+        )
 
     # 文件
     result = await get_file(
@@ -445,8 +822,14 @@ async def preview_file(
         AppEx: 当文件不存在或大小超出限制时
     """
     _, s3_reader = await get_bucket(path, db, id)
-    # 获取文件信息
-    file_header_info = await s3_reader.head_object()
+    # 获取文件信息，未指定类型时与 mimetype 检测并行
+    mimetype_task = None if mimetype else asyncio.ensure_future(s3_reader.mime_type())
+    try:
+        file_header_info = await s3_reader.head_object()
+    except BaseException:
+        if mimetype_task:
+            mimetype_task.cancel()
+        raise
     if file_header_info is None:
         raise AppEx(
             code=ErrorCode.BUCKET_30001_OBJECT_NOT_FOUND,
@@ -458,7 +841,7 @@ async def preview_file(
 
     # 获取文件类型
     if not mimetype:
-        mimetype = await s3_reader.mime_type()
+        mimetype = await mimetype_task
         if not mimetype:
             raise AppEx(
                 code=ErrorCode.BUCKET_30005_DATA_IS_EMPTY,
@@ -524,9 +907,11 @@ async def preview_file(
     if mimetype in ("application/x-mobipocket-ebook", "application/epub+zip"):
         # 使用流式读取处理大文件
         chunks = []
+        total_bytes = 0
         async for chunk, _ in s3_reader.read_by_range(start_byte=0):
             chunks.append(chunk)
-            if len(chunks) > max_file_size:  # 限制内存使用
+            total_bytes += len(chunk)
+            if total_bytes > max_file_size:  # 限制内存使用
                 raise AppEx(
                     code=ErrorCode.BUCKET_30002_OUT_OF_RANGE,
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -579,3 +964,298 @@ async def preview_file(
 
 
     return response
+
+
+async def stream_path_size(
+    path: str,
+    db: Session,
+    id: int | None = None,
+    refresh: bool = False,
+    interval: float = 0.5,
+) -> StreamingResponse:
+    """
+    统计路径的大小，以 NDJSON 流式返回。
+
+    目录在后台递归统计，每隔 interval 秒输出一次当前的累计值（bytes、objects、按扩展名的分布），
+    最后一行 done 为 true。断开连接不会中断统计，结果缓存后再次请求只重新列出过期的目录。
+    """
+    _, s3_reader = await get_bucket(path, db, id)
+    key = s3_reader.key_without_query
+
+    if key and not key.endswith("/"):
+        head = await s3_reader.head_object()
+        size = head.get("ContentLength") or 0
+        extension = os.path.splitext(key)[1].lower()
+
+        async def file_size():
+            yield json_dumps(
+                {
+                    "bytes": size,
+                    "objects": 1,
+                    "directories": 0,
+                    "extensions": {extension: {"objects": 1, "bytes": size}},
+                    "state": JobState.DONE,
+                    "done": True,
+                }
+            ) + "\n"
+
+        return StreamingResponse(file_size(), media_type="application/x-ndjson")
+
+    job = prefix_sizer.schedule(s3_reader, refresh=refresh)
+
+    async def partial_totals():
+        while True:
+            finished = not job.active
+            line = {**job.progress, "job_id": job.id, "state": job.state, "done": finished}
+            if job.error:
+                line["error"] = job.error
+            yield json_dumps(line) + "\n"
+            if finished:
+                return
+            await asyncio.wait([job.task], timeout=interval)
+
+    return StreamingResponse(partial_totals(), media_type="application/x-ndjson")
+
+
+async def stream_key_search(
+    path: str,
+    pattern: str,
+    db: Session,
+    id: int | None = None,
+    mode: str = "glob",
+    limit: int = 100,
+    recursive: bool = True,
+    ignore_case: bool = False,
+    format: str = "ndjson",
+) -> StreamingResponse:
+    """
+    在目录下按 glob 或正则搜索 key，以 NDJSON 或 SSE 流式返回匹配的条目。
+
+    每个匹配的条目一行（SSE 为 match 事件），最后一行（SSE 为 done 事件）包含 done、扫描的目录数和条目数，
+    达到 limit 后停止搜索并将 truncated 置为 true。
+    """
+    if format not in ("ndjson", "sse"):
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {format}",
+        )
+    match = compile_matcher(pattern, mode, ignore_case)
+    limit = min(max(limit, 1), settings.S3_SEARCH_MAX_RESULTS)
+
+    _, s3_reader = await get_bucket(path, db, id)
+    if s3_reader.key_without_query and not s3_reader.key_without_query.endswith("/"):
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search path must be a directory",
+        )
+
+    def encode(event: str, data: dict) -> str:
+        if format == "sse":
+            return f"event: {event}\ndata: {json_dumps(data)}\n\n"
+        return json_dumps(data) + "\n"
+
+    async def matches():
+        progress: dict = {}
+        summary: dict = {"done": True}
+        try:
+            async for entry in search_keys(
+                s3_reader,
+                match,
+                limit=limit,
+                concurrency=settings.S3_PREFIX_STATS_CONCURRENCY,
+                recursive=recursive,
+                progress=progress,
+            ):
+                yield encode(
+                    "match",
+                    _to_bucket_response(s3_reader, entry).model_dump(
+                        mode="json", exclude_none=True
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"search {path} failed: {e}")
+            summary["error"] = str(e)
+        yield encode("done", {**summary, **progress})
+
+    return StreamingResponse(
+        matches(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+    )
+
+
+async def stream_row_scan(
+    path: str,
+    db: Session,
+    id: int | None = None,
+    field: str | None = None,
+    op: str = "eq",
+    value: str | None = None,
+    contains: str | None = None,
+    regex: str | None = None,
+    ignore_case: bool = False,
+    limit: int = 100,
+    format: str = "ndjson",
+    interval: float = 1.0,
+) -> StreamingResponse:
+    """
+    在服务端逐行过滤 JSONL / 文本文件（支持 gzip、zstd、xz、bz2、lz4 压缩），以 NDJSON 或 SSE 流式返回匹配的行。
+
+    每个匹配的行一个 match 事件，包含行号、字节位置（压缩文件为解压后的位置）和内容，path 可以直接用于读取该行；
+    每隔 interval 秒输出一次 progress 事件，最后输出 done 事件。达到 limit 或断开连接后停止读取。
+    """
+    if format not in ("ndjson", "sse"):
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {format}",
+        )
+    if op not in FIELD_OPS:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid op: {op}, expected one of {', '.join(FIELD_OPS)}",
+        )
+    if not (field or contains or regex):
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one of field, contains or regex is required",
+        )
+    if field and op != "exists" and value is None:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"value is required for op {op}",
+        )
+
+    spec = ScanSpec(
+        field=field,
+        op=op,
+        value=value,
+        contains=contains,
+        pattern=regex,
+        ignore_case=ignore_case,
+    )
+    try:
+        # 在主进程中先编译一次，错误的正则或无法使用的值直接返回 400
+        compile_spec(spec)
+    except re.error as e:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid pattern: {e}",
+        )
+    except TypeError as e:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid value: {e}",
+        )
+    limit = min(max(limit, 1), settings.SCAN_MAX_MATCHES)
+
+    _, s3_reader = await get_bucket(path, db, id)
+    key = s3_reader.key_without_query
+    if not s3_reader.uncompressed_key.lower().endswith(LINE_INDEX_EXTENSIONS):
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Scan is not supported for {key}",
+        )
+    s3_reader.ensure_codec()
+    head = await s3_reader.head_object()
+    total_bytes = head.get("ContentLength") or 0
+
+    def encode(event: str, data: dict) -> str:
+        if format == "sse":
+            return f"event: {event}\ndata: {json_dumps(data)}\n\n"
+        return json_dumps({"type": event, **data}) + "\n"
+
+    async def matches():
+        progress: dict = {}
+        summary: dict = {"done": True}
+        last_report = time.monotonic()
+        async with aclosing(
+            row_scanner.scan(s3_reader, spec, limit=limit, progress=progress)
+        ) as scan:
+            try:
+                async for match in scan:
+                    if match is not None:
+                        line = {
+                            "row": match.row,
+                            "offset": match.offset,
+                            "length": match.length,
+                            "content": match.content,
+                        }
+                        if s3_reader.is_compressed:
+                            line["path"] = s3_reader._make_ulocation(match.offset, match.length + 1)
+                        else:
+                            # 最后一行可能没有换行符
+                            line["path"] = s3_reader._make_location(
+                                match.offset, min(match.length + 1, total_bytes - match.offset)
+                            )
+                        yield encode("match", line)
+                    elif time.monotonic() - last_report >= interval:
+                        last_report = time.monotonic()
+                        yield encode("progress", {**progress, "total_bytes": total_bytes})
+            except Exception as e:
+                logger.error(f"scan {path} failed: {e}")
+                summary["error"] = str(e)
+        summary["truncated"] = progress.get("matches", 0) >= limit
+        yield encode("done", {**summary, **progress, "total_bytes": total_bytes})
+
+    return StreamingResponse(
+        matches(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+    )
+
+
+async def get_gzip_members(
+    path: str,
+    db: Session,
+    id: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+    refresh: bool = False,
+) -> dict:
+    """
+    获取压缩文件的 member（zstd / lz4 为 frame，bz2 / xz 为 stream）索引，返回 member 总数、总行数以及 [offset, offset + limit) 范围内各 member 的
+    压缩位置与长度、解压位置与长度、起始行号和换行数。
+
+    索引不存在（或 refresh 为 true）时在后台建立，返回任务的 job_id 与进度。
+    """
+    _, s3_reader = await get_bucket(path, db, id)
+    if not s3_reader.is_compressed:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Member index is only available for compressed files",
+        )
+    s3_reader.ensure_codec()
+    head = await s3_reader.head_object()
+    etag = head.get("ETag")
+    if not etag:
+        raise AppEx(
+            code=ErrorCode.CODE_00003_CLIENT_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Member index requires an object ETag",
+        )
+
+    members = None if refresh else await gzip_member_store.get(s3_reader, etag)
+    if members is None:
+        job = gzip_member_store.schedule(s3_reader, etag)
+        return {"state": job.state, "job_id": job.id, "progress": job.progress}
+
+    offset = max(offset, 0)
+    end = min(offset + min(max(limit, 1), 10000), members.count)
+    return {
+        "state": JobState.DONE,
+        "codec": s3_reader.codec.name,
+        "members": members.count,
+        "lines": members.lines,
+        "bgzf": members.bgzf,
+        "compressed_size": members.compressed_ends[-1] if members.count else 0,
+        "uncompressed_size": members.uncompressed_ends[-1] if members.count else 0,
+        "items": [members.member(i)._asdict() for i in range(offset, end)],
+    }
@@ -61,3 +61,18 @@ def extract_bytes_range(path: str):
             offset = int(m.group(1))
             length = int(m.group(2))
     return path, offset, length
+
+
+def extract_ubytes_range(path: str):
+    """
+    解析压缩文件中按解压后位置表示的范围 ?ubytes=offset,length
+    """
+    offset, length = 0, 0
+
+    if path.find("?ubytes=") > 0:
+        path, param = path.split("?ubytes=")
+        m = __re_bytes_1.match(param)
+        if m is not None:
+            offset = int(m.group(1))
+            length = int(m.group(2))
+    return path, offset, length
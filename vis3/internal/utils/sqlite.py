@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalSqlite:
+    """
+    每个线程各持有一个连接的 SQLite 数据库，开启 WAL 以支持多进程并发读写。
+
+    首次连接时执行 schema 中的建表语句。
+    """
+
+    def __init__(self, path: str, schema: list[str]):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
@@ -161,7 +161,7 @@ export function FileIcon({ path, type }: FileIconProps) {
       return 'folder'
     }
 
-    if (filePath.endsWith('.jsonl.gz')) {
+    if (/\.jsonl\.(gz|zst|zstd|xz|bz2|lz4)$/.test(filePath)) {
       return 'jsonl'
     }
 
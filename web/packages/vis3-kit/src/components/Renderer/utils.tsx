@@ -39,7 +39,7 @@ export function getPathType(path: string) {
     type = 'csv'
   }
 
-  if (purePath.endsWith('.jsonl') || purePath.endsWith('.jsonl.gz') || purePath.endsWith('.warc') || purePath.endsWith('.warc.gz')) {
+  if (/\.jsonl(\.(gz|zst|zstd|xz|bz2|lz4))?$/.test(purePath) || purePath.endsWith('.warc') || purePath.endsWith('.warc.gz')) {
     type = 'jsonl'
   }
 